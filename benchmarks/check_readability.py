@@ -0,0 +1,113 @@
+"""
+Check the one-pass readability engine against textstat and time both.
+
+Scores a reference set (the benchmark corpus plus hand-picked edge cases, or a
+parquet/CSV text column) with utils/readability.py and with textstat's own
+functions, reports the largest absolute difference per score, and exits
+non-zero if any exceeds `readability.check_tolerance` in config.yaml.
+
+Usage (from the repository root):
+    python benchmarks/check_readability.py
+    python benchmarks/check_readability.py --data data/cleaned_dataset.parquet --limit 5000
+    python benchmarks/check_readability.py --build-table data/cleaned_dataset.parquet
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import make_corpus
+from utils import readability
+
+with open(BASE_DIR / "config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "Hi.",
+    "Wow! Really? Yes.",
+    "Dr. Smith arrived at 5 p.m. on Jan. 3rd, didn't he?",
+    "It's the well-known state-of-the-art approach -- isn't it?",
+    "Naïve café owners résumé their coöperation.",
+    "One sentence without a final stop",
+    "Line one\nLine two\n\nA third paragraph with several multisyllabic, extraordinarily complicated words.",
+    "Double  spaced  words.\r\n\tA tab-indented line\u00a0with a no-break space.",
+]
+
+
+def textstat_scores(text):
+    """The same scores computed by textstat 0.7.3, one function call each."""
+    import textstat
+    return {
+        "flesch_reading_ease": textstat.flesch_reading_ease(text),
+        "flesch_kincaid_grade": textstat.flesch_kincaid_grade(text),
+        "smog_index": textstat.smog_index(text),
+        "coleman_liau_index": textstat.coleman_liau_index(text),
+        "automated_readability_index": textstat.automated_readability_index(text),
+    }
+
+
+def load_texts(args):
+    if args.data:
+        df = pd.read_parquet(args.data) if args.data.endswith(".parquet") else pd.read_csv(args.data)
+        texts = df[args.column].dropna().astype(str).tolist()
+    else:
+        corpus_cfg = config['benchmarks']['corpus']
+        texts = make_corpus(corpus_cfg['n_texts'], corpus_cfg['distribution'],
+                            corpus_cfg['mean_words'], corpus_cfg['max_words'], corpus_cfg['seed'])
+    return EDGE_CASES + texts[:args.limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare utils/readability.py with textstat")
+    parser.add_argument('--data', type=str, default=None, help="Parquet/CSV reference set (default: benchmark corpus)")
+    parser.add_argument('--column', type=str, default="text")
+    parser.add_argument('--limit', type=int, default=2000)
+    parser.add_argument('--build-table', type=str, default=None,
+                        help="Build the syllable table from this parquet/CSV text column first.")
+    args = parser.parse_args()
+
+    if args.build_table:
+        df = pd.read_parquet(args.build_table) if args.build_table.endswith(".parquet") else pd.read_csv(args.build_table)
+        n = readability.build_syllable_table(df[args.column])
+        print(f"✅ Syllable table: {n} words → {config['readability']['syllable_table']}")
+
+    texts = load_texts(args)
+    print(f"Reference set: {len(texts)} texts")
+
+    start = time.perf_counter()
+    ours = readability.readability_batch(texts)
+    ours_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ref_rows = [textstat_scores(t) if t else dict.fromkeys(readability.SCORE_NAMES, 0.0)
+                for t in texts]
+    ref_seconds = time.perf_counter() - start
+
+    tolerance = float(config['readability'].get('check_tolerance', 0.05))
+    failed = False
+    print(f"{'score':>30} {'max |diff|':>11} {'mean |diff|':>12}")
+    for name in readability.SCORE_NAMES:
+        ref = np.array([r[name] for r in ref_rows], dtype=np.float64)
+        diff = np.abs(ours[name] - ref)
+        worst = int(np.argmax(diff))
+        flag = "" if diff[worst] <= tolerance else f"  ❌ worst text #{worst}"
+        failed |= bool(flag)
+        print(f"{name:>30} {diff[worst]:11.3f} {diff.mean():12.4f}{flag}")
+
+    print(f"⏱️ engine {ours_seconds:.2f}s vs textstat {ref_seconds:.2f}s "
+          f"({ref_seconds / max(ours_seconds, 1e-9):.1f}x faster)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
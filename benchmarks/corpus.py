@@ -0,0 +1,69 @@
+"""
+Synthetic benchmark corpora.
+Generates news-like texts locally (no dataset download) with a controllable,
+seeded length distribution so benchmark runs are reproducible across machines.
+"""
+import random
+
+_VOCAB = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at which but "
+    "have an they you were her she there been one all we their has would when if so no will more can "
+    "government report said people year market company policy minister analysis research city council "
+    "economy data development election technology community health education climate investment court "
+    "significant particularly approximately furthermore nevertheless opportunity infrastructure "
+    "international responsibility communication understanding administration consideration"
+).split()
+_PUNCT = [".", ".", ".", "!", "?"]
+
+
+def _sample_length(rng, distribution, mean_words, max_words):
+    """Draw one document length (in words) from the named distribution."""
+    if distribution == "fixed":
+        n = mean_words
+    elif distribution == "uniform":
+        n = rng.randint(1, 2 * mean_words)
+    elif distribution == "lognormal":
+        # sigma=0.6 gives a long right tail similar to news article lengths
+        n = int(rng.lognormvariate(0, 0.6) * mean_words / 1.2)
+    else:
+        raise ValueError(f"Unknown length distribution: {distribution!r}")
+    return max(1, min(n, max_words))
+
+
+def make_text(rng, n_words):
+    """Build one pseudo-article of ``n_words`` words split into sentences and paragraphs."""
+    words, sentence_len, para_len = [], 0, 0
+    target = rng.randint(8, 25)
+    for i in range(n_words):
+        word = rng.choice(_VOCAB)
+        if sentence_len == 0:
+            word = word.capitalize()
+        sentence_len += 1
+        if sentence_len >= target or i == n_words - 1:
+            word += rng.choice(_PUNCT)
+            sentence_len, target = 0, rng.randint(8, 25)
+            para_len += 1
+            if para_len >= 4 and i != n_words - 1:
+                word += "\n\n"
+                para_len = 0
+                words.append(word)
+                continue
+        words.append(word + " ")
+    return "".join(words).strip()
+
+
+def make_corpus(n_texts, distribution="lognormal", mean_words=400, max_words=4000, seed=42):
+    """
+    Generate a reproducible synthetic corpus.
+    Args:
+        n_texts (int): Number of documents.
+        distribution (str): 'fixed', 'uniform' or 'lognormal' document lengths.
+        mean_words (int): Target mean length in words.
+        max_words (int): Hard cap on document length.
+        seed (int): Random seed; the same seed always yields the same corpus.
+    Returns:
+        list of str: The generated texts.
+    """
+    rng = random.Random(seed)
+    return [make_text(rng, _sample_length(rng, distribution, mean_words, max_words))
+            for _ in range(n_texts)]
@@ -0,0 +1,309 @@
+"""
+Reproducible performance benchmarks for the inference and feature entry points.
+
+Each (entry point, batch size, thread count, backend) case runs in its own
+subprocess so peak RSS and cold-start time are isolated. Results are written
+as JSON and compared against a stored baseline; any regression beyond the
+configured tolerance makes the run exit non-zero.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py                       # run + compare with baseline
+    python benchmarks/run_benchmarks.py --save-baseline       # run + store as new baseline
+    python benchmarks/run_benchmarks.py --entry clean_text --entry predict_text
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import make_corpus
+
+with open(BASE_DIR / "config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_bench_cfg = config['benchmarks']
+
+# Entry points whose work scales with a batch of texts per call
+_BATCHED = {"compute_all_features", "predict_text"}
+# Entry points that run the transformer (thread count / backend matter)
+_TORCH = {"predict_text", "api_predict", "api_analyze_file"}
+
+
+# ─── Entry point setup (runs inside the worker process) ───────────────────
+def _setup_entry(entry, backend):
+    """
+    Import and initialise an entry point.
+    Returns:
+        (callable, callable): ``run(batch)`` and ``count_tokens(batch)`` for the case.
+    """
+    def count_words(batch):
+        return sum(len(t.split()) for t in batch)
+
+    if entry == "clean_text":
+        from utils.text_cleaner import clean_text
+        return (lambda batch: [clean_text(t) for t in batch]), count_words
+
+    if entry == "compute_all_features":
+        import pandas as pd
+        from utils.features import compute_all_features
+        return (lambda batch: compute_all_features(pd.DataFrame({'text': batch}))), count_words
+
+    if entry == "predict_text":
+        from utils import dashboard_utils
+        tokenizer, model = dashboard_utils.load_final_model()
+        max_length = config['training']['max_length']['bert_roberta']
+
+        def count_tokens(batch):
+            return sum(min(len(ids), max_length) for ids in tokenizer(list(batch))['input_ids'])
+
+        if backend == "bucketed":
+            from utils import bucketed_inference
+            predictor = bucketed_inference.from_config(tokenizer, model)
+            predictor.warm_up()
+            return predictor.predict, count_tokens
+
+        def run(batch):
+            if len(batch) == 1:
+                return [dashboard_utils.predict_text(batch[0], tokenizer, model)]
+            return dashboard_utils.predict_batch(batch, tokenizer, model, batch_size=len(batch))
+        return run, count_tokens
+
+    if entry in ("api_predict", "api_analyze_file"):
+        from fastapi.testclient import TestClient
+        sys.path.insert(0, str(BASE_DIR / "scripts"))
+        import api_server
+        client = TestClient(api_server.app)
+        if backend == "bucketed":
+            # TestClient without a `with` block skips startup events, so warm up here
+            from utils import bucketed_inference
+            api_server.bucketed = bucketed_inference.from_config(api_server.tokenizer, api_server.model)
+            api_server.bucketed.warm_up()
+        max_length = api_server.truncation_hint()["max_length"]
+
+        def count_tokens(batch):
+            return sum(min(len(ids), max_length) for ids in api_server.tokenizer(list(batch))['input_ids'])
+
+        if entry == "api_predict":
+            def run(batch):
+                return [client.post("/predict", json={"text": t}).json() for t in batch]
+        else:
+            def run(batch):
+                return [client.post("/analyze-file", files={"file": ("bench.txt", t.encode("utf-8"), "text/plain")}).json()
+                        for t in batch]
+        return run, count_tokens
+
+    raise ValueError(f"Unknown entry point: {entry!r}")
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MiB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(spec):
+    """
+    Run one benchmark case in the current process and return its measurements.
+    Args:
+        spec (dict): entry, batch_size, threads, backend, launched_at (parent wall clock).
+    Returns:
+        dict: Throughput, latency percentiles, peak RSS and cold-start time.
+    """
+    if spec['entry'] in _TORCH:
+        # Explicit override, so the model loaders don't re-apply config.yaml's runtime section
+        from utils.runtime import apply_runtime_config
+        apply_runtime_config({'workers': 1, 'intra_op_threads': spec['threads']})
+
+    corpus_cfg = _bench_cfg['corpus']
+    texts = make_corpus(**corpus_cfg)
+    batch_size = spec['batch_size']
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    max_calls = _bench_cfg.get('max_calls', {}).get(spec['entry'])
+    if max_calls:
+        batches = batches[:max_calls]
+
+    run, count_tokens = _setup_entry(spec['entry'], spec['backend'])
+    run(batches[0])
+    cold_start = time.time() - spec['launched_at']
+
+    for batch in batches[:_bench_cfg.get('warmup', 3)]:
+        run(batch)
+
+    latencies = []
+    total_start = time.perf_counter()
+    for batch in batches:
+        start = time.perf_counter()
+        run(batch)
+        latencies.append(time.perf_counter() - start)
+    total = time.perf_counter() - total_start
+
+    n_texts = sum(len(b) for b in batches)
+    n_tokens = sum(count_tokens(b) for b in batches)
+    latencies.sort()
+    return {
+        **{k: spec[k] for k in ('entry', 'batch_size', 'threads', 'backend')},
+        "n_texts": n_texts,
+        "texts_per_s": n_texts / total if total else 0.0,
+        "tokens_per_s": n_tokens / total if total else 0.0,
+        "latency_p50_ms": _percentile(latencies, 50) * 1000,
+        "latency_p95_ms": _percentile(latencies, 95) * 1000,
+        "latency_p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_rss_mb": _peak_rss_mb(),
+        "cold_start_s": cold_start,
+    }
+
+
+# ─── Orchestration (parent process) ───────────────────────────────────────
+def case_key(result):
+    """Stable identifier used to match a result with its baseline entry."""
+    return f"{result['entry']}|bs={result['batch_size']}|threads={result['threads']}|backend={result['backend']}"
+
+
+def build_cases(entries):
+    """Expand the configured matrix; batch/thread/backend axes only apply where they matter."""
+    cases = []
+    for entry in entries:
+        batch_sizes = _bench_cfg['batch_sizes'] if entry in _BATCHED else [1]
+        threads = _bench_cfg['threads'] if entry in _TORCH else [1]
+        backends = _bench_cfg['backends'] if entry in _TORCH else ["python"]
+        for bs in batch_sizes:
+            for t in threads:
+                for backend in backends:
+                    cases.append({"entry": entry, "batch_size": bs, "threads": t, "backend": backend})
+    return cases
+
+
+def run_in_subprocess(spec):
+    """Launch a fresh interpreter for ``spec`` so RSS and cold start are not shared between cases."""
+    spec = {**spec, "launched_at": time.time()}
+    env = {**os.environ, "OMP_NUM_THREADS": str(spec['threads'])}
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", json.dumps(spec)],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        print(f"[benchmarks] {case_key({**spec})} failed:\n{proc.stderr[-2000:]}")
+        return None
+    # The worker prints its JSON result as the last stdout line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare_with_baseline(results, baseline, tolerance, failed=(), entries=None):
+    """
+    Compare results against a baseline report.
+    A case that crashed, or a baseline case of a benchmarked entry point with no
+    result in this run, counts as a regression too.
+    Args:
+        failed (list of str): Case keys whose worker exited with an error.
+        entries (list of str): Entry points benchmarked in this run (default: all in the baseline).
+    Returns:
+        list of str: Human-readable regression messages (empty if none).
+    """
+    base = {case_key(r): r for r in baseline.get('results', [])}
+    regressions = [f"{key}: failed to run" for key in failed]
+    ran = {case_key(r) for r in results} | set(failed)
+    for key, b in base.items():
+        if key not in ran and (entries is None or b['entry'] in entries):
+            regressions.append(f"{key}: in the baseline but missing from this run")
+    for r in results:
+        b = base.get(case_key(r))
+        if b is None:
+            continue
+        if r['texts_per_s'] < b['texts_per_s'] * (1 - tolerance):
+            regressions.append(f"{case_key(r)}: throughput {r['texts_per_s']:.1f} < baseline {b['texts_per_s']:.1f} texts/s")
+        if r['latency_p95_ms'] > b['latency_p95_ms'] * (1 + tolerance):
+            regressions.append(f"{case_key(r)}: p95 {r['latency_p95_ms']:.1f} > baseline {b['latency_p95_ms']:.1f} ms")
+        if r.get('peak_rss_mb') and b.get('peak_rss_mb') and r['peak_rss_mb'] > b['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{case_key(r)}: peak RSS {r['peak_rss_mb']:.0f} > baseline {b['peak_rss_mb']:.0f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Text Detector performance benchmarks")
+    parser.add_argument('--entry', action='append', default=None,
+                        help="Entry point to benchmark (repeatable). Defaults to benchmarks.entry_points in config.yaml.")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store this run as the new baseline instead of comparing against it.")
+    parser.add_argument('--worker', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(json.loads(args.worker))))
+        return
+
+    entries = args.entry or _bench_cfg['entry_points']
+    results, failed = [], []
+    for spec in build_cases(entries):
+        print(f"[benchmarks] Running {case_key(spec)} ...")
+        result = run_in_subprocess(spec)
+        if result is None:
+            failed.append(case_key(spec))
+        else:
+            results.append(result)
+            print(f"[benchmarks]   {result['texts_per_s']:.1f} texts/s, p95 {result['latency_p95_ms']:.1f} ms, "
+                  f"cold start {result['cold_start_s']:.1f} s")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": _bench_cfg['corpus'],
+        },
+        "results": results,
+        "failed": failed,
+    }
+    results_dir = BASE_DIR / _bench_cfg['results_dir']
+    results_dir.mkdir(parents=True, exist_ok=True)
+    out_path = results_dir / f"bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    out_path.write_text(json.dumps(report, indent=2))
+    print(f"[benchmarks] Wrote {out_path}")
+
+    baseline_path = BASE_DIR / _bench_cfg['baseline']
+    if args.save_baseline:
+        if failed:
+            print(f"[benchmarks] Not saving a baseline: {len(failed)} case(s) failed: {', '.join(failed)}")
+            sys.exit(1)
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"[benchmarks] Saved baseline to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"[benchmarks] No baseline at {baseline_path}; run with --save-baseline to create one.")
+        sys.exit(1 if failed else 0)
+
+    regressions = compare_with_baseline(results, json.loads(baseline_path.read_text()), _bench_cfg['tolerance'],
+                                        failed=failed, entries=entries)
+    if regressions:
+        print("[benchmarks] Performance regressions detected:")
+        for msg in regressions:
+            print(f"  - {msg}")
+        sys.exit(1)
+    print("[benchmarks] No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
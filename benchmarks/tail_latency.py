@@ -0,0 +1,109 @@
+"""
+First-request tail latency: eager model vs shape-bucketed graphs.
+
+Each backend runs in a fresh interpreter. After loading the model (and, for the
+bucketed backend, warming up every shape) it times the first N single-text
+predictions individually, on texts of varying length, the way a freshly
+started API worker would see them. The report shows p50/p99/max latency over
+those N requests, plus the worst of the very first few, for each backend.
+
+Usage (from the repository root):
+    python benchmarks/tail_latency.py
+    python benchmarks/tail_latency.py --requests 500 --backend trace --backend compile
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import make_corpus
+
+with open(BASE_DIR / "config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+FIRST_FEW = 10
+
+
+def _percentile(sorted_values, q):
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def measure(backend, n_requests):
+    """Load the model, prepare `backend` and time the first `n_requests` single-text predictions."""
+    from utils import dashboard_utils
+    tokenizer, model = dashboard_utils.load_final_model()
+
+    corpus_cfg = config['benchmarks']['corpus']
+    texts = make_corpus(**{**corpus_cfg, "n_texts": n_requests})
+
+    warmup = 0.0
+    if backend == "eager":
+        predict = lambda text: dashboard_utils.predict_text(text, tokenizer, model)
+    else:
+        from utils import bucketed_inference
+        # 'padded' = bucket padding + warm-up on the eager model
+        predictor = bucketed_inference.from_config(tokenizer, model,
+                                                   backend="eager" if backend == "padded" else backend)
+        warmup = predictor.warm_up()
+        predict = lambda text: predictor.predict([text])[0]
+
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    ordered = sorted(latencies)
+    return {
+        "backend": backend,
+        "warmup_s": warmup,
+        "p50_ms": _percentile(ordered, 50),
+        "p99_ms": _percentile(ordered, 99),
+        "max_ms": ordered[-1],
+        "first_few_max_ms": max(latencies[:FIRST_FEW]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare first-request tail latency across backends")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--backend', action='append', default=None,
+                        help="eager (no buckets), padded, trace or compile (repeatable)")
+    parser.add_argument('--worker', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.requests)))
+        return
+
+    backends = args.backend or ["eager", config['inference'].get('bucketing', {}).get('backend', "trace")]
+    rows = []
+    for backend in backends:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--requests", str(args.requests)],
+            cwd=BASE_DIR, env=os.environ.copy(), capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"❌ {backend} failed:\n{proc.stderr[-2000:]}")
+            continue
+        rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"{'backend':>10} {'warm-up s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'first ' + str(FIRST_FEW) + ' max':>13}")
+    for r in rows:
+        print(f"{r['backend']:>10} {r['warmup_s']:10.1f} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} "
+              f"{r['max_ms']:9.1f} {r['first_few_max_ms']:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,22 +26,10 @@ if (window === window.top) {
     scanButton.disabled = true;
     scanButton.innerText = 'Scanning...';
 
-    // Gather page text (prefer <article> if present)
-    let pageText = '';
-    const articleElement = document.querySelector('article');
-    if (articleElement) {
-      pageText = articleElement.innerText;
-    } else {
-      pageText = document.body.innerText;
-    }
-
-    // Send to local API
-    fetch('http://127.0.0.1:8000/predict', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ text: pageText.substring(0, 10000) })
-    })
-      .then(res => res.json())
+    // Gather page text locally, so only the hash leaves the page until the
+    // server reports a cache miss
+    Promise.resolve(extractPageText())
+      .then(text => scanText(text))
       .then(data => displayResults(data))
       .catch(err => {
         console.error("Error scanning article:", err);
@@ -51,6 +39,70 @@ if (window === window.top) {
       });
   });
 
+  const API_BASE = 'http://127.0.0.1:8000';
+  let truncationHint = null;  // { max_chars, max_length } fetched once per page
+
+  function postJSON(path, body) {
+    return fetch(API_BASE + path, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body)
+    }).then(res => {
+      if (!res.ok) throw new Error(`Server error: ${res.status}`);
+      return res.json();
+    });
+  }
+
+  // Main text of the page: <article>/<main> if present, otherwise the paragraphs
+  // outside navigation/header/footer/aside that read like prose (mirrors the
+  // word-count / link-density rule of utils/html_extract.py)
+  const MIN_WORDS = 10;
+  const MAX_LINK_DENSITY = 0.33;
+
+  function extractPageText() {
+    const main = document.querySelector('article, main, [role="main"]');
+    if (main) return main.innerText;
+
+    const blocks = [];
+    document.querySelectorAll('p, li, blockquote, pre, h1, h2, h3').forEach(el => {
+      if (el.closest('nav, header, footer, aside, form, [role="navigation"], [role="banner"], [role="contentinfo"]')) return;
+      if (el.querySelector('p, li, blockquote, pre')) return;  // innermost blocks only, no duplicates
+      const text = el.innerText.replace(/\s+/g, ' ').trim();
+      if (!text || text.split(' ').length < MIN_WORDS) return;
+      const linkChars = Array.from(el.querySelectorAll('a'))
+        .reduce((n, a) => n + a.innerText.trim().length, 0);
+      if (linkChars / text.length > MAX_LINK_DENSITY) return;
+      blocks.push(text);
+    });
+    return blocks.length ? blocks.join('\n\n') : document.body.innerText;
+  }
+
+  async function sha256Hex(text) {
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest))
+      .map(b => b.toString(16).padStart(2, '0'))
+      .join('');
+  }
+
+  // Send only what the model will read, and ask for a cached verdict before
+  // sending any text at all. Falls back to plain /predict where SubtleCrypto
+  // is unavailable (non-HTTPS pages).
+  async function scanText(rawText) {
+    if (!truncationHint) {
+      truncationHint = await fetch(API_BASE + '/predict/extension/hints').then(res => res.json());
+    }
+    const text = rawText.replace(/\s+/g, ' ').trim().substring(0, truncationHint.max_chars);
+
+    if (!(window.crypto && crypto.subtle)) {
+      return postJSON('/predict', { text });
+    }
+
+    const hash = await sha256Hex(text);
+    const lookup = await postJSON('/predict/extension', { hash });
+    if (lookup.cached) return lookup;
+    return postJSON('/predict/extension', { hash, text });
+  }
+
   function displayResults(data) {
     // Remove old overlay if present
     const old = document.getElementById('ai-detector-results');
@@ -3,25 +3,40 @@ import React, { useState } from 'react';
 /**
  * SingleAnalysis Component
  * Allows user to input text and get a prediction with highlighted explanation.
+ * The verdict and LIME explanation come from /predict (as for every other client);
+ * paragraph tints come from /predict/paragraphs, where the server caches each
+ * paragraph's scores, so re-running after an edit only re-scores what changed.
  */
 function SingleAnalysis() {
   const [text, setText] = useState("");
   const [result, setResult] = useState(null);  // will hold { prediction, confidence, probabilities, explanation }
+  const [paragraphs, setParagraphs] = useState(null);  // per-paragraph { start, end, probabilities } (null if unavailable)
+  const [analyzedText, setAnalyzedText] = useState("");  // text the current result refers to (paragraph offsets)
   const [loading, setLoading] = useState(false);
 
   const analyzeText = async () => {
     if (!text.trim()) return;
     setLoading(true);
     setResult(null);
-    try {
-      const response = await fetch('http://127.0.0.1:8000/predict', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text })
-      });
+    setParagraphs(null);
+    const post = (path) => fetch(`http://127.0.0.1:8000${path}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ text })
+    }).then(response => {
       if (!response.ok) throw new Error(`Server error: ${response.status}`);
-      const data = await response.json();
+      return response.json();
+    });
+    // Paragraph tints are an extra; the verdict does not depend on them
+    const paragraphRequest = post('/predict/paragraphs').catch(err => {
+      console.error("Paragraph scoring error:", err);
+      return null;
+    });
+    try {
+      const [data, paragraphData] = await Promise.all([post('/predict'), paragraphRequest]);
+      setAnalyzedText(text);
       setResult(data);
+      setParagraphs(paragraphData ? paragraphData.paragraphs : null);
     } catch (err) {
       console.error("Analysis error:", err);
       setResult({ prediction: "Error", confidence: 0, probabilities: {}, explanation: [] });
@@ -30,26 +45,51 @@ function SingleAnalysis() {
     }
   };
 
+  // Tint each paragraph by how likely it is to be AI-written (1 - P(human)),
+  // keeping the explanation's word highlights inside it
+  const renderParagraphs = () => {
+    const pieces = [];
+    let cursor = 0;
+    paragraphs.forEach((para, idx) => {
+      if (para.start > cursor) {
+        pieces.push(<span key={`gap-${idx}`}>{analyzedText.slice(cursor, para.start)}</span>);
+      }
+      const aiProb = 1 - (para.probabilities["Human-written"] || 0);
+      const tooltip = Object.entries(para.probabilities)
+        .map(([label, prob]) => `${label}: ${(prob * 100).toFixed(1)}%`)
+        .join("\n");
+      pieces.push(
+        <span key={`para-${idx}`} style={{ backgroundColor: `rgba(255, 99, 71, ${(aiProb * 0.6).toFixed(2)})` }} title={tooltip}>
+          {renderHighlightedText(analyzedText.slice(para.start, para.end), `para-${idx}`)}
+        </span>
+      );
+      cursor = para.end;
+    });
+    pieces.push(<span key="tail">{analyzedText.slice(cursor)}</span>);
+    return pieces;
+  };
+
   // Highlight the input text based on explanation weights
-  const renderHighlightedText = () => {
-    if (!result || !result.explanation) return text;
+  const renderHighlightedText = (text, keyPrefix = "word") => {
+    if (!result || !result.explanation || !result.explanation.length) return text;
     // Compute max weight for normalization
     const weights = result.explanation;
     const maxWeight = Math.max(...weights.map(w => Math.abs(w.weight)), 0.001);
     // Split text by spaces to highlight each word that matches
-    return text.split(" ").map((word, idx) => {
+    return text.split(" ").map((word, idx, words) => {
+      const spaced = idx < words.length - 1 ? word + " " : word;
       // Find if this word (case-insensitive) is in top features
       const match = weights.find(w => w.word.toLowerCase() === word.replace(/[^\w]/g, "").toLowerCase());
       if (match) {
         const opacity = Math.min(Math.abs(match.weight) / maxWeight, 1).toFixed(2);
         const highlightColor = `rgba(255, 255, 0, ${opacity})`;  // yellow highlight
         return (
-          <span key={idx} style={{ backgroundColor: highlightColor }} title={`Weight: ${match.weight.toFixed(2)}`}>
-            {word + " "}
+          <span key={`${keyPrefix}-${idx}`} style={{ backgroundColor: highlightColor }} title={`Weight: ${match.weight.toFixed(2)}`}>
+            {spaced}
           </span>
         );
       } else {
-        return <span key={idx}>{word + " "}</span>;
+        return <span key={`${keyPrefix}-${idx}`}>{spaced}</span>;
       }
     });
   };
@@ -85,9 +125,13 @@ function SingleAnalysis() {
               ))}
             </div>
           )}
-           {result.explanation && (
+          {paragraphs ? (
+            <p className="text-sm leading-relaxed whitespace-pre-wrap">
+              {renderParagraphs()}
+            </p>
+          ) : result.explanation && (
             <p className="text-sm leading-relaxed">
-            {renderHighlightedText()}
+            {renderHighlightedText(analyzedText)}
             </p>
           )}
         </div>
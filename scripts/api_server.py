@@ -1,7 +1,11 @@
 import uvicorn
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
+from starlette.routing import Match
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import Optional
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from pathlib import Path
@@ -12,6 +16,27 @@ from docx import Document
 from pdf2image import convert_from_bytes
 import pytesseract
 from io import BytesIO
+import sys
+
+# Run from the repository root (`python scripts/api_server.py`): utils/ and
+# config.yaml are resolved from there
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from utils.prediction_cache import get_cache, content_hash, truncation_hint, get_cache_config
+from utils import metrics
+from utils.metrics import stage
+from utils.runtime import apply_runtime_config, get_runtime_config
+from utils import cascade
+from utils.paragraph_scoring import ParagraphScorer
+from utils.admission import AdmissionRejected, get_controller, request_tokens
+from utils.job_queue import JobQueue, get_jobs_config
+from utils.html_extract import extract_main_text
+from utils import bucketed_inference
+from utils import progressive
+import os
+import uuid
+import time
 import logging
 logging.basicConfig(level=logging.INFO)
 
@@ -26,12 +51,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ─── Request metrics & sampled Server-Timing traces ───────────────────────
+def _endpoint_label(request):
+    """Route template for `request` (keeps metric label cardinality bounded)."""
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+if metrics.is_enabled():
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        endpoint = _endpoint_label(request)
+        if endpoint == "/metrics":
+            return await call_next(request)
+        metrics.REQUESTS.labels(endpoint=endpoint).inc()
+        metrics.IN_FLIGHT.labels(endpoint=endpoint).inc()
+        spans = metrics.start_trace(force=request.headers.get("x-trace") == "1")
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        except Exception:
+            metrics.ERRORS.labels(endpoint=endpoint).inc()
+            raise
+        finally:
+            metrics.IN_FLIGHT.labels(endpoint=endpoint).dec()
+        elapsed = time.perf_counter() - start
+        metrics.REQUEST_SECONDS.labels(endpoint=endpoint).observe(elapsed)
+        if response.status_code >= 400:
+            metrics.ERRORS.labels(endpoint=endpoint).inc()
+        if spans is not None:
+            response.headers["Server-Timing"] = metrics.server_timing_header(spans, total=elapsed)
+        return response
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        metrics.update_cache_gauges(prediction_cache)
+        body, content_type = metrics.render_latest()
+        return Response(content=body, media_type=content_type)
+
 # ─── Load model & tokenizer from local `diagrams/final_model` ─────────────
-BASE_DIR = Path(__file__).resolve().parent.parent
 MODEL_DIR = BASE_DIR / "diagrams" / "final_model"
 if not MODEL_DIR.exists():
     raise FileNotFoundError(f"Could not find model folder at {MODEL_DIR}")
 
+# This module loads the model at import, so workers spawned from `__main__` would
+# each load it twice on top of an unused copy here; scripts/serve.py handles that
+if __name__ == "__main__" and get_runtime_config()['workers'] > 1:
+    raise SystemExit(f"inference.runtime.workers is {get_runtime_config()['workers']}: start several "
+                     f"workers with `python scripts/serve.py` (api_server.py serves a single worker).")
+
+# Size torch thread pools (and pin cores) for this worker before loading
+apply_runtime_config()
+
 tokenizer = AutoTokenizer.from_pretrained(
     str(MODEL_DIR),
     local_files_only=True
@@ -48,23 +122,128 @@ label_names = ["Human-written", "AI-paraphrased", "AI-generated"]
 class TextRequest(BaseModel):
     text: str
 
-# ─── Single-text prediction endpoint ──────────────────────────────────────
-@app.post("/predict")
-async def predict_text(req: TextRequest):
-    logging.info("🛈 /predict called")
-    text = req.text
-    # Tokenize and run the model
-    inputs = tokenizer(
-        text,
-        return_tensors="pt",
-        truncation=True,
-        padding=True,
-        max_length=512
+class HTMLRequest(BaseModel):
+    html: str
+
+class JobRequest(BaseModel):
+    path: str                      # parquet or CSV file readable by the workers
+    text_column: str = "text"
+
+class ExtensionPredictRequest(BaseModel):
+    hash: str                      # SHA-256 of `text` (as sent), computed by the client
+    text: Optional[str] = None     # omitted on the first, lookup-only call
+
+# ─── Verdict cache (keyed by content hash) ────────────────────────────────
+prediction_cache = get_cache()
+
+
+# ─── Paragraph-level incremental scorer (edit-and-recheck in the UI) ──────
+_paragraph_cfg = get_cache_config().get('paragraphs', {})
+paragraph_scorer = ParagraphScorer(
+    tokenizer, model,
+    max_length=512,
+    max_chars=_paragraph_cfg.get('max_chars', 2000),
+    cache_entries=_paragraph_cfg.get('cache_entries', 50000),
+)
+
+# ─── Admission control: bounded priority queues, 429 + Retry-After on overload ─
+admission = get_controller()
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"error": f"Server busy ({exc.request_class} queue {exc.reason})",
+                 "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
     )
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        probs = torch.softmax(logits, dim=1)[0].cpu().numpy().tolist()
+
+
+async def _run_admitted(request_class, tokens, fn, *args):
+    """
+    Wait for a model slot (if admission control is on), then run the blocking
+    model call ``fn(*args)`` in the threadpool so the event loop keeps accepting
+    and shedding requests meanwhile.
+    """
+    if admission is None:
+        return await run_in_threadpool(fn, *args)
+    async with admission.admit(request_class, tokens):
+        return await run_in_threadpool(fn, *args)
+
+# ─── Optional shape-bucketed graphs (warmed per worker at startup) ─────────
+bucketed = bucketed_inference.from_config(tokenizer, model) if bucketed_inference.is_enabled() else None
+
+
+@app.on_event("startup")
+async def warm_up_buckets():
+    # Runs in each worker after any fork, so traced graphs and thread pools are per process
+    if bucketed is not None:
+        await run_in_threadpool(bucketed.warm_up)
+
+
+# ─── Optional progressive-length scoring (short prefix first, see utils/progressive.py) ─
+progressive_predictor = progressive.load_progressive(tokenizer, model, bucketed=bucketed) \
+    if progressive.is_enabled() else None
+
+
+def _forward_logits(text):
+    """Logits of one text, progressively and/or through the bucketed graphs when enabled."""
+    metrics.BATCH_SIZE.set(1)
+    if progressive_predictor is not None:
+        with stage("forward"):
+            logits, _used = progressive_predictor.logits([text])
+        metrics.PROGRESSIVE_FULL_RATE.set(progressive_predictor.full_length_rate)
+        return torch.from_numpy(logits)
+    if bucketed is not None:
+        with stage("forward"):
+            return torch.from_numpy(bucketed.logits([text]))
+    with stage("tokenize"):
+        inputs = tokenizer(
+            text,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=512
+        )
+    with stage("forward"), torch.no_grad():
+        return model(**inputs).logits
+
+# ─── Optional cheap-first cascade (see utils/cascade.py) ──────────────────
+cascade_predictor = cascade.load_cascade(tokenizer, model) if cascade.is_enabled() else None
+
+
+def _first_stage_payload(text):
+    """
+    Score `text` with the cascade's first stage.
+    Returns the response body if it is confident enough, else None (escalate).
+    """
+    with stage("first_stage"):
+        probs, keep = cascade_predictor.try_first_stage([text])
+    metrics.CASCADE_ESCALATION.set(cascade_predictor.escalation_rate)
+    if not keep[0]:
+        return None
+    probs = probs[0].tolist()
+    pred_idx = int(max(range(len(probs)), key=probs.__getitem__))
+    return {
+        "prediction":    label_names[pred_idx],
+        "confidence":    probs[pred_idx],
+        "probabilities": {label_names[i]: probs[i] for i in range(len(label_names))},
+        "explanation":   [],   # LIME only runs on the transformer path
+        "stage":         "first"
+    }
+
+
+def _predict_payload(text):
+    """Run tokenizer + model + LIME on `text` and build the /predict response body."""
+    if cascade_predictor is not None:
+        payload = _first_stage_payload(text)
+        if payload is not None:
+            return payload
+
+    # Tokenize and run the model
+    logits = _forward_logits(text)
+    probs = torch.softmax(logits, dim=1)[0].cpu().numpy().tolist()
 
     pred_idx   = int(torch.argmax(logits, dim=1).item())
     pred_label = label_names[pred_idx]
@@ -73,9 +252,10 @@ async def predict_text(req: TextRequest):
     # Attempt LIME explanation (if available)
     try:
         from utils import dashboard_utils
-        explanation_pairs = dashboard_utils.explain_prediction(
-            text, tokenizer, model, num_features=6
-        )
+        with stage("lime"):
+            explanation_pairs = dashboard_utils.explain_prediction(
+                text, tokenizer, model, num_features=6
+            )
         explanation = [
             {"word": w, "weight": float(weight)}
             for (w, weight) in explanation_pairs
@@ -92,20 +272,109 @@ async def predict_text(req: TextRequest):
         "prediction":   pred_label,
         "confidence":   confidence,
         "probabilities": probabilities,
-        "explanation":  explanation
+        "explanation":  explanation,
+        "stage":        "transformer"
     }
 
-@app.post("/analyze-file")
-async def analyze_file(file: UploadFile = File(...)):
-    logging.info(f"🛈 /analyze-file called for {file.filename}")
+# ─── Single-text prediction endpoint ──────────────────────────────────────
+@app.post("/predict")
+async def predict_text(req: TextRequest):
+    logging.info("🛈 /predict called")
+    return await _run_admitted("interactive", request_tokens(req.text), _predict_payload, req.text)
+
+# ─── Paragraph-segmented scoring (only changed paragraphs hit the model) ──
+def _score_paragraphs(text):
+    with stage("paragraphs"):
+        return paragraph_scorer.score(text)
+
+
+@app.post("/predict/paragraphs")
+async def predict_paragraphs(req: TextRequest):
     """
-    Analyze an uploaded file (txt, html, docx, or pdf). Extracts text and returns prediction results.
+    Score the text paragraph by paragraph, reusing cached logits for paragraphs
+    seen before, and return per-paragraph probabilities for highlighting.
+    """
+    logging.info("🛈 /predict/paragraphs called")
+    result = await _run_admitted("interactive", request_tokens(req.text, cap=False),
+                                 _score_paragraphs, req.text)
+    probs = result["probs"]
+    pred_idx = int(max(range(len(probs)), key=probs.__getitem__))
+    return {
+        "prediction":    label_names[pred_idx],
+        "confidence":    probs[pred_idx],
+        "probabilities": {label_names[i]: probs[i] for i in range(len(label_names))},
+        "rescored":      result["rescored"],
+        "paragraphs": [
+            {
+                "start": p["start"],
+                "end": p["end"],
+                "probabilities": {label_names[i]: p["probs"][i] for i in range(len(label_names))},
+                "cached": p["cached"],
+            }
+            for p in result["paragraphs"]
+        ],
+    }
+
+# ─── Main-content extraction for raw page HTML ─────────────────────────────
+_html_cfg = get_cache_config().get('html_extraction', {})
+
+
+def _extract_html(html):
+    with stage("extract"):
+        return extract_main_text(html)
+
+
+@app.post("/extract/html")
+async def extract_html(req: HTMLRequest):
+    """Return the main article text of an HTML document (the body is always parsed as markup)."""
+    max_chars = int(_html_cfg.get('max_request_chars', 2_000_000))
+    if len(req.html) > max_chars:
+        raise HTTPException(status_code=413, detail=f"HTML larger than {max_chars} characters")
+    text = await _run_admitted("bulk", request_tokens(req.html), _extract_html, req.html)
+    return {"text": text}
+
+# ─── Lightweight hash-first variant for the browser extension ─────────────
+@app.get("/predict/extension/hints")
+async def extension_hints():
+    """Tell the client how much text is worth sending (the rest is truncated away)."""
+    return {**truncation_hint(), "hash": "sha256"}
+
+
+@app.post("/predict/extension")
+async def predict_extension(req: ExtensionPredictRequest):
+    """
+    Two-step protocol: the client first sends only the content hash and gets the
+    cached verdict back if the server has seen that text before. On a miss
+    (`cached: false`) it resends the hash together with the truncated text.
+    """
+    logging.info("🛈 /predict/extension called")
+    if prediction_cache is not None:
+        cached = prediction_cache.get(req.hash)
+        metrics.update_cache_gauges(prediction_cache)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    if req.text is None:
+        return {"cached": False, **truncation_hint()}
+
+    # Only trust the client's hash if it really is the digest of what was sent,
+    # so one client can't poison the verdict another one gets back.
+    if content_hash(req.text) != req.hash:
+        raise HTTPException(status_code=400, detail="hash does not match text")
+
+    text = req.text[:truncation_hint()["max_chars"]]
+    payload = await _run_admitted("interactive", request_tokens(text), _predict_payload, text)
+    if prediction_cache is not None:
+        prediction_cache.put(req.hash, payload)
+    return {**payload, "cached": False}
+
+def _extract_file_text(filename, contents):
+    """
+    Extract text from an uploaded txt, html, docx or pdf file (OCR for scanned PDFs).
+    Returns None for unsupported file types.
     """
-    # Read file contents into memory
-    contents = await file.read()
-    filename = file.filename.lower()
     text_content = ""
-    try:
+    with stage("extract"):
         if filename.endswith(".txt"):
             # Decode bytes to text
             text_content = contents.decode('utf-8', errors='ignore')
@@ -116,10 +385,8 @@ async def analyze_file(file: UploadFile = File(...)):
             doc = Document(BytesIO(contents))
             text_content = "\n".join([para.text for para in doc.paragraphs])
         elif filename.endswith(".html") or filename.endswith(".htm"):
-            # Parse HTML and extract visible text
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(contents, "html.parser")
-            text_content = soup.get_text(separator=" ")
+            # Main-article text only (no nav/scripts/footers eating the token budget)
+            text_content = extract_main_text(contents)
         elif filename.endswith(".pdf"):
             # Try extracting text from PDF using PyMuPDF
             import fitz  # PyMuPDF
@@ -135,27 +402,117 @@ async def analyze_file(file: UploadFile = File(...)):
                 for img in images:
                     text_content += pytesseract.image_to_string(img)
         else:
-            return {"error": "Unsupported file type"}
+            return None
+    return text_content
+
+
+def _classify_payload(text):
+    """Model-only verdict (no LIME) used for whole documents."""
+    logits = _forward_logits(text)
+    probs = torch.softmax(logits, dim=1)[0].cpu().numpy().tolist()
+    pred_idx = int(torch.argmax(logits, dim=1).item())
+    return {
+        "prediction": label_names[pred_idx],
+        "confidence": probs[pred_idx]
+        # (I omit the explanation here for efficiency – running LIME on a long document could be time-consuming. Batch analysis typically focuses on classification results; the user can always analyze a specific excerpt via the single-text route to get highlights.)
+    }
+
+@app.post("/analyze-file")
+async def analyze_file(file: UploadFile = File(...)):
+    logging.info(f"🛈 /analyze-file called for {file.filename}")
+    """
+    Analyze an uploaded file (txt, html, docx, or pdf). Extracts text and returns prediction results.
+    """
+    # Shed bulk work before reading/extracting the upload if the queue is already saturated
+    if admission is not None:
+        admission.check("bulk")
+
+    # Read file contents into memory
+    contents = await file.read()
+    filename = file.filename.lower()
+    try:
+        text_content = await run_in_threadpool(_extract_file_text, filename, contents)
     except Exception as e:
         return {"error": f"Failed to process file: {str(e)}"}
+    if text_content is None:
+        return {"error": "Unsupported file type"}
 
     text_content = text_content.strip()
     if text_content == "":
         return {"error": "No text found in the document"}
 
-    # Reuse prediction logic from /predict
-    inputs = tokenizer(text_content, return_tensors="pt", truncation=True, padding=True, max_length=512)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = torch.softmax(outputs.logits, dim=1)[0].cpu().numpy().tolist()
-    pred_idx = int(torch.argmax(outputs.logits, dim=1).item())
-    pred_label = label_names[pred_idx]
-    confidence = probs[pred_idx]
-    return {
-        "prediction": pred_label,
-        "confidence": confidence
-        # (I omit the explanation here for efficiency – running LIME on a long document could be time-consuming. Batch analysis typically focuses on classification results; the user can always analyze a specific excerpt via the single-text route to get highlights.)
-    }
+    return await _run_admitted("bulk", request_tokens(text_content), _classify_payload, text_content)
+
+# ─── Bulk-scoring jobs (SQLite queue, scored by scripts/job_worker.py) ─────
+_jobs_cfg = get_jobs_config()
+job_queue = JobQueue() if _jobs_cfg.get('enabled', True) else None
+
+
+def _require_jobs():
+    if job_queue is None:
+        raise HTTPException(status_code=404, detail="Job queue is disabled")
+
+
+@app.post("/jobs")
+async def create_job(req: JobRequest):
+    """Queue a parquet/CSV file (under one of `jobs.allowed_roots`) for bulk scoring."""
+    _require_jobs()
+    path = os.path.realpath(req.path)
+    roots = [os.path.realpath(r) for r in _jobs_cfg.get('allowed_roots', ["data/"])]
+    if not any(path == r or path.startswith(r + os.sep) for r in roots):
+        raise HTTPException(status_code=400, detail="path is outside the allowed data directories")
+    if not os.path.isfile(path) or not path.endswith((".parquet", ".csv")):
+        raise HTTPException(status_code=400, detail="path must be an existing .parquet or .csv file")
+    try:
+        job_id = await run_in_threadpool(job_queue.create_job, path, req.text_column)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read {req.text_column!r}: {e}")
+    return job_queue.progress(job_id)
+
+
+@app.post("/jobs/upload")
+async def create_job_upload(file: UploadFile = File(...), text_column: str = "text"):
+    """Queue an uploaded parquet/CSV file for bulk scoring."""
+    _require_jobs()
+    suffix = Path(file.filename).suffix.lower()
+    if suffix not in (".parquet", ".csv"):
+        raise HTTPException(status_code=400, detail="Upload a .parquet or .csv file")
+    upload_dir = os.path.join(_jobs_cfg.get('data_dir', "data/jobs/"), "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}{suffix}")
+    with open(path, "wb") as out:
+        while chunk := await file.read(1 << 20):
+            out.write(chunk)
+    try:
+        job_id = await run_in_threadpool(job_queue.create_job, path, text_column)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read {text_column!r}: {e}")
+    return job_queue.progress(job_id)
+
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    _require_jobs()
+    return job_queue.list_jobs(limit)
+
+
+@app.get("/jobs/{job_id}")
+async def job_progress(job_id: str):
+    """Status, per-status item counts and fraction of rows scored; `output_path` once done."""
+    _require_jobs()
+    progress = job_queue.progress(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return progress
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    _require_jobs()
+    if job_queue.progress(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    job_queue.cancel(job_id)
+    return job_queue.progress(job_id)
 
 # ─── Run with `python scripts/api_server.py` ───────────────────────────────
 if __name__ == "__main__":
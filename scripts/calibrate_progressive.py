@@ -0,0 +1,63 @@
+"""
+Calibrate progressive-length inference.
+
+Scores the validation split at every prefix length in `inference.progressive.lengths`
+(one tokenization per text), picks the per-length margin thresholds that keep
+accuracy within `max_accuracy_drop` of full-length inference, and saves them to
+`inference.progressive.thresholds_path`. Then reports, on the test split, the
+fraction of texts answered at each length, the fraction that needed the full
+length and the compute relative to always running the full length.
+
+Usage (from the repository root):
+    python scripts/calibrate_progressive.py
+"""
+import numpy as np
+import yaml
+
+from utils import data_utils, progressive
+from utils.dashboard_utils import load_final_model
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+
+def main():
+    prog_cfg = config['inference'].get('progressive', {})
+    label_mapping = config['model']['label_mapping']
+    lengths = prog_cfg.get('lengths', [128, 256, 512])
+    max_drop = float(prog_cfg.get('max_accuracy_drop', 0.005))
+
+    # The final model's own split: its val/test rows must be unseen by it
+    final_dir = config['paths']['model_dirs']['final']
+    val_df  = data_utils.load_split('val', columns=['text', 'label'], model_dir=final_dir)
+    test_df = data_utils.load_split('test', columns=['text', 'label'], model_dir=final_dir)
+    tokenizer, model = load_final_model()
+
+    print(f"⏳ Scoring {len(val_df)} validation texts at lengths {lengths} …")
+    predictor = progressive.ProgressivePredictor(tokenizer, model, lengths)
+    per_length, token_counts = predictor.logits_per_length(val_df['text'].tolist())
+    val_true = np.array([label_mapping[l] for l in val_df['label']])
+    for length, logits in zip(lengths, per_length):
+        print(f"  {length:>4} tokens: val accuracy {np.mean(logits.argmax(axis=1) == val_true):.4f}")
+
+    thresholds = progressive.calibrate_thresholds(per_length, token_counts, val_true, lengths, max_drop)
+    print("Calibrated margin thresholds: "
+          + ", ".join(f"{L}: {t:.4f}" for L, t in zip(lengths[:-1], thresholds)))
+
+    # ── Held-out check on test ──────────────────────────────────────────
+    predictor = progressive.ProgressivePredictor(tokenizer, model, lengths, thresholds)
+    test_true = np.array([label_mapping[l] for l in test_df['label']])
+    logits, _used = predictor.logits(test_df['text'].tolist())
+    stats = predictor.stats()
+    stats["test_accuracy"] = float(np.mean(logits.argmax(axis=1) == test_true))
+    for length, share in stats["answered_at"].items():
+        print(f"  answered at {length:>4} tokens: {share:.1%}")
+    print(f"Test: accuracy {stats['test_accuracy']:.4f}, {stats['full_length_rate']:.1%} needed the full length, "
+          f"{stats['relative_compute']:.0%} of full-length compute")
+
+    progressive.save_thresholds(lengths, thresholds, report=stats)
+    print(f"✅ Saved thresholds to {prog_cfg.get('thresholds_path', 'diagrams/progressive_thresholds.json')}")
+
+
+if __name__ == "__main__":
+    main()
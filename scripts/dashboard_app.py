@@ -68,6 +68,8 @@ def render_tab(tab):
 # Inference callback (same as in the notebook)
 import torch, numpy as np
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from utils.runtime import apply_runtime_config
+apply_runtime_config()
 model_path = os.path.join(os.path.dirname(__file__), '..', 'diagrams', 'final_model')
 tokenizer  = AutoTokenizer.from_pretrained(model_path)
 model      = AutoModelForSequenceClassification.from_pretrained(model_path)
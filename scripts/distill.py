@@ -0,0 +1,136 @@
+"""
+Knowledge distillation: train a small, fast student detector from the final model.
+
+1. Scores the train split once with the teacher (diagrams/final_model) to get soft targets.
+2. Trains a compact student (sizes under `distillation.student` in config.yaml) with
+   DistillationTrainer, mixing KL-to-teacher and hard-label loss.
+3. Reports student vs teacher macro-F1 and texts/s on the test split and saves the
+   student to `paths.model_dirs.student`, loadable with load_final_model(model_dir=...).
+
+Usage (from the repository root):
+    python scripts/distill.py
+"""
+import json
+import logging
+import os
+
+import numpy as np
+import yaml
+from transformers import TrainingArguments, EarlyStoppingCallback
+
+from utils import data_utils, model_utils
+from utils.dashboard_utils import load_final_model
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+
+def main():
+    logging.basicConfig(
+        filename=config['paths']['log_file'],
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s: %(message)s"
+    )
+    distill_cfg = config['distillation']
+    label_mapping = config['model']['label_mapping']
+    max_len = config['training']['max_length']['bert_roberta']
+
+    # The teacher's own split, so the test comparison only uses rows it never trained on
+    teacher_dir = config['paths']['model_dirs']['final']
+    train_df = data_utils.load_split('train', columns=['text', 'label'], model_dir=teacher_dir)
+    val_df   = data_utils.load_split('val', columns=['text', 'label'], model_dir=teacher_dir)
+    test_df  = data_utils.load_split('test', columns=['text', 'label'], model_dir=teacher_dir)
+    print(f"Data sizes → train: {len(train_df)}, val: {len(val_df)}, test: {len(test_df)}")
+
+    # ── Teacher soft targets over the train split (computed once) ────────────
+    tokenizer, teacher = load_final_model()
+    print("⏳ Scoring train split with the teacher …")
+    teacher_logits = model_utils.compute_logits(
+        train_df['text'].tolist(), tokenizer, teacher, max_length=max_len
+    )
+
+    # ── Class weights for the hard-label part of the loss ─────────────────
+    labels, counts = np.unique(train_df['label'], return_counts=True)
+    inv_freq = (1.0 / counts) * np.mean(counts)
+    weight_list = [0.0] * len(inv_freq)
+    for lab, w in zip(labels, inv_freq):
+        weight_list[label_mapping[lab]] = float(w)
+
+    # ── Student (shares the teacher's tokenizer/vocabulary) ───────────────
+    student = model_utils.build_student_model(teacher, **distill_cfg['student'])
+    n_student = sum(p.numel() for p in student.parameters())
+    n_teacher = sum(p.numel() for p in teacher.parameters())
+    print(f"Student: {n_student / 1e6:.1f}M params (teacher {n_teacher / 1e6:.1f}M)")
+
+    train_enc = tokenizer(train_df['text'].tolist(), padding=True, truncation=True, max_length=max_len)
+    val_enc   = tokenizer(val_df['text'].tolist(), padding=True, truncation=True, max_length=max_len)
+    train_dataset = model_utils.TextDataset(
+        train_enc, [label_mapping[l] for l in train_df['label']], teacher_logits=teacher_logits
+    )
+    val_dataset = model_utils.TextDataset(val_enc, [label_mapping[l] for l in val_df['label']])
+
+    student_dir = config['paths']['model_dirs']['student']
+    training_args = TrainingArguments(
+        output_dir                  = student_dir,
+        num_train_epochs            = int(distill_cfg['epochs']),
+        per_device_train_batch_size = int(distill_cfg['batch_size']),
+        per_device_eval_batch_size  = int(distill_cfg['batch_size']),
+        learning_rate               = float(distill_cfg['learning_rate']),
+
+        evaluation_strategy         = "epoch",
+        save_strategy               = "epoch",
+        load_best_model_at_end      = True,
+        metric_for_best_model       = "f1",
+
+        logging_strategy            = "steps",
+        logging_steps               = 250,
+        report_to                   = "none",
+        dataloader_pin_memory       = False,
+        remove_unused_columns       = False   # keep `teacher_logits` in the batches
+    )
+    trainer = model_utils.DistillationTrainer(
+        model           = student,
+        args            = training_args,
+        train_dataset   = train_dataset,
+        eval_dataset    = val_dataset,
+        compute_metrics = model_utils.compute_metrics,
+        callbacks       = [
+            EarlyStoppingCallback(
+                early_stopping_patience=int(config['training']['early_stopping_patience'])
+            )
+        ],
+        use_focal       = bool(config['training']['use_focal_loss']),
+        alpha           = weight_list,
+        temperature     = float(distill_cfg['temperature']),
+        distill_alpha   = float(distill_cfg['alpha'])
+    )
+    print("⏳ Distilling student …")
+    trainer.train()
+
+    os.makedirs(student_dir, exist_ok=True)
+    trainer.model.save_pretrained(student_dir)
+    tokenizer.save_pretrained(student_dir)
+    data_utils.write_split_record(student_dir, data_utils.read_split_record(teacher_dir))
+    print(f"✅ Saved student to {student_dir}")
+
+    # ── Student vs teacher on the test split ─────────────────────────────
+    test_texts = test_df['text'].tolist()
+    test_labels = [label_mapping[l] for l in test_df['label']]
+    _, student_loaded = load_final_model(model_dir=student_dir)
+    report = {
+        "teacher": model_utils.evaluate_speed_and_f1(teacher, tokenizer, test_texts, test_labels, max_length=max_len),
+        "student": model_utils.evaluate_speed_and_f1(student_loaded, tokenizer, test_texts, test_labels, max_length=max_len),
+    }
+    report["speedup"] = report["student"]["texts_per_s"] / max(report["teacher"]["texts_per_s"], 1e-9)
+    for name in ("teacher", "student"):
+        r = report[name]
+        print(f"{name:>8}: macro-F1 {r['f1']:.4f}  accuracy {r['accuracy']:.4f}  {r['texts_per_s']:.1f} texts/s")
+    print(f" speedup: {report['speedup']:.2f}x")
+
+    with open(os.path.join(student_dir, "distillation_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Distillation report → {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Allows users to input text and get a prediction from the trained model.
 import argparse
 import json
 from utils import dashboard_utils
+from utils.runtime import apply_runtime_config
 
 def main():
     parser = argparse.ArgumentParser(description="AI Text Detector Inference")
@@ -16,6 +17,9 @@ def main():
                         help="File path to save the prediction result as JSON.")
     args = parser.parse_args()
 
+    # Size torch thread pools before the model is built
+    apply_runtime_config()
+
     # Load the tokenizer and model from the specified directory
     tokenizer = dashboard_utils.AutoTokenizer.from_pretrained(args.model_dir)
     model = dashboard_utils.AutoModelForSequenceClassification.from_pretrained(args.model_dir)
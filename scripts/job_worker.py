@@ -0,0 +1,113 @@
+"""
+Bulk-scoring worker for the /jobs queue (utils/job_queue.py).
+
+Leases work items, scores their rows in batches (through the cascade when it is
+enabled, else the transformer), writes one result shard per item and renews
+its lease between batches. Start as many as the box (or several boxes sharing
+the repository directory) can take; each worker is independent.
+
+Usage (from the repository root):
+    python scripts/job_worker.py                # run until interrupted
+    python scripts/job_worker.py --once         # exit when the queue is empty
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from utils import cascade
+from utils.dashboard_utils import load_final_model, predict_batch
+from utils.job_queue import JobQueue, get_jobs_config, merge_shards, read_rows, shard_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score /jobs work items")
+    parser.add_argument('--once', action='store_true', help="Exit when no work is left instead of polling.")
+    return parser.parse_args()
+
+
+def score_item(item, queue, scorer, batch_size):
+    """
+    Score one leased item and write its shard.
+    Returns:
+        bool: False if the lease was lost or the job cancelled part-way.
+    """
+    texts = read_rows(item["source"], item["text_column"], item["start_row"], item["end_row"])
+    labels, confidences = [], []
+    for start in range(0, len(texts), batch_size):
+        for label, confs in scorer(texts[start:start + batch_size]):
+            labels.append(label)
+            confidences.append(confs[label])
+        if not queue.heartbeat(item):
+            return False
+
+    path = shard_path(item["job_id"], item["item_id"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.DataFrame({
+        "row": range(item["start_row"], item["start_row"] + len(texts)),
+        "predicted_label": labels,
+        "confidence": confidences,
+    }).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return True
+
+
+def main():
+    args = parse_args()
+    jobs_cfg = get_jobs_config()
+    batch_size = jobs_cfg.get('batch_size', 32)
+    poll_seconds = jobs_cfg.get('poll_seconds', 2)
+
+    tokenizer, model = load_final_model()
+    if cascade.is_enabled():
+        predictor = cascade.load_cascade(tokenizer, model)
+        scorer = lambda texts: [(label, confs) for label, confs, _ in predictor.predict(texts, batch_size)]
+    else:
+        scorer = lambda texts: predict_batch(texts, tokenizer, model, batch_size=batch_size)
+
+    queue = JobQueue()
+    print(f"🤖 Worker {os.getpid()} ready (queue: {queue.db_path})")
+    while True:
+        item = queue.lease()
+        if item is None:
+            if args.once:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        tag = f"{item['job_id']}#{item['item_id']}"
+        try:
+            if not score_item(item, queue, scorer, batch_size):
+                print(f"⚠️ {tag}: lease lost or job cancelled, dropping")
+                continue
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(item, f"{type(e).__name__}: {e}")
+            print(f"❌ {tag} failed (attempt {item['attempts'] + 1})")
+            continue
+
+        if queue.complete(item):
+            # No other worker will merge this job, so a failed merge must fail the job
+            try:
+                out_path = merge_shards(item["job_id"])
+            except Exception as e:
+                traceback.print_exc()
+                queue.fail_job(item["job_id"], f"merging results: {type(e).__name__}: {e}")
+                print(f"❌ Job {item['job_id']} failed while merging results")
+                continue
+            queue.finish(item["job_id"], out_path)
+            print(f"✅ Job {item['job_id']} done → {out_path}")
+        else:
+            print(f"✔ {tag} rows {item['start_row']}–{item['end_row']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Structured pruning of the final model with a speed/accuracy table.
+
+For each cumulative level under `pruning.steps` in config.yaml:
+1. Scores layer and head importance on a validation sample (utils/pruning.py).
+2. Drops the least important layers and heads.
+3. Briefly re-fine-tunes with CustomTrainer (weighted CE / focal loss as in training).
+4. Measures macro-F1 and CPU texts/s on the test split and saves the model to
+   `<output_dir>/level_<k>/`, loadable with load_final_model(model_dir=...).
+
+The table (level, layers, heads, params, macro-F1, texts/s, speedup) is printed and
+written to `<output_dir>/pruning_report.csv`, to pick a level for a latency target.
+
+Usage (from the repository root):
+    python scripts/prune_model.py
+    python scripts/prune_model.py --model-dir diagrams/roberta/ --no-finetune
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import yaml
+from transformers import TrainingArguments, DataCollatorWithPadding
+
+from utils import data_utils, model_utils, pruning
+from utils.dashboard_utils import load_final_model
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+
+def parse_args():
+    prune_cfg = config.get('pruning', {})
+    parser = argparse.ArgumentParser(description="Prune attention heads and layers of the final model")
+    parser.add_argument('--model-dir', type=str, default=None,
+                        help="Model to prune (default: paths.model_dirs.final).")
+    parser.add_argument('--output-dir', type=str,
+                        default=prune_cfg.get('output_dir', "diagrams/pruned_model/"))
+    parser.add_argument('--no-finetune', action='store_true', help="Skip the re-fine-tuning after each step.")
+    parser.add_argument('--eval-samples', type=int, default=int(prune_cfg.get('eval_samples', 2000)))
+    return parser.parse_args()
+
+
+def class_weights(labels, label_mapping):
+    """Inverse-frequency class weights, as in scripts/train_model.py."""
+    names, counts = np.unique(labels, return_counts=True)
+    inv_freq = (1.0 / counts) * np.mean(counts)
+    weight_list = [0.0] * len(label_mapping)
+    for name, w in zip(names, inv_freq):
+        weight_list[label_mapping[name]] = float(w)
+    return weight_list
+
+
+def finetune(model, tokenizer, train_df, label_mapping, max_len, output_dir, prune_cfg):
+    """Short recovery fine-tune of a pruned model; returns the trained model."""
+    train_enc = model_utils.cached_tokenize(tokenizer, train_df['text'].tolist(), max_len)
+    train_dataset = model_utils.TextDataset(train_enc, [label_mapping[l] for l in train_df['label']])
+    training_args = TrainingArguments(
+        output_dir                  = output_dir,
+        num_train_epochs            = float(prune_cfg.get('finetune_epochs', 1)),
+        per_device_train_batch_size = int(prune_cfg.get('batch_size', 16)),
+        learning_rate               = float(prune_cfg.get('finetune_learning_rate', 2e-5)),
+        save_strategy               = "no",
+        logging_strategy            = "steps",
+        logging_steps               = 250,
+        report_to                   = "none",
+        dataloader_pin_memory       = False,
+    )
+    trainer = model_utils.CustomTrainer(
+        model           = model,
+        args            = training_args,
+        train_dataset   = train_dataset,
+        data_collator   = DataCollatorWithPadding(tokenizer),
+        use_focal       = bool(config['training']['use_focal_loss']),
+        alpha           = class_weights(train_df['label'], label_mapping),
+    )
+    trainer.train()
+    return trainer.model
+
+
+def evaluate(model, tokenizer, test_df, label_mapping, max_len, batch_size):
+    """Macro-F1 and texts/s on CPU (the deployment target)."""
+    device = next(model.parameters()).device
+    model.to("cpu")
+    scores = model_utils.evaluate_speed_and_f1(
+        model, tokenizer, test_df['text'].tolist(), [label_mapping[l] for l in test_df['label']],
+        max_length=max_len, batch_size=batch_size
+    )
+    model.to(device)
+    return scores
+
+
+def main():
+    args = parse_args()
+    prune_cfg = config.get('pruning', {})
+    label_mapping = config['model']['label_mapping']
+    max_len = config['inference']['max_length']
+    batch_size = int(prune_cfg.get('batch_size', 16))
+
+    source_dir = args.model_dir or config['paths']['model_dirs']['final']
+    tokenizer, model = load_final_model(model_dir=source_dir)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model.to(device)
+
+    # The source model's own split: importance and F1 must not use rows it trained on
+    val_df = data_utils.load_split('val', columns=['text', 'label'], model_dir=source_dir)
+    val_df = val_df.sample(n=min(int(prune_cfg.get('score_samples', 512)), len(val_df)), random_state=42)
+    test_df = data_utils.load_split('test', columns=['text', 'label'], model_dir=source_dir)
+    test_df = test_df.sample(n=min(args.eval_samples, len(test_df)), random_state=42)
+    train_df = None
+    if not args.no_finetune:
+        train_df = data_utils.load_split('train', columns=['text', 'label'], model_dir=source_dir)
+        n_train = int(prune_cfg.get('finetune_samples', 20000))
+        train_df = train_df.sample(n=min(n_train, len(train_df)), random_state=42)
+
+    # The scoring sample is tokenized once and reused by every importance pass
+    batches = pruning.make_batches(
+        tokenizer, val_df['text'].tolist(), [label_mapping[l] for l in val_df['label']],
+        max_length=int(prune_cfg.get('score_max_length', 256)), batch_size=batch_size
+    )
+
+    n_layers = model.config.num_hidden_layers
+    n_heads = model.config.num_attention_heads
+    rows = []
+
+    def record(level, step, removed):
+        scores = evaluate(model, tokenizer, test_df, label_mapping, max_len, batch_size)
+        heads = pruning.remaining_heads(model)
+        rows.append({
+            "level": level,
+            "target_heads_pruned": step.get('heads', 0.0),
+            "layers": len(heads),
+            "heads": int(sum(heads)),
+            "params_m": round(sum(p.numel() for p in model.parameters()) / 1e6, 1),
+            "f1": scores['f1'],
+            "accuracy": scores['accuracy'],
+            "texts_per_s": scores['texts_per_s'],
+            "removed": json.dumps(removed),
+        })
+        r = rows[-1]
+        print(f"  level {level}: {r['layers']} layers, {r['heads']}/{n_layers * n_heads} heads, "
+              f"macro-F1 {r['f1']:.4f}, {r['texts_per_s']:.1f} texts/s")
+
+    print("⏳ Measuring the unpruned model …")
+    record(0, {}, {})
+
+    for level, step in enumerate(pruning.get_steps(), start=1):
+        print(f"✂️  Level {level}: {step}")
+        t0 = time.time()
+        removed = pruning.prune_step(
+            model, batches, head_fraction=float(step.get('heads', 0.0)),
+            keep_layers=n_layers - int(step.get('layers', 0))
+        )
+        if train_df is not None:
+            model = finetune(model, tokenizer, train_df, label_mapping, max_len,
+                             os.path.join(args.output_dir, "_finetune"), prune_cfg)
+        model.eval()
+        level_dir = os.path.join(args.output_dir, f"level_{level}")
+        os.makedirs(level_dir, exist_ok=True)
+        model.save_pretrained(level_dir)
+        tokenizer.save_pretrained(level_dir)
+        data_utils.write_split_record(level_dir, data_utils.read_split_record(source_dir))
+        print(f"  pruned + fine-tuned in {(time.time() - t0) / 60:.1f} min → {level_dir}")
+        record(level, step, removed)
+
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["texts_per_s"] / report.loc[0, "texts_per_s"]
+    report_path = os.path.join(args.output_dir, "pruning_report.csv")
+    report.to_csv(report_path, index=False)
+    print(report.drop(columns=["removed"]).to_string(index=False))
+    print(f"✅ Report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Run the training matrix (models x hyperparameter grid) as parallel trials.
+
+Each trial is a `scripts/train_model.py` subprocess. Trials are started as long
+as the running ones fit within the CPU budget (`threads_per_trial` cores each)
+and the memory budget (`memory_gb` per model), all from the `experiments`
+section of config.yaml. All trials share one tokenization cache. A trial is
+pruned when its validation F1 trails the best sibling at the same epoch for
+`training.early_stopping_patience` evaluations in a row.
+
+Results go to `<output_dir>/leaderboard.csv`: validation/test F1,
+training time and inference texts/s per trial, flagging the Pareto-optimal
+trials, so the best-value model can be picked rather than only the most accurate.
+
+Usage (from the repository root):
+    python scripts/run_experiments.py
+    python scripts/run_experiments.py --models bert roberta --dry-run
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+exp_cfg = config.get('experiments', {})
+
+# Grid keys → train_model.py flags
+_GRID_FLAGS = {"learning_rate": "--learning-rate", "batch_size": "--batch-size", "epochs": "--epochs"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the model x hyperparameter training matrix")
+    parser.add_argument('--models', nargs='+', default=exp_cfg.get('models', ["bert", "roberta", "longformer"]))
+    parser.add_argument('--output-dir', type=str, default=exp_cfg.get('output_dir', "runs/experiments/"))
+    parser.add_argument('--dry-run', action='store_true', help="Only list the trials that would run.")
+    return parser.parse_args()
+
+
+def build_trials(models, grid):
+    """
+    Expand models x grid into trial specs.
+    Returns:
+        list of dict: {'trial_id', 'model', 'params'} per trial.
+    """
+    unknown = set(grid) - set(_GRID_FLAGS)
+    if unknown:
+        raise ValueError(f"Unsupported grid keys: {sorted(unknown)} (supported: {sorted(_GRID_FLAGS)})")
+    keys = sorted(grid)
+    trials = []
+    for model in models:
+        for values in itertools.product(*(grid[k] for k in keys)):
+            params = dict(zip(keys, values))
+            suffix = "_".join(f"{k}{v}" for k, v in params.items())
+            trials.append({"trial_id": f"{model}_{suffix}" if suffix else model,
+                           "model": model, "params": params})
+    return trials
+
+
+def _trial_command(trial, run_dir, token_cache):
+    cmd = [sys.executable, str(BASE_DIR / "scripts" / "train_model.py"),
+           "--model", trial["model"],
+           "--output-dir", os.path.join(run_dir, trial["trial_id"]),
+           "--token-cache", token_cache,
+           "--run-dir", run_dir,
+           "--trial-id", trial["trial_id"],
+           "--prune-margin", str(float(exp_cfg.get('prune_margin', 0.02))),
+           "--throughput-sample", str(int(exp_cfg.get('throughput_sample', 500)))]
+    for key, value in trial["params"].items():
+        cmd += [_GRID_FLAGS[key], str(value)]
+    return cmd
+
+
+def run_trials(trials, run_dir):
+    """
+    Launch trials as subprocesses within the CPU and memory budgets.
+    Returns:
+        dict: trial_id → (return code, wall seconds).
+    """
+    threads = int(exp_cfg.get('threads_per_trial', 4))
+    cpu_budget = int(exp_cfg.get('cpu_budget', 0)) or (os.cpu_count() or 1)
+    mem_budget = float(exp_cfg.get('memory_budget_gb', 32))
+    mem_per_model = exp_cfg.get('memory_gb', {})
+    token_cache = os.path.join(run_dir, "token_cache")
+    logs_dir = os.path.join(run_dir, "logs")
+    os.makedirs(logs_dir, exist_ok=True)
+
+    env = {**os.environ, "OMP_NUM_THREADS": str(threads), "MKL_NUM_THREADS": str(threads),
+           "TOKENIZERS_PARALLELISM": "false", "PYTHONPATH": str(BASE_DIR)}
+    pending = list(trials)
+    running = {}   # trial_id → (Popen, start, threads, mem_gb, log handle)
+    results = {}
+
+    while pending or running:
+        used_cpu = sum(r[2] for r in running.values())
+        used_mem = sum(r[3] for r in running.values())
+        for trial in list(pending):
+            need_mem = float(mem_per_model.get(trial["model"], 8))
+            # Always allow one trial so an over-budget model still runs (alone)
+            if running and (used_cpu + threads > cpu_budget or used_mem + need_mem > mem_budget):
+                continue
+            log = open(os.path.join(logs_dir, f"{trial['trial_id']}.log"), "w")
+            proc = subprocess.Popen(_trial_command(trial, run_dir, token_cache), cwd=str(BASE_DIR),
+                                    env=env, stdout=log, stderr=subprocess.STDOUT)
+            running[trial["trial_id"]] = (proc, time.time(), threads, need_mem, log)
+            used_cpu += threads
+            used_mem += need_mem
+            pending.remove(trial)
+            print(f"⏳ Started {trial['trial_id']} (pid {proc.pid}); {len(pending)} pending")
+
+        time.sleep(2)
+        for trial_id, (proc, start, _, _, log) in list(running.items()):
+            if proc.poll() is None:
+                continue
+            log.close()
+            results[trial_id] = (proc.returncode, time.time() - start)
+            del running[trial_id]
+            status = "✅" if proc.returncode == 0 else "❌"
+            print(f"{status} {trial_id} finished in {(time.time() - start) / 60:.1f} min")
+    return results
+
+
+def pareto_front(df, maximize=("val_f1", "texts_per_s"), minimize=("train_minutes",)):
+    """Boolean mask of rows no other row beats on every objective."""
+    values = df[list(maximize)].to_numpy(dtype=float)
+    costs = df[list(minimize)].to_numpy(dtype=float)
+    mask = []
+    for i in range(len(df)):
+        dominated = (
+            (values >= values[i]).all(axis=1) & (costs <= costs[i]).all(axis=1)
+            & ((values > values[i]).any(axis=1) | (costs < costs[i]).any(axis=1))
+        )
+        mask.append(not dominated.any())
+    return mask
+
+
+def build_leaderboard(trials, results, run_dir):
+    """Collect each trial's train_metrics.json into a leaderboard DataFrame."""
+    rows = []
+    for trial in trials:
+        trial_dir = os.path.join(run_dir, trial["trial_id"])
+        code, wall = results.get(trial["trial_id"], (None, None))
+        row = {"trial": trial["trial_id"], "model": trial["model"], **trial["params"]}
+        metrics_path = os.path.join(trial_dir, "train_metrics.json")
+        if code == 0 and os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                m = json.load(f)
+            row.update({
+                "status": "pruned" if m.get("pruned") else "done",
+                "val_f1": m.get("eval_f1"),
+                "test_f1": m.get("test_f1"),
+                "train_minutes": m.get("train_seconds", wall) / 60,
+                "texts_per_s": m.get("test_texts_per_s"),
+            })
+        else:
+            row.update({"status": "failed", "val_f1": None, "test_f1": None,
+                        "train_minutes": (wall or 0) / 60, "texts_per_s": None})
+        rows.append(row)
+
+    board = pd.DataFrame(rows)
+    ok = board["status"] != "failed"
+    board["pareto"] = False
+    if ok.any():
+        scored = board[ok].fillna({"texts_per_s": 0.0})
+        board.loc[ok, "pareto"] = pareto_front(scored)
+    return board.sort_values("val_f1", ascending=False, na_position="last").reset_index(drop=True)
+
+
+def main():
+    args = parse_args()
+    grid = {k: list(v) for k, v in (exp_cfg.get('grid') or {}).items()}
+    trials = build_trials(args.models, grid)
+    print(f"Training matrix: {len(trials)} trials → {args.output_dir}")
+    if args.dry_run:
+        for trial in trials:
+            print(f"  {trial['trial_id']}: {trial['params']}")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if config.get('splits', {}).get('use_manifest', False) and os.path.exists(config['paths']['cleaned_data']):
+        # Build the split manifest once instead of in every concurrently starting trial
+        from utils import data_utils
+        data_utils.get_split_manifest()
+    results = run_trials(trials, args.output_dir)
+    board = build_leaderboard(trials, results, args.output_dir)
+
+    board.to_csv(os.path.join(args.output_dir, "leaderboard.csv"), index=False)
+    print(board.to_string(index=False))
+    print(f"✅ Leaderboard saved to {os.path.join(args.output_dir, 'leaderboard.csv')}")
+
+
+if __name__ == "__main__":
+    main()
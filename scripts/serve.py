@@ -0,0 +1,197 @@
+"""
+Serving launcher for the inference API.
+
+In `prefork` mode (inference.serving.mode in config.yaml) the parent process
+imports api_server.py, so the model is loaded exactly once, freezes it for
+inference and then forks `inference.runtime.workers` workers. The workers
+share the weight pages copy-on-write and all accept on one listening socket.
+In `uvicorn` mode every worker imports api_server.py and loads its own copy
+(the launcher itself never loads the model). `python scripts/api_server.py`
+only serves a single worker.
+
+A few seconds after startup the launcher prints a per-process memory report from
+/proc/<pid>/smaps_rollup (Linux). PSS splits shared pages between the processes
+that map them, so the PSS sum is what the whole server really costs.
+
+Note: Prometheus counters are per worker; each /metrics scrape hits one worker.
+
+Usage (from the repository root):
+    python scripts/serve.py
+    python scripts/serve.py --workers 4 --mode prefork
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / "scripts"))
+
+from utils.runtime import apply_runtime_config, get_runtime_config
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+serving_cfg = config.get('inference', {}).get('serving', {})
+
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the AI text detector API")
+    parser.add_argument('--mode', choices=["prefork", "uvicorn"], default=serving_cfg.get('mode', "prefork"))
+    parser.add_argument('--workers', type=int, default=get_runtime_config()['workers'])
+    parser.add_argument('--host', type=str, default=serving_cfg.get('host', "127.0.0.1"))
+    parser.add_argument('--port', type=int, default=serving_cfg.get('port', 8000))
+    return parser.parse_args()
+
+
+def process_memory(pid):
+    """
+    Memory counters of a process from /proc/<pid>/smaps_rollup, in MiB.
+    Returns None where smaps_rollup is unavailable (non-Linux, process gone).
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    usage = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        if key in _SMAPS_FIELDS:
+            usage[key] = int(rest.split()[0]) / 1024   # kB → MiB
+    return usage
+
+
+def print_memory_report(parent_pid, worker_pids):
+    """Print RSS/PSS/shared/private memory for the parent and every worker."""
+    rows = [("parent", parent_pid)] + [(f"worker {i}", pid) for i, pid in enumerate(worker_pids)]
+    print(f"{'process':>10} {'pid':>8} {'RSS':>9} {'PSS':>9} {'shared':>9} {'private':>9}  (MiB)")
+    total_pss = 0.0
+    for name, pid in rows:
+        usage = process_memory(pid)
+        if usage is None:
+            print(f"{name:>10} {pid:>8}  (smaps_rollup unavailable)")
+            continue
+        shared = usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0)
+        private = usage.get("Private_Clean", 0) + usage.get("Private_Dirty", 0)
+        total_pss += usage.get("Pss", 0)
+        print(f"{name:>10} {pid:>8} {usage.get('Rss', 0):9.1f} {usage.get('Pss', 0):9.1f} "
+              f"{shared:9.1f} {private:9.1f}")
+    if worker_pids:
+        print(f"📊 Total PSS {total_pss:.1f} MiB → {total_pss / len(worker_pids):.1f} MiB per worker")
+
+
+def freeze_for_inference(model):
+    """
+    Make the loaded model safe to share across forks: no autograd state, and no
+    later writes to the parameter tensors. gc.freeze() moves every object that
+    exists now into a permanent generation, so the workers' garbage collector
+    never writes to (and so never copies) the pages those objects live on.
+    """
+    model.eval()
+    for param in model.parameters():
+        param.requires_grad_(False)
+    gc.collect()
+    gc.freeze()
+
+
+def _bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock, worker_index, workers):
+    """Body of a forked worker: re-apply threads/pinning for this slot, then serve."""
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    apply_runtime_config({'workers': workers}, worker_index=worker_index)
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+    os._exit(0)
+
+
+def serve_prefork(host, port, workers):
+    """Load the model once, fork `workers` workers sharing it and supervise them."""
+    # The parent never runs a forward pass; keep it unpinned and let each worker
+    # size its own thread pool (and claim its own core block) after the fork.
+    apply_runtime_config({'workers': workers, 'cpu_pinning': False})
+
+    print("⏳ Loading model in the parent process …")
+    import api_server
+    freeze_for_inference(api_server.model)
+
+    sock = _bind_socket(host, port)
+    print(f"✅ Listening on http://{host}:{port} with {workers} pre-forked workers")
+
+    children = {}
+
+    def spawn(worker_index):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(api_server.app, sock, worker_index, workers)
+        children[pid] = worker_index
+
+    for i in range(workers):
+        spawn(i)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    report_at = time.monotonic() + serving_cfg.get('memory_report_delay', 10)
+    reported = serving_cfg.get('memory_report_delay', 10) <= 0
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            worker_index = children.pop(pid)
+            if not stopping:
+                print(f"⚠️ Worker {worker_index} (pid {pid}) exited with status {status}; restarting")
+                spawn(worker_index)
+            continue
+        if not reported and time.monotonic() >= report_at:
+            print_memory_report(os.getpid(), sorted(children, key=children.get))
+            reported = True
+        time.sleep(0.5)
+    sock.close()
+
+
+def main():
+    args = parse_args()
+    if args.mode == "prefork" and hasattr(os, "fork"):
+        serve_prefork(args.host, args.port, max(1, args.workers))
+    else:
+        import uvicorn
+        # One model copy per worker (the only option where fork is unavailable)
+        uvicorn.run("api_server:app", host=args.host, port=args.port, log_level="info",
+                    workers=max(1, args.workers), app_dir=str(BASE_DIR / "scripts"))
+
+
+if __name__ == "__main__":
+    main()
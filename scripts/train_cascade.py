@@ -0,0 +1,63 @@
+"""
+Train and calibrate the first stage of the inference cascade.
+
+Fits the cheap stylometric + hashed n-gram classifier on the train split, then
+calibrates its margin threshold on the validation split so the combined cascade
+holds `cascade.target_accuracy`, and reports the escalation rate on val and test.
+
+Usage (from the repository root):
+    python scripts/train_cascade.py
+"""
+import numpy as np
+import yaml
+
+from utils import cascade, data_utils
+from utils.dashboard_utils import load_final_model, predict_batch
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+
+def main():
+    cascade_cfg = config['cascade']
+    label_mapping = config['model']['label_mapping']
+
+    # The final model's own split: its val/test rows must be unseen by it
+    final_dir = config['paths']['model_dirs']['final']
+    train_df = data_utils.load_split('train', columns=['text', 'label'], model_dir=final_dir)
+    val_df   = data_utils.load_split('val', columns=['text', 'label'], model_dir=final_dir)
+    test_df  = data_utils.load_split('test', columns=['text', 'label'], model_dir=final_dir)
+
+    print("⏳ Fitting first stage on the train split …")
+    first_stage = cascade.FirstStageClassifier(
+        n_features=int(cascade_cfg['n_features']), ngram_range=cascade_cfg['ngram_range']
+    ).fit(train_df['text'].tolist(), [label_mapping[l] for l in train_df['label']])
+
+    # ── Calibrate on val against the transformer's own correctness ───────
+    tokenizer, model = load_final_model()
+    val_texts = val_df['text'].tolist()
+    val_true = np.array([label_mapping[l] for l in val_df['label']])
+    val_probs = first_stage.predict_proba(val_texts)
+    first_correct = val_probs.argmax(axis=1) == val_true
+    second_pred = np.array([label_mapping[label] for label, _ in predict_batch(val_texts, tokenizer, model)])
+    second_correct = second_pred == val_true
+
+    threshold, val_escalation = cascade.calibrate_threshold(
+        cascade.top2_margin(val_probs), first_correct,
+        float(cascade_cfg['target_accuracy']), second_correct=second_correct
+    )
+    print(f"First stage alone: val accuracy {first_correct.mean():.4f}; transformer: {second_correct.mean():.4f}")
+    print(f"Calibrated margin threshold {threshold:.4f} → val escalation rate {val_escalation:.1%}")
+    cascade.save_first_stage(first_stage, threshold)
+    print(f"✅ Saved first stage to {cascade_cfg['first_stage_path']}")
+
+    # ── Held-out check on test ──────────────────────────────────────────
+    predictor = cascade.CascadePredictor(first_stage, threshold, tokenizer, model)
+    test_pred = [label_mapping[label] for label, _, _ in predictor.predict(test_df['text'].tolist())]
+    test_true = [label_mapping[l] for l in test_df['label']]
+    test_acc = float(np.mean(np.array(test_pred) == np.array(test_true)))
+    print(f"Test: cascade accuracy {test_acc:.4f}, escalation rate {predictor.escalation_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
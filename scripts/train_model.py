@@ -0,0 +1,172 @@
+"""
+Fine-tune one architecture from `_model_name_map` with the config.yaml hyperparameters.
+
+Script version of the training notebooks (CustomTrainer, class weights, early
+stopping). Models listed under `training.memory_profile.models` are trained with
+activation checkpointing, bf16 autocast where supported, float16 eval logits
+and a batch size derived from the memory budget.
+
+Usage (from the repository root):
+    python scripts/train_model.py --model longformer
+    python scripts/train_model.py --model roberta --learning-rate 3e-5 --output-dir diagrams/roberta_lr3e-5/
+
+scripts/run_experiments.py launches this script once per trial of the training
+matrix, adding a shared tokenization cache, sibling-based pruning and a test-set
+throughput measurement.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import yaml
+from transformers import TrainingArguments, EarlyStoppingCallback, DataCollatorWithPadding
+from transformers import logging as hf_logging
+
+from utils import data_utils, model_utils
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fine-tune a transformer detector")
+    parser.add_argument('--model', type=str, required=True, choices=sorted(model_utils._model_name_map))
+    parser.add_argument('--epochs', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--learning-rate', type=float, default=None)
+    parser.add_argument('--output-dir', type=str, default=None)
+    parser.add_argument('--no-memory-profile', action='store_true',
+                        help="Train without the memory-saving profile even if configured for this model.")
+    parser.add_argument('--token-cache', type=str, default=None,
+                        help="Directory of tokenized splits shared between runs.")
+    parser.add_argument('--run-dir', type=str, default=None,
+                        help="Experiment directory; enables pruning against the other trials in it.")
+    parser.add_argument('--trial-id', type=str, default=None)
+    parser.add_argument('--prune-margin', type=float, default=0.02)
+    parser.add_argument('--throughput-sample', type=int, default=0,
+                        help="Score this many test texts after training to report F1 and texts/s.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    hf_logging.set_verbosity_error()
+    logging.basicConfig(
+        filename=config['paths']['log_file'],
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s: %(message)s"
+    )
+    train_cfg = config['training']
+    label_mapping = config['model']['label_mapping']
+    key = args.model
+    max_len = train_cfg['max_length']['longformer' if key == 'longformer' else 'bert_roberta']
+    batch_size = args.batch_size or int(train_cfg['batch_size'][key])
+    output_dir = args.output_dir or config['paths']['model_dirs'][key]
+
+    train_df = data_utils.load_split('train', columns=['text', 'label'])
+    val_df   = data_utils.load_split('val', columns=['text', 'label'])
+    print(f"Data sizes → train: {len(train_df)}, val: {len(val_df)}")
+
+    # ── Class weights (for weighted CE / focal loss) ───────────────────────
+    labels, counts = np.unique(train_df['label'], return_counts=True)
+    inv_freq = (1.0 / counts) * np.mean(counts)
+    weight_list = [0.0] * len(inv_freq)
+    for lab, w in zip(labels, inv_freq):
+        weight_list[label_mapping[lab]] = float(w)
+
+    tokenizer = model_utils.get_tokenizer(key)
+    model = model_utils.get_model(key, num_labels=len(label_mapping))
+
+    # No padding here: the collator pads each batch to its own longest text
+    train_enc = model_utils.cached_tokenize(tokenizer, train_df['text'].tolist(), max_len, args.token_cache)
+    val_enc   = model_utils.cached_tokenize(tokenizer, val_df['text'].tolist(), max_len, args.token_cache)
+    train_dataset = model_utils.TextDataset(train_enc, [label_mapping[l] for l in train_df['label']])
+    val_dataset   = model_utils.TextDataset(val_enc, [label_mapping[l] for l in val_df['label']])
+
+    arg_overrides = {
+        "per_device_train_batch_size": batch_size,
+        "per_device_eval_batch_size": batch_size,
+        "gradient_accumulation_steps": int(train_cfg['gradient_accumulation_steps']),
+    }
+    eval_logits_dtype = None
+    profile = train_cfg.get('memory_profile', {})
+    if key in profile.get('models', []) and not args.no_memory_profile:
+        target = profile.get('effective_batch_size', {}).get(
+            key, batch_size * int(train_cfg['gradient_accumulation_steps']))
+        profile_args, eval_logits_dtype = model_utils.apply_memory_profile(model, max_len, profile, target)
+        arg_overrides.update(profile_args)
+
+    training_args = TrainingArguments(
+        output_dir                  = output_dir,
+        num_train_epochs            = args.epochs or int(train_cfg['epochs'][key]),
+        learning_rate               = args.learning_rate or float(train_cfg['learning_rate']),
+
+        evaluation_strategy         = "epoch",
+        save_strategy               = "epoch",
+        load_best_model_at_end      = True,
+        metric_for_best_model       = "f1",
+
+        logging_strategy            = "steps",
+        logging_steps               = 250,
+        report_to                   = "none",
+        dataloader_pin_memory       = False,
+        **arg_overrides
+    )
+    callbacks = [
+        EarlyStoppingCallback(
+            early_stopping_patience=int(train_cfg['early_stopping_patience'])
+        )
+    ]
+    pruning = None
+    if args.run_dir:
+        pruning = model_utils.TrialPruningCallback(
+            args.run_dir, args.trial_id or key,
+            patience=int(train_cfg['early_stopping_patience']), margin=args.prune_margin
+        )
+        callbacks.append(pruning)
+
+    trainer = model_utils.CustomTrainer(
+        model             = model,
+        args              = training_args,
+        train_dataset     = train_dataset,
+        eval_dataset      = val_dataset,
+        data_collator     = DataCollatorWithPadding(tokenizer),
+        compute_metrics   = model_utils.compute_metrics,
+        callbacks         = callbacks,
+        use_focal         = bool(train_cfg['use_focal_loss']),
+        alpha             = weight_list,
+        eval_logits_dtype = eval_logits_dtype
+    )
+
+    print(f"⏳ Training {key} …")
+    t0 = time.time()
+    trainer.train()
+    train_seconds = time.time() - t0
+    metrics = trainer.evaluate()
+    metrics['train_seconds'] = train_seconds
+    metrics['pruned'] = bool(pruning and pruning.pruned)
+    if args.throughput_sample:
+        test_df = data_utils.load_split('test', columns=['text', 'label'])
+        test_df = test_df.sample(n=min(args.throughput_sample, len(test_df)), random_state=42)
+        test_scores = model_utils.evaluate_speed_and_f1(
+            trainer.model, tokenizer, test_df['text'].tolist(),
+            [label_mapping[l] for l in test_df['label']], max_length=max_len, batch_size=batch_size
+        )
+        metrics.update({f"test_{k}": v for k, v in test_scores.items()})
+    print(f"✅ {key} finished in {train_seconds / 60:.1f} min; validation metrics: {metrics}")
+    logging.info(f"{key} validation metrics → {metrics}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    trainer.model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    # Later evaluation/calibration of this model reloads exactly this split
+    data_utils.write_split_record(output_dir, data_utils.current_split_record())
+    with open(os.path.join(output_dir, "train_metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
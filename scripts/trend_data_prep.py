@@ -1,14 +1,7 @@
 # scripts/trend_data_prep.py
 
-import os
-import pandas as pd
-from utils.text_cleaner import clean_text
-
-def load_and_clean(path, date_col='date', text_col='article_text'):
-    df = pd.read_csv(path)
-    df['year'] = pd.to_datetime(df[date_col]).dt.year
-    df['clean_text'] = df[text_col].apply(clean_text)
-    return df[['year', 'clean_text']]
+from utils import ingest, instrumentation
+from utils.instrumentation import stage
 
 if __name__ == "__main__":
     parts = [
@@ -16,12 +9,12 @@ if __name__ == "__main__":
         'data/guardian_2015.csv',
         'data/guardian_2023_2025.csv'
     ]
-    dfs = []
-    for p in parts:
-        if os.path.exists(p):
-            dfs.append(load_and_clean(p))
-        else:
-            print(f"⚠️  Source not found: {p}")
-    combined = pd.concat(dfs, ignore_index=True)
-    combined.to_parquet('data/trends_raw.parquet', index=False)
-    print(f"✅ Saved {len(combined)} articles to data/trends_raw.parquet")
+    first, last = ingest.year_range()
+    # The run report is written even if ingestion fails
+    with instrumentation.run("trend_data_prep"):
+        # Year filter runs on the Arrow batches; only in-range articles are cleaned
+        with stage("ingest") as record:
+            stats = ingest.write_year_partitioned(parts)
+            record.items = stats.get('rows_scanned', 0)
+        print(f"✅ Saved {stats.get('rows_kept', 0)} articles from {first}–{last} "
+              f"to {stats['output_dir']} (partitioned by year)")
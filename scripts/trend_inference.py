@@ -1,23 +1,78 @@
+import numpy as np
 import pandas as pd
+import yaml
+from utils import baseline_model, cascade, ingest, instrumentation, progressive
+from utils.dedup import near_duplicate_groups
 from utils.dashboard_utils import load_final_model, predict_text
+from utils.instrumentation import stage
+
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+# Texts scored per cascade/baseline call (first stage is vectorized, escalations are batched)
+BATCH_CHUNK = 1024
 
 def main():
     # Load cleaned data
-    df = pd.read_parquet('data/trends_raw.parquet')
+    with stage("load") as record:
+        df = ingest.read_dataset(columns=['year', 'clean_text'])
+        record.items = len(df)
     print(f"🔍 Loaded {len(df)} articles")
 
-    # Load model & tokenizer
-    tokenizer, model = load_final_model()
-    print("🤖 Model loaded, starting inference...")
+    # Load model & tokenizer (not needed when the baseline scores everything)
+    use_baseline = config['baseline'].get('use_for_trends', False)
+    if not use_baseline:
+        with stage("load_model"):
+            tokenizer, model = load_final_model()
+        print("🤖 Model loaded, starting inference...")
+
+    # Score each near-duplicate group (e.g. a syndicated wire story) only once
+    all_texts = df['clean_text'].tolist()
+    if config['dedup'].get('trends', False):
+        with stage("dedup", items=len(all_texts)):
+            groups = near_duplicate_groups(all_texts)
+        reps, fan_out = np.unique(groups, return_inverse=True)  # group id == first member's row
+        texts = [all_texts[i] for i in reps]
+        print(f"🧬 {len(all_texts)} articles form {len(texts)} near-duplicate groups")
+    else:
+        texts, fan_out = all_texts, np.arange(len(all_texts))
 
-    # Prepare lists for results
-    years, labels, confidences = [], [], []
+    labels, confidences = [], []
+    with stage("infer", items=len(texts)):
+        if use_baseline:
+            # Hashed n-gram baseline: CPU-cheap, for sweeps that don't need transformer accuracy
+            baseline = baseline_model.load_baseline()
+            for start in range(0, len(texts), BATCH_CHUNK):
+                for label, confs in baseline_model.predict_batch_baseline(texts[start:start + BATCH_CHUNK], baseline):
+                    labels.append(label)
+                    confidences.append(confs[label])
+        elif cascade.is_enabled():
+            predictor = cascade.load_cascade(tokenizer, model)
+            for start in range(0, len(texts), BATCH_CHUNK):
+                for label, confs, _stage in predictor.predict(texts[start:start + BATCH_CHUNK]):
+                    labels.append(label)
+                    confidences.append(confs[label])
+            print(f"🪜 Cascade escalated {predictor.escalation_rate:.1%} of articles to the transformer")
+        elif progressive.is_enabled() and progressive.get_predictor(tokenizer, model) is not None:
+            # Short prefix first; only uncertain articles are re-scored on longer prefixes
+            predictor = progressive.get_predictor(tokenizer, model)
+            for start in range(0, len(texts), BATCH_CHUNK):
+                for label, confs, _length in predictor.predict(texts[start:start + BATCH_CHUNK]):
+                    labels.append(label)
+                    confidences.append(confs[label])
+            stats = predictor.stats()
+            print(f"📏 Progressive: {stats['full_length_rate']:.1%} of articles needed the full length "
+                  f"({stats['relative_compute']:.0%} of full-length compute)")
+        else:
+            for text in texts:
+                label, confs = predict_text(text, tokenizer, model)
+                labels.append(label)
+                confidences.append(confs[label])
 
-    for text, year in zip(df['clean_text'], df['year']):
-        label, confs = predict_text(text, tokenizer, model)
-        years.append(year)
-        labels.append(label)
-        confidences.append(confs[label])
+    # Fan group results back out to every member article
+    years = df['year'].tolist()
+    labels = np.asarray(labels, dtype=object)[fan_out]
+    confidences = np.asarray(confidences)[fan_out]
 
     # Build results DataFrame
     results = pd.DataFrame({
@@ -29,4 +84,6 @@ def main():
     print("✅ Predictions saved to data/trends_predictions.parquet")
 
 if __name__ == "__main__":
-    main()
+    # The run report is written even if a stage fails
+    with instrumentation.run("trend_inference"):
+        main()
@@ -3,14 +3,16 @@
 trends_analysis.py
 
 Loads multiple news-article sources (Guardian CSV plus any extras),
-cleans text, runs the AI Text Detector model on each article, aggregates
-counts and percentages by year, and writes out data/trends_by_year.csv.
+keeps the articles inside `ingest.years` and cleans only those, runs the
+AI Text Detector model on each article, aggregates counts and percentages
+by year, and writes out data/trends_by_year.csv.
 """
 
 import os
 import glob
 import pandas as pd
-from utils.text_cleaner import clean_text
+from utils import cascade, ingest, instrumentation, progressive
+from utils.instrumentation import stage
 from utils.dashboard_utils import load_final_model, predict_text
 
 # 1. Load raw data files
@@ -19,88 +21,114 @@ from utils.dashboard_utils import load_final_model, predict_text
 guardian_path = "data/guardian_news.csv"
 extra_pattern = "data/news_extra/*.*"
 
-print("Loading datasets...")
-df_list = []
-if os.path.exists(guardian_path):
-    gdf = pd.read_csv(guardian_path, parse_dates=["date"])
-    df_list.append(gdf)
-for fp in glob.glob(extra_pattern):
-    if fp.lower().endswith(".csv"):
-        df_list.append(pd.read_csv(fp, parse_dates=["date"]))
-    elif fp.lower().endswith(".json"):
-        df_list.append(pd.read_json(fp))
-if not df_list:
-    raise FileNotFoundError("No news data files found in data/ folder.")
-
-df = pd.concat(df_list, ignore_index=True)
-print(f"Total articles loaded: {len(df)}")
-
-# 2. Clean text and extract year
-print("Cleaning text and extracting year...")
-df["clean_text"] = df["article_text"].astype(str).apply(clean_text)
-df["year"] = df["date"].dt.year
-
-# Keep only 2015–2025
-df = df[(df["year"] >= 2015) & (df["year"] <= 2025)].reset_index(drop=True)
-print(f"Articles in 2015–2025 range: {len(df)}")
-
-# 3. Load model and tokenizer once
-print("Loading model and tokenizer...")
-tokenizer, model = load_final_model()  # returns (tokenizer, model)
-model.eval()
-
-# 4. Predict labels for each article
-print("Classifying articles (this may take a while)...")
-preds = []
-for idx, row in df.iterrows():
-    label, _probs = predict_text(row["clean_text"], tokenizer, model)
-    preds.append((row["year"], label))
-    if (idx + 1) % 1000 == 0:
-        print(f"  Processed {idx+1}/{len(df)} articles")
-
-pred_df = pd.DataFrame(preds, columns=["year","label"])
-
-# 5. Map labels to human-readable and aggregate counts
-print("Aggregating counts by year and label...")
-label_map = {
-    "human":         "Human-written",
-    "ai_paraphrased":"AI-paraphrased",
-    "ai_generated":  "AI-generated"
-}
-pred_df["label_hr"] = pred_df["label"].map(label_map)
-
-counts = (
-    pred_df
-    .groupby(["year","label_hr"])
-    .size()
-    .unstack(fill_value=0)
-    .reset_index()
-)
-
-# Ensure all three columns exist
-for col in label_map.values():
-    if col not in counts:
-        counts[col] = 0
-
-counts = counts[["year",
-                 "Human-written",
-                 "AI-paraphrased",
-                 "AI-generated"]]
-
-# 6. Compute totals and percentages
-counts["total"] = (
-    counts["Human-written"] +
-    counts["AI-paraphrased"] +
-    counts["AI-generated"]
-)
-counts["human_percent"]        = counts["Human-written"]       / counts["total"]
-counts["ai_paraphrased_percent"]= counts["AI-paraphrased"]      / counts["total"]
-counts["ai_generated_percent"]  = counts["AI-generated"]        / counts["total"]
-
-# 7. Save to CSV
-out_path = "data/trends_by_year.csv"
-print(f"Saving aggregated trends to {out_path} …")
-os.makedirs(os.path.dirname(out_path), exist_ok=True)
-counts.to_csv(out_path, index=False)
-
-print("Done.")
+# The run report is written even if a stage fails
+with instrumentation.run("trends_analysis"):
+    first_year, last_year = ingest.year_range()
+    print(f"Loading datasets (articles from {first_year}–{last_year} only)...")
+    # 2. Dates are parsed and out-of-range rows dropped before any text is cleaned
+    df_list = []
+    ingest_stats = {}
+    with stage("ingest") as record:
+        if os.path.exists(guardian_path):
+            df_list.append(ingest.read_articles(guardian_path, stats=ingest_stats))
+        for fp in glob.glob(extra_pattern):
+            if fp.lower().endswith(".csv"):
+                df_list.append(ingest.read_articles(fp, stats=ingest_stats))
+            elif fp.lower().endswith(".json"):
+                df_list.append(ingest.filter_frame(pd.read_json(fp), stats=ingest_stats))
+        if not df_list:
+            raise FileNotFoundError("No news data files found in data/ folder.")
+
+        df = pd.concat(df_list, ignore_index=True)
+        record.items = ingest_stats.get('rows_scanned', 0)
+    print(f"Total articles loaded: {ingest_stats.get('rows_scanned', 0)}")
+    print(f"Articles in {first_year}–{last_year} range (cleaned): {len(df)}")
+
+    # 3. Load model and tokenizer once
+    print("Loading model and tokenizer...")
+    with stage("load_model"):
+        tokenizer, model = load_final_model()  # returns (tokenizer, model)
+        model.eval()
+
+    # 4. Predict labels for each article
+    print("Classifying articles (this may take a while)...")
+    preds = []
+    with stage("infer") as record:
+        if cascade.is_enabled():
+            # Cheap first stage for every article, transformer only for low-margin ones
+            predictor = cascade.load_cascade(tokenizer, model)
+            texts = df["clean_text"].tolist()
+            for start in range(0, len(texts), 1000):
+                chunk = predictor.predict(texts[start:start + 1000])
+                preds.extend((year, label) for year, (label, _probs, _stage)
+                             in zip(df["year"].iloc[start:start + 1000], chunk))
+                record.add(len(chunk))
+                print(f"  Processed {record.progress(len(df))} articles "
+                      f"(escalated {predictor.escalation_rate:.1%})")
+        elif progressive.is_enabled() and progressive.get_predictor(tokenizer, model) is not None:
+            # Short prefix first; only uncertain articles are re-scored on longer prefixes
+            predictor = progressive.get_predictor(tokenizer, model)
+            texts = df["clean_text"].tolist()
+            for start in range(0, len(texts), 1000):
+                chunk = predictor.predict(texts[start:start + 1000])
+                preds.extend((year, label) for year, (label, _probs, _length)
+                             in zip(df["year"].iloc[start:start + 1000], chunk))
+                record.add(len(chunk))
+                print(f"  Processed {record.progress(len(df))} articles "
+                      f"({predictor.full_length_rate:.1%} needed the full length)")
+            print(f"Progressive scoring used {predictor.relative_compute:.0%} of full-length compute")
+        else:
+            for idx, row in df.iterrows():
+                label, _probs = predict_text(row["clean_text"], tokenizer, model)
+                preds.append((row["year"], label))
+                record.add(1)
+                if (idx + 1) % 1000 == 0:
+                    print(f"  Processed {record.progress(len(df))} articles")
+
+    pred_df = pd.DataFrame(preds, columns=["year","label"])
+
+    # 5. Map labels to human-readable and aggregate counts
+    print("Aggregating counts by year and label...")
+    label_map = {
+        "human":         "Human-written",
+        "ai_paraphrased":"AI-paraphrased",
+        "ai_generated":  "AI-generated"
+    }
+    with stage("aggregate", items=len(pred_df)):
+        pred_df["label_hr"] = pred_df["label"].map(label_map)
+
+        counts = (
+            pred_df
+            .groupby(["year","label_hr"])
+            .size()
+            .unstack(fill_value=0)
+            .reset_index()
+        )
+
+        # Ensure all three columns exist
+        for col in label_map.values():
+            if col not in counts:
+                counts[col] = 0
+
+        counts = counts[["year",
+                         "Human-written",
+                         "AI-paraphrased",
+                         "AI-generated"]]
+
+        # 6. Compute totals and percentages
+        counts["total"] = (
+            counts["Human-written"] +
+            counts["AI-paraphrased"] +
+            counts["AI-generated"]
+        )
+        counts["human_percent"]        = counts["Human-written"]       / counts["total"]
+        counts["ai_paraphrased_percent"]= counts["AI-paraphrased"]      / counts["total"]
+        counts["ai_generated_percent"]  = counts["AI-generated"]        / counts["total"]
+
+    # 7. Save to CSV
+    out_path = "data/trends_by_year.csv"
+    print(f"Saving aggregated trends to {out_path} …")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    counts.to_csv(out_path, index=False)
+
+    print("Done.")
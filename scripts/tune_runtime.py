@@ -0,0 +1,100 @@
+"""
+Auto-tune CPU inference settings on the local machine.
+
+Sweeps worker count x intra-op threads x inter-op threads (with and without
+CPU pinning) over a fixed synthetic corpus, measures aggregate texts/s with
+every worker running concurrently, and writes the best combination back to
+``inference.runtime`` in config.yaml.
+
+Usage (from the repository root):
+    python scripts/tune_runtime.py              # sweep and write back
+    python scripts/tune_runtime.py --dry-run    # sweep and only print the table
+"""
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR / "benchmarks"))
+
+from corpus import make_corpus
+from utils.runtime import apply_runtime_config, write_runtime_config
+
+
+def _worker(settings, worker_index, texts, batch_size, barrier, out_queue):
+    """Apply `settings`, load the model, wait for all peers, then score `texts`."""
+    from utils import dashboard_utils
+    apply_runtime_config(settings, worker_index=worker_index)
+    tokenizer, model = dashboard_utils.load_final_model()
+    dashboard_utils.predict_batch(texts[:batch_size], tokenizer, model, batch_size=batch_size)  # warm-up
+    barrier.wait()
+    start = time.time()
+    dashboard_utils.predict_batch(texts, tokenizer, model, batch_size=batch_size)
+    out_queue.put((start, time.time(), len(texts)))
+
+
+def measure(settings, texts, batch_size):
+    """
+    Run one setting with all workers concurrently.
+    Returns:
+        float: Aggregate texts/s from the first worker start to the last worker finish.
+    """
+    ctx = mp.get_context("spawn")
+    workers = settings['workers']
+    barrier = ctx.Barrier(workers)
+    out_queue = ctx.Queue()
+    shards = [texts[i::workers] for i in range(workers)]
+    procs = [ctx.Process(target=_worker, args=(settings, i, shards[i], batch_size, barrier, out_queue))
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    results = [out_queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    start = min(r[0] for r in results)
+    end = max(r[1] for r in results)
+    return sum(r[2] for r in results) / (end - start)
+
+
+def candidate_settings(n_cores, max_workers):
+    """Worker/thread combinations that don't oversubscribe the available cores."""
+    worker_counts = [w for w in (1, 2, 4, 8, 16) if w <= min(n_cores, max_workers)]
+    for workers, inter, pinning in itertools.product(worker_counts, (1, 2), (False, True)):
+        if pinning and workers == 1:
+            continue
+        per_worker = max(1, n_cores // workers)
+        for intra in sorted({per_worker, max(1, per_worker // 2)}):
+            yield {'workers': workers, 'intra_op_threads': intra,
+                   'inter_op_threads': inter, 'cpu_pinning': pinning}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune inference thread/worker settings for this machine")
+    parser.add_argument('--n-texts', type=int, default=256, help="Size of the fixed synthetic corpus.")
+    parser.add_argument('--batch-size', type=int, default=8, help="Texts per forward pass.")
+    parser.add_argument('--max-workers', type=int, default=8, help="Upper bound on worker processes to try.")
+    parser.add_argument('--dry-run', action='store_true', help="Print results without updating config.yaml.")
+    args = parser.parse_args()
+
+    n_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    texts = make_corpus(args.n_texts, distribution="lognormal", mean_words=400, seed=42)
+
+    results = []
+    for settings in candidate_settings(n_cores, args.max_workers):
+        rate = measure(settings, texts, args.batch_size)
+        results.append((rate, settings))
+        print(f"[tune_runtime] {settings} -> {rate:.1f} texts/s")
+
+    best_rate, best = max(results, key=lambda r: r[0])
+    print(f"[tune_runtime] Best: {best} at {best_rate:.1f} texts/s")
+    if not args.dry_run:
+        write_runtime_config(best, path=str(BASE_DIR / "config.yaml"))
+        print("[tune_runtime] Updated inference.runtime in config.yaml")
+
+
+if __name__ == "__main__":
+    main()
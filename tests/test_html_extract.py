@@ -0,0 +1,20 @@
+"""
+Regression tests for utils/html_extract.py (run from the repository root: `python -m pytest tests`).
+"""
+import pytest
+
+pytest.importorskip("lxml")
+
+from utils.html_extract import extract_main_text
+
+
+def test_non_markup_body_is_parsed_not_opened():
+    # /extract/html passes client input straight in: a path-like body must never be read from disk
+    for body in ("config.yaml", "/etc/passwd", "\ufeffPlain text without any markup at all."):
+        text = extract_main_text(body, min_words=1)
+        assert "paths:" not in text and "root:" not in text
+    assert "without any markup" in extract_main_text("Plain text without any markup at all.", min_words=1)
+
+
+def test_empty_body():
+    assert extract_main_text("") == ""
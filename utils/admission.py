@@ -0,0 +1,202 @@
+"""
+Admission control for the inference API.
+Requests wait in one bounded queue per request class ('interactive' for the
+/predict family, 'bulk' for /analyze-file) before they get a model slot. Slots go
+to the lowest priority number first; within a class, a request's place is its
+arrival time plus its estimated run time (token cost x observed seconds per
+token), so a short text can overtake a 10,000-character paste queued just before
+it, while the long one still goes through once it has waited long enough.
+A request is shed with ``AdmissionRejected`` (HTTP 429 + Retry-After) when its
+class queue is full or its estimated wait is above the class latency SLO.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+
+import yaml
+
+from utils import metrics
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_inference_cfg = config.get('inference', {})
+_admission_cfg = _inference_cfg.get('admission', {})
+
+# Prior for seconds of model time per token until a class has real measurements
+_DEFAULT_SECONDS_PER_TOKEN = 0.002
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; ``retry_after`` is a whole number of seconds."""
+    def __init__(self, request_class, retry_after, reason):
+        super().__init__(f"{request_class} queue {reason}")
+        self.request_class = request_class
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("request_class", "tokens", "estimate", "future", "enqueued", "started", "active")
+
+    def __init__(self, request_class, tokens, estimate, future):
+        self.request_class = request_class
+        self.tokens = tokens
+        self.estimate = estimate
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.started = None
+        self.active = True   # False once granted or abandoned
+
+
+class AdmissionController:
+    """
+    Priority- and cost-aware gate in front of the model (single asyncio event loop).
+    """
+    def __init__(self, classes, max_concurrency=1, ewma_weight=0.2):
+        """
+        Args:
+            classes (dict): Per request class: 'priority' (lower runs first),
+                'max_queue' (waiting requests) and 'slo_seconds' (longest acceptable wait).
+            max_concurrency (int): Requests allowed to run the model at once.
+            ewma_weight (float): Weight of the newest sample in the seconds-per-token average.
+        """
+        self.classes = classes
+        self.max_concurrency = max_concurrency
+        self.ewma_weight = ewma_weight
+        self.seconds_per_token = {name: _DEFAULT_SECONDS_PER_TOKEN for name in classes}
+        self._heap = []
+        self._seq = itertools.count()
+        self._queued = {name: 0 for name in classes}
+        self._running = set()   # waiters currently holding a slot
+
+    def estimate_seconds(self, request_class, tokens):
+        """Estimated model time of a request from its class's observed seconds per token."""
+        return tokens * self.seconds_per_token[request_class]
+
+    def estimated_wait(self, request_class, tokens=0):
+        """
+        Seconds a new request of ``request_class`` costing ``tokens`` would wait for a
+        slot: the remaining work of running requests plus every queued request that
+        would be dispatched before it (so a long paste does not count against short ones).
+        """
+        now = time.monotonic()
+        key = (self.classes[request_class]['priority'], now + self.estimate_seconds(request_class, tokens))
+        ahead = sum(w.estimate for priority, deadline, _, w in self._heap
+                    if w.active and (priority, deadline) <= key)
+        if len(self._running) < self.max_concurrency and ahead == 0:
+            return 0.0
+        remaining = sum(max(0.0, w.estimate - (now - w.started)) for w in self._running)
+        return (ahead + remaining) / self.max_concurrency
+
+    def check(self, request_class, tokens=0):
+        """
+        Raise AdmissionRejected if a request of this class would be shed right now.
+        Lets endpoints refuse work before doing expensive preprocessing.
+        """
+        cls = self.classes[request_class]
+        wait = self.estimated_wait(request_class, tokens)
+        if self._queued[request_class] >= cls['max_queue']:
+            self._reject(request_class, wait, "full")
+        if wait > cls['slo_seconds']:
+            self._reject(request_class, wait, "over latency SLO")
+
+    def _reject(self, request_class, wait, reason):
+        metrics.ADMISSION_REJECTED.labels(request_class=request_class).inc()
+        raise AdmissionRejected(request_class, max(1, math.ceil(wait)), reason)
+
+    @asynccontextmanager
+    async def admit(self, request_class, tokens):
+        """
+        Hold a model slot for the body of the ``async with`` block.
+        Args:
+            request_class (str): Key into ``classes``.
+            tokens (int): Token cost of the request (see ``request_tokens``).
+        Raises:
+            AdmissionRejected: If the queue is full or the wait would break the SLO.
+        """
+        self.check(request_class, tokens)
+        estimate = self.estimate_seconds(request_class, tokens)
+        waiter = _Waiter(request_class, tokens, estimate, asyncio.get_running_loop().create_future())
+        deadline = waiter.enqueued + estimate
+        heapq.heappush(self._heap, (self.classes[request_class]['priority'], deadline,
+                                    next(self._seq), waiter))
+        self._queued[request_class] += 1
+        metrics.ADMISSION_QUEUE.labels(request_class=request_class).set(self._queued[request_class])
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Client went away: give back a slot we were granted, or leave the queue
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(waiter, None)
+            else:
+                self._leave_queue(waiter)
+                self._dispatch()
+            raise
+
+        metrics.QUEUE_WAIT.labels(request_class=request_class).observe(waiter.started - waiter.enqueued)
+        try:
+            yield
+        finally:
+            self._release(waiter, time.monotonic() - waiter.started)
+
+    def _leave_queue(self, waiter):
+        if waiter.active:
+            waiter.active = False
+            self._queued[waiter.request_class] -= 1
+            metrics.ADMISSION_QUEUE.labels(request_class=waiter.request_class).set(
+                self._queued[waiter.request_class])
+
+    def _dispatch(self):
+        """Hand free slots to the best waiting requests."""
+        while len(self._running) < self.max_concurrency and self._heap:
+            _, _, _, waiter = heapq.heappop(self._heap)
+            if not waiter.active:
+                continue
+            self._leave_queue(waiter)
+            waiter.started = time.monotonic()
+            self._running.add(waiter)
+            waiter.future.set_result(None)
+
+    def _release(self, waiter, elapsed):
+        self._running.discard(waiter)
+        if elapsed is not None and waiter.tokens > 0:
+            w = self.ewma_weight
+            sample = elapsed / waiter.tokens
+            prev = self.seconds_per_token[waiter.request_class]
+            self.seconds_per_token[waiter.request_class] = (1 - w) * prev + w * sample
+        self._dispatch()
+
+
+def request_tokens(text, cap=True):
+    """
+    Estimated token cost of a text, without running the tokenizer.
+    Args:
+        cap (bool): Clip at ``inference.max_length`` (the model never reads more);
+            pass False for endpoints that score every part of the text.
+    """
+    tokens = math.ceil(len(text) / _admission_cfg.get('chars_per_token', 4)) + 1
+    return min(tokens, _inference_cfg.get('max_length', 512)) if cap else tokens
+
+
+def get_admission_config():
+    """Return the ``inference.admission`` config section."""
+    return _admission_cfg
+
+
+def get_controller():
+    """
+    Build an AdmissionController from ``inference.admission``.
+    Returns None when admission control is disabled.
+    """
+    if not _admission_cfg.get('enabled', False):
+        return None
+    return AdmissionController(
+        _admission_cfg['classes'],
+        max_concurrency=_admission_cfg.get('max_concurrency', 1),
+    )
@@ -0,0 +1,147 @@
+"""
+Hashed n-gram linear baseline, trained out-of-core.
+Word and character n-grams are hashed into a fixed-size sparse space (no vocabulary
+to fit), so an SGD classifier can be trained with ``partial_fit`` chunk by chunk
+without ever holding the corpus in memory. Predictions use the same
+``(label_name, class_probs)`` format as ``dashboard_utils.predict_text``.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import yaml
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from utils.data_utils import flatten_dataset
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_baseline_cfg = config.get('baseline', {})
+_label_mapping = config['model']['label_mapping']
+_label_map = {v: k for k, v in _label_mapping.items()}
+
+
+class HashedNgramClassifier:
+    """
+    SGD logistic regression over [hashed word n-grams | hashed char n-grams].
+    """
+    def __init__(self, n_features=2 ** 18, word_ngram_range=(1, 2), char_ngram_range=(3, 5),
+                 alpha=1e-6, random_state=42):
+        self.word_vectorizer = HashingVectorizer(
+            n_features=n_features, ngram_range=tuple(word_ngram_range),
+            alternate_sign=False, norm="l2", lowercase=True
+        )
+        self.char_vectorizer = HashingVectorizer(
+            n_features=n_features, analyzer="char_wb", ngram_range=tuple(char_ngram_range),
+            alternate_sign=False, norm="l2", lowercase=True
+        )
+        self.clf = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+        self.classes = np.array(sorted(_label_map))
+
+    def transform(self, texts):
+        """Hash texts into the sparse feature space (stateless, safe per chunk)."""
+        return sp.hstack([self.word_vectorizer.transform(texts),
+                          self.char_vectorizer.transform(texts)], format="csr")
+
+    def partial_fit(self, texts, label_ids):
+        """Update the model with one chunk of texts and integer label ids."""
+        self.clf.partial_fit(self.transform(texts), np.asarray(label_ids), classes=self.classes)
+        return self
+
+    def predict_proba(self, texts):
+        """Class probabilities, shape (n_texts, n_classes), in label-id order."""
+        return self.clf.predict_proba(self.transform(texts))
+
+    def compact(self):
+        """Store weights as float32 to halve the artifact size (accuracy is unaffected)."""
+        self.clf.coef_ = self.clf.coef_.astype(np.float32)
+        self.clf.intercept_ = self.clf.intercept_.astype(np.float32)
+        return self
+
+
+def iter_labelled_chunks(path, chunksize=50000):
+    """
+    Stream (texts, label_ids) chunks from a CSV or parquet dataset.
+    Raw CSVs with one column per variant are flattened chunk by chunk.
+
+    Args:
+        path (str): CSV or parquet file.
+        chunksize (int): Rows read per chunk (before flattening).
+    Yields:
+        (list of str, np.ndarray): Texts and integer label ids.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in
+                  pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=['text', 'label']))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize)
+
+    for chunk in chunks:
+        if 'text' not in chunk.columns or 'label' not in chunk.columns:
+            chunk = flatten_dataset(chunk)
+        chunk = chunk.dropna(subset=['text', 'label'])
+        chunk = chunk[chunk['label'].isin(_label_mapping)]
+        if len(chunk):
+            yield chunk['text'].astype(str).tolist(), chunk['label'].map(_label_mapping).to_numpy()
+
+
+def train_streaming(path, epochs=1, chunksize=50000, random_state=42, **model_kwargs):
+    """
+    Fit a HashedNgramClassifier with partial_fit over a dataset file, chunk by chunk.
+    Rows are shuffled within each chunk; the full corpus is never materialized.
+
+    Args:
+        path (str): Flattened (or raw) dataset, CSV or parquet.
+        epochs (int): Passes over the file.
+        chunksize (int): Rows per chunk.
+        random_state (int): Seed for model init and within-chunk shuffling.
+        **model_kwargs: Passed to HashedNgramClassifier.
+    Returns:
+        HashedNgramClassifier: The trained model.
+    """
+    rng = np.random.default_rng(random_state)
+    model = HashedNgramClassifier(random_state=random_state, **model_kwargs)
+    for epoch in range(epochs):
+        n_seen = 0
+        for texts, label_ids in iter_labelled_chunks(path, chunksize):
+            order = rng.permutation(len(texts))
+            model.partial_fit([texts[i] for i in order], label_ids[order])
+            n_seen += len(texts)
+        print(f"[baseline_model] Epoch {epoch + 1}/{epochs}: trained on {n_seen} texts")
+    return model
+
+
+def predict_batch_baseline(texts, model):
+    """
+    Classify many texts with the baseline.
+    Returns:
+        list of tuple: (predicted_label_name, confidences) per text, as in predict_text.
+    """
+    probs = model.predict_proba(list(texts))
+    results = []
+    for row in probs:
+        pred_idx = int(np.argmax(row))
+        results.append((_label_map[pred_idx], {_label_map[i]: float(row[i]) for i in range(len(row))}))
+    return results
+
+
+def predict_text_baseline(text, model):
+    """Single-text counterpart of ``dashboard_utils.predict_text`` for the baseline."""
+    return predict_batch_baseline([text], model)[0]
+
+
+def save_baseline(model, path=None):
+    """Write the model as a single compressed joblib artifact."""
+    path = path or _baseline_cfg['model_path']
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(model.compact(), path, compress=3)
+
+
+def load_baseline(path=None):
+    """Load a baseline saved with ``save_baseline``."""
+    return joblib.load(path or _baseline_cfg['model_path'])
@@ -0,0 +1,171 @@
+"""
+Shape-bucketed inference with per-shape warm-up (optionally TorchScript / torch.compile).
+Inputs are padded up to one of a few sequence-length buckets (e.g. 64/128/256/512)
+and batches up to one of a few batch sizes, so the model only ever sees a fixed,
+small set of shapes. Each shape is traced or compiled and run a few times at
+startup, and the first real request takes the same fast path as the thousandth.
+"""
+import bisect
+import time
+
+import numpy as np
+import torch
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_bucket_cfg = config.get('inference', {}).get('bucketing', {})
+_label_map = {v: k for k, v in config['model']['label_mapping'].items()}
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Tensor-in/tensor-out wrapper so the HF model can be traced."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+
+
+class BucketedPredictor:
+    """
+    Routes each batch to the nearest (batch size, sequence length) bucket and runs the
+    graph prepared for that shape.
+    """
+    def __init__(self, tokenizer, model, buckets=(64, 128, 256, 512), batch_sizes=(1, 8),
+                 backend="trace", warmup_iters=2):
+        """
+        Args:
+            buckets (sequence of int): Sequence lengths inputs are padded up to (the largest
+                is also the truncation length).
+            batch_sizes (sequence of int): Batch sizes batches are padded up to (larger
+                inputs are split into chunks of the largest one).
+            backend (str): 'trace' (TorchScript, frozen), 'compile' (torch.compile,
+                static shapes) or 'eager' (padding + warm-up only).
+            warmup_iters (int): Forward passes per shape at warm-up.
+        """
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.buckets = sorted(buckets)
+        self.batch_sizes = sorted(batch_sizes)
+        self.backend = backend
+        self.warmup_iters = warmup_iters
+        self._graphs = {}
+        self._compiled = None
+        self.warmup_seconds = None
+
+    def bucket_for(self, length):
+        """Smallest length bucket that fits `length` tokens (the largest one otherwise)."""
+        idx = bisect.bisect_left(self.buckets, length)
+        return self.buckets[min(idx, len(self.buckets) - 1)]
+
+    def _batch_bucket(self, n):
+        idx = bisect.bisect_left(self.batch_sizes, n)
+        return self.batch_sizes[min(idx, len(self.batch_sizes) - 1)]
+
+    def _dummy(self, batch, length):
+        ids = torch.full((batch, length), self.tokenizer.pad_token_id or 0, dtype=torch.long)
+        return ids, torch.ones((batch, length), dtype=torch.long)
+
+    def _graph(self, batch, length):
+        """Callable for one shape, built on first use (normally during warm-up)."""
+        key = (batch, length)
+        if key in self._graphs:
+            return self._graphs[key]
+        if self.backend == "trace":
+            with torch.no_grad():
+                traced = torch.jit.trace(_LogitsOnly(self.model), self._dummy(batch, length), check_trace=False)
+                try:
+                    traced = torch.jit.freeze(traced.eval())
+                except RuntimeError:
+                    pass  # some ops can't be frozen; the plain trace is still shape-specialized
+            graph = traced
+        elif self.backend == "compile":
+            if self._compiled is None:
+                self._compiled = torch.compile(_LogitsOnly(self.model), dynamic=False)
+            graph = self._compiled
+        else:
+            graph = _LogitsOnly(self.model)
+        self._graphs[key] = graph
+        return graph
+
+    def warm_up(self):
+        """Prepare and run every (batch size, length) shape; returns the seconds it took."""
+        start = time.perf_counter()
+        with torch.no_grad():
+            for batch in self.batch_sizes:
+                for length in self.buckets:
+                    graph = self._graph(batch, length)
+                    for _ in range(self.warmup_iters):
+                        graph(*self._dummy(batch, length))
+        self.warmup_seconds = time.perf_counter() - start
+        print(f"[bucketed_inference] Warmed {len(self.batch_sizes) * len(self.buckets)} shapes "
+              f"({self.backend}) in {self.warmup_seconds:.1f}s")
+        return self.warmup_seconds
+
+    def logits(self, texts):
+        """
+        Raw logits for `texts`, each batch padded to its bucket shape.
+        Returns:
+            np.ndarray: Shape (n_texts, num_labels).
+        """
+        texts = list(texts)
+        max_batch = self.batch_sizes[-1]
+        out = []
+        for start in range(0, len(texts), max_batch):
+            enc = self.tokenizer(texts[start:start + max_batch], truncation=True, max_length=self.buckets[-1])
+            out.append(self.logits_from_ids(enc['input_ids']))
+        return np.concatenate(out) if out else np.zeros((0, len(_label_map)), dtype=np.float32)
+
+    def logits_from_ids(self, id_lists):
+        """
+        Raw logits for already tokenized inputs (lists of token ids, at most the largest
+        bucket long), e.g. the prefixes of utils/progressive.py.
+        Returns:
+            np.ndarray: Shape (n_inputs, num_labels).
+        """
+        max_batch = self.batch_sizes[-1]
+        out = []
+        for start in range(0, len(id_lists), max_batch):
+            chunk = id_lists[start:start + max_batch]
+            length = self.bucket_for(max(len(row) for row in chunk))
+            batch = self._batch_bucket(len(chunk))
+            ids, mask = self._dummy(batch, length)
+            mask.zero_()
+            for i, row in enumerate(chunk):
+                ids[i, :len(row)] = torch.tensor(row)
+                mask[i, :len(row)] = 1
+            # Padding rows keep one attended token so softmax never sees an all-masked row
+            mask[len(chunk):, 0] = 1
+            with torch.no_grad():
+                logits = self._graph(batch, length)(ids, mask)
+            out.append(logits[:len(chunk)].float().numpy())
+        return np.concatenate(out) if out else np.zeros((0, len(_label_map)), dtype=np.float32)
+
+    def predict(self, texts):
+        """
+        Classify texts.
+        Returns:
+            list of tuple: (predicted_label_name, confidences) per text, as in predict_text.
+        """
+        probs = torch.softmax(torch.from_numpy(self.logits(texts)), dim=1).numpy()
+        return [(_label_map[int(np.argmax(row))], {_label_map[i]: float(row[i]) for i in range(len(row))})
+                for row in probs]
+
+
+def is_enabled():
+    """Whether api_server.py should route forward passes through a BucketedPredictor."""
+    return _bucket_cfg.get('enabled', False)
+
+
+def from_config(tokenizer, model, backend=None):
+    """Build a BucketedPredictor from ``inference.bucketing`` (not yet warmed up)."""
+    return BucketedPredictor(
+        tokenizer, model,
+        buckets=_bucket_cfg.get('buckets', [64, 128, 256, 512]),
+        batch_sizes=_bucket_cfg.get('batch_sizes', [1, 8]),
+        backend=backend or _bucket_cfg.get('backend', "trace"),
+        warmup_iters=_bucket_cfg.get('warmup_iters', 2),
+    )
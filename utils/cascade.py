@@ -0,0 +1,205 @@
+"""
+Two-stage confidence cascade for inference.
+A cheap linear model over stylometric features (utils/features.py) plus hashed
+word n-grams scores every text first; only texts whose top-two probability
+margin falls below a threshold calibrated on the validation split are escalated
+to the transformer.
+"""
+import math
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+import yaml
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from utils import features
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_cascade_cfg = config.get('cascade', {})
+_label_map = {v: k for k, v in config['model']['label_mapping'].items()}
+
+
+def stylometric_features(texts):
+    """
+    Dense per-text features: readability, sentiment, lexical diversity,
+    average word length and log word count.
+    Returns:
+        np.ndarray: Array of shape (n_texts, 5).
+    """
+    rows = []
+    for text in texts:
+        text = text if isinstance(text, str) else ""
+        words = text.split()
+        avg_word_len = sum(len(w) for w in words) / len(words) if words else 0.0
+        rows.append([
+            features.compute_readability(text),
+            features.compute_sentiment(text),
+            features.compute_lexical_diversity(text),
+            avg_word_len,
+            math.log1p(len(words)),
+        ])
+    return np.asarray(rows, dtype=np.float64)
+
+
+class FirstStageClassifier:
+    """
+    Linear classifier over [hashed word n-grams | scaled stylometric features].
+    Exposes ``predict_proba`` with columns in label-id order (0, 1, 2).
+    """
+    def __init__(self, n_features=2 ** 18, ngram_range=(1, 2), random_state=42):
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, ngram_range=tuple(ngram_range),
+            alternate_sign=False, norm="l2", lowercase=True
+        )
+        self.scaler = StandardScaler()
+        self.clf = SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=20, tol=None,
+                                 random_state=random_state)
+
+    def _transform(self, texts, fit=False):
+        dense = stylometric_features(texts)
+        dense = self.scaler.fit_transform(dense) if fit else self.scaler.transform(dense)
+        return sp.hstack([self.vectorizer.transform(texts), sp.csr_matrix(dense)], format="csr")
+
+    def fit(self, texts, label_ids):
+        """Fit on texts with integer label ids (as in config's label_mapping)."""
+        self.clf.fit(self._transform(texts, fit=True), np.asarray(label_ids))
+        return self
+
+    def predict_proba(self, texts):
+        """Return class probabilities, shape (n_texts, n_classes), in label-id order."""
+        return self.clf.predict_proba(self._transform(texts))
+
+
+def top2_margin(probs):
+    """Difference between the two highest class probabilities per row."""
+    top2 = np.sort(probs, axis=1)[:, -2:]
+    return top2[:, 1] - top2[:, 0]
+
+
+def calibrate_threshold(margins, first_correct, target_accuracy, second_correct=None):
+    """
+    Pick the lowest margin threshold that still meets `target_accuracy`.
+    Texts with margin >= threshold are answered by the first stage.
+
+    Args:
+        margins (array-like): First-stage top-2 margins on the validation split.
+        first_correct (array-like of bool): Whether the first stage was right per text.
+        target_accuracy (float): Accuracy to hold.
+        second_correct (array-like of bool): Whether the transformer was right per text.
+            If given, the target applies to the combined cascade accuracy; otherwise
+            to the accuracy of the texts the first stage keeps.
+    Returns:
+        (float, float): The threshold and the resulting escalation rate on the split.
+    """
+    margins = np.asarray(margins)
+    order = np.argsort(-margins)
+    first = np.asarray(first_correct, dtype=np.float64)[order]
+    n = len(margins)
+
+    # Accepting the top-k most confident texts for k = 1..n
+    kept_correct = np.cumsum(first)
+    k = np.arange(1, n + 1)
+    if second_correct is not None:
+        second = np.asarray(second_correct, dtype=np.float64)[order]
+        escalated_correct = second.sum() - np.cumsum(second)
+        accuracy = (kept_correct + escalated_correct) / n
+    else:
+        accuracy = kept_correct / k
+
+    ok = np.nonzero(accuracy >= target_accuracy)[0]
+    if len(ok) == 0:
+        # Nothing can be answered cheaply at this target: escalate everything
+        return float("inf"), 1.0
+    best_k = ok[-1] + 1
+    threshold = float(margins[order][best_k - 1])
+    return threshold, float(np.mean(margins < threshold))
+
+
+def save_first_stage(first_stage, threshold, path=None):
+    """Persist the first-stage model and its calibrated threshold as one joblib artifact."""
+    path = path or _cascade_cfg['first_stage_path']
+    joblib.dump({"model": first_stage, "threshold": threshold}, path, compress=3)
+
+
+def load_first_stage(path=None):
+    """
+    Load a saved first stage.
+    Returns:
+        (FirstStageClassifier, float): The model and its calibrated threshold.
+    """
+    artifact = joblib.load(path or _cascade_cfg['first_stage_path'])
+    return artifact["model"], artifact["threshold"]
+
+
+class CascadePredictor:
+    """
+    Cheap-first inference with transformer fallback for low-margin texts.
+    Keeps running counts so callers can report the escalation rate.
+    """
+    def __init__(self, first_stage, threshold, tokenizer, model):
+        self.first_stage = first_stage
+        self.threshold = threshold
+        self.tokenizer = tokenizer
+        self.model = model
+        self.n_total = 0
+        self.n_escalated = 0
+
+    @property
+    def escalation_rate(self):
+        """Fraction of texts seen so far that needed the transformer."""
+        return self.n_escalated / self.n_total if self.n_total else 0.0
+
+    def predict(self, texts, batch_size=16):
+        """
+        Classify texts through the cascade.
+        Returns:
+            list of (str, dict, str): (label_name, class_probs, stage) per text, where
+            stage is 'first' or 'transformer'; label/probs match predict_text's format.
+        """
+        from utils.dashboard_utils import predict_batch
+
+        texts = list(texts)
+        probs, keep = self.try_first_stage(texts)
+        escalate = np.nonzero(~keep)[0]
+
+        results = []
+        for row in probs:
+            pred_idx = int(np.argmax(row))
+            results.append((_label_map[pred_idx],
+                            {_label_map[i]: float(row[i]) for i in range(len(row))}, "first"))
+        if len(escalate):
+            second = predict_batch([texts[i] for i in escalate], self.tokenizer, self.model,
+                                   batch_size=batch_size)
+            for i, (label, class_probs) in zip(escalate, second):
+                results[i] = (label, class_probs, "transformer")
+
+        return results
+
+    def try_first_stage(self, texts):
+        """
+        Score texts with the first stage only (and count them towards the escalation rate).
+        Returns:
+            (np.ndarray, np.ndarray): Probabilities in label-id order, and a boolean mask
+            of texts confident enough to answer without the transformer.
+        """
+        probs = self.first_stage.predict_proba(list(texts))
+        keep = top2_margin(probs) >= self.threshold
+        self.n_total += len(keep)
+        self.n_escalated += int((~keep).sum())
+        return probs, keep
+
+
+def load_cascade(tokenizer, model):
+    """Build a CascadePredictor from the configured first-stage artifact and a loaded transformer."""
+    first_stage, threshold = load_first_stage()
+    return CascadePredictor(first_stage, threshold, tokenizer, model)
+
+
+def is_enabled():
+    """Whether api_server.py and the trend scripts should route through the cascade."""
+    return _cascade_cfg.get('enabled', False)
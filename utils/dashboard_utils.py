@@ -9,23 +9,31 @@ import numpy as np
 from lime.lime_text import LimeTextExplainer
 import json
 import datetime
+from utils.runtime import apply_runtime_config
 
 # Load config to get model path
 with open("config.yaml", "r") as f:
     config = yaml.safe_load(f)
 _final_model_dir = config['paths']['model_dirs']['final']
+# Short-prefix-first scoring in predict_text (utils/progressive.py)
+_progressive_enabled = config.get('inference', {}).get('progressive', {}).get('enabled', False)
 
 # Load class label mapping for decoding predictions
 _label_map = {v: k for k, v in config['model']['label_mapping'].items()}
 
-def load_final_model():
+def load_final_model(model_dir=None):
     """
     Load the fine-tuned final model and its tokenizer from disk.
+    Args:
+        model_dir (str): Directory to load from instead of the configured final model
+                         (e.g. the distilled student in ``paths.model_dirs.student``).
     Returns:
         tokenizer, model: The loaded tokenizer and model ready for inference.
     """
-    tokenizer = AutoTokenizer.from_pretrained(_final_model_dir)
-    model = AutoModelForSequenceClassification.from_pretrained(_final_model_dir)
+    apply_runtime_config()
+    model_dir = model_dir or _final_model_dir
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
     model.eval()  # set model to evaluation mode
     return tokenizer, model
 
@@ -35,6 +43,12 @@ def predict_text(text, tokenizer, model):
     Returns:
         tuple: (predicted_label_name, confidences), where confidences is a dict of class probabilities.
     """
+    if _progressive_enabled:
+        from utils import progressive
+        predictor = progressive.get_predictor(tokenizer, model)
+        if predictor is not None:
+            label_name, class_probs, _length = predictor.predict([text])[0]
+            return label_name, class_probs
     # Prepare input
     inputs = tokenizer(
         text,
@@ -55,6 +69,34 @@ def predict_text(text, tokenizer, model):
     return label_name, class_probs
 
 
+def predict_batch(texts, tokenizer, model, batch_size=16):
+    """
+    Predict classes for many texts, running the model on padded batches.
+    Args:
+        texts (list of str): Texts to classify.
+        batch_size (int): Number of texts per forward pass.
+    Returns:
+        list of tuple: One (predicted_label_name, confidences) pair per text, as in predict_text.
+    """
+    results = []
+    for start in range(0, len(texts), batch_size):
+        chunk = list(texts[start:start + batch_size])
+        inputs = tokenizer(
+            chunk,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=config['training']['max_length']['bert_roberta']
+        )
+        with torch.no_grad():
+            probs = torch.softmax(model(**inputs).logits, dim=1).tolist()
+        for row in probs:
+            pred_idx = int(np.argmax(row))
+            label_name = _label_map.get(pred_idx, str(pred_idx))
+            results.append((label_name, {_label_map[i]: float(row[i]) for i in range(len(row))}))
+    return results
+
+
 def explain_prediction(text, tokenizer, model, num_features=6):
     """
     Generate an explanation for the model's prediction on the given text using LIME.
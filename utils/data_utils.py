@@ -3,14 +3,20 @@ Utility functions for loading and preparing dataset splits.
 Reads configuration to avoid hardcoded file paths.
 """
 
+import hashlib
+import json
+import os
+import numpy as np
 import pandas as pd
 import glob
 import yaml
 from sklearn.model_selection import train_test_split
+from utils.instrumentation import stage
 # Load configuration once at module import
 with open("config.yaml", "r") as f:
     config = yaml.safe_load(f)
 _DATA_PATH = config['paths']['raw_data']
+_split_cfg = config.get('splits', {})
 
 def load_raw_data():
     """
@@ -19,7 +25,9 @@ def load_raw_data():
         pd.DataFrame: DataFrame containing the raw dataset.
     """
     # Read the raw CSV containing all data (human, paraphrased, AI texts)
-    df = pd.read_csv(_DATA_PATH)
+    with stage("load") as record:
+        df = pd.read_csv(_DATA_PATH)
+        record.items = len(df)
     # Logging the shape for debug (to training.log if needed)
     print(f"[data_utils] Loaded raw data: {df.shape[0]} records, {df.shape[1]} columns.")
     return df
@@ -29,6 +37,14 @@ def flatten_dataset(df):
     Flatten raw dataset into a standard format with 'text' and 'label' columns.
     Supports melting human_written / ai_paraphrased / ai_generated into text+label.
     """
+    with stage("flatten") as record:
+        flat_df = _flatten(df)
+        record.items = len(flat_df)
+    print(f"[data_utils] Flattened dataset: {flat_df.shape[0]} records with columns {list(flat_df.columns)}")
+    return flat_df
+
+
+def _flatten(df):
     # 1) Melt the three variants if they exist
     variants = ['human_written', 'ai_paraphrased', 'ai_generated']
     text_columns = [c for c in variants if c in df.columns]
@@ -63,38 +79,312 @@ def flatten_dataset(df):
 
     # Reorder so text+label come first
     cols = ['text', 'label'] + [c for c in flat_df.columns if c not in ('text', 'label')]
-    flat_df = flat_df[cols]
+    return flat_df[cols]
 
-    print(f"[data_utils] Flattened dataset: {flat_df.shape[0]} records with columns {list(flat_df.columns)}")
-    return flat_df
 
+def split_indices(labels, val_fraction=0.1, test_fraction=0.1, random_state=42, groups=None):
+    """
+    Stratified train/val/test row indices, computed from the label column alone.
+    Selects exactly the rows (in the same order) that splitting the DataFrame
+    itself would, without copying any text.
+    Args:
+        labels (array-like): Label per row.
+        val_fraction (float): Proportion of data to use for validation.
+        test_fraction (float): Proportion of data to use for test.
+        random_state (int): Seed for reproducibility.
+        groups (array-like): Optional near-duplicate group id per row; whole groups
+            are assigned to one split (see ``_group_split_indices``).
+    Returns:
+        dict: 'train' / 'val' / 'test' → np.ndarray of int64 row positions.
+    """
+    labels = np.asarray(labels)
+    if groups is not None:
+        return _group_split_indices(labels, np.asarray(groups), val_fraction, test_fraction, random_state)
 
-def train_val_test_split(df, val_fraction=0.1, test_fraction=0.1, random_state=42):
+    # First split off the test set, then split the remaining into train and val
+    train_val_idx, test_idx = train_test_split(
+        np.arange(len(labels)), test_size=test_fraction, stratify=labels, random_state=random_state)
+    val_size = val_fraction / (1 - test_fraction)
+    train_idx, val_idx = train_test_split(
+        train_val_idx, test_size=val_size, stratify=labels[train_val_idx], random_state=random_state)
+    return {"train": train_idx.astype(np.int64), "val": val_idx.astype(np.int64), "test": test_idx.astype(np.int64)}
+
+
+def _group_split_indices(labels, groups, val_fraction, test_fraction, random_state):
+    """
+    Split whole duplicate groups, stratified by each group's first label.
+    Fractions are applied to groups, which matches row fractions closely when most
+    groups are singletons.
+    """
+    group_labels = pd.Series(labels).groupby(groups).first()
+    train_val_groups, test_groups = train_test_split(
+        group_labels.index.to_numpy(), test_size=test_fraction,
+        stratify=group_labels.to_numpy(), random_state=random_state)
+    val_size = val_fraction / (1 - test_fraction)
+    train_groups, val_groups = train_test_split(
+        train_val_groups, test_size=val_size,
+        stratify=group_labels.loc[train_val_groups].to_numpy(), random_state=random_state)
+
+    splits = {name: np.flatnonzero(np.isin(groups, split_groups)).astype(np.int64)
+              for name, split_groups in (("train", train_groups), ("val", val_groups), ("test", test_groups))}
+    n_dup_rows = len(groups) - len(group_labels)
+    print(f"[data_utils] Split by {len(group_labels)} near-duplicate groups "
+          f"({n_dup_rows} duplicate rows kept together).")
+    return splits
+
+
+def train_val_test_split(df, val_fraction=0.1, test_fraction=0.1, random_state=42, groups=None):
     """
     Split the DataFrame into training, validation, and test sets.
+    Near-duplicate texts (MinHash/LSH groups, see utils/dedup.py) are kept within a
+    single split when ``dedup.split_by_group`` is enabled, so syndicated copies and
+    paraphrases cannot leak between train and evaluation data.
+    Rows are chosen by ``split_indices``; for large corpora prefer a split manifest
+    (``get_split_manifest`` / ``load_split``), which never materializes the splits.
     Args:
         df (pd.DataFrame): Cleaned dataset with 'text' and 'label'.
         val_fraction (float): Proportion of data to use for validation.
         test_fraction (float): Proportion of data to use for test.
         random_state (int): Seed for reproducibility.
+        groups (array-like): Optional precomputed group id per row (overrides the config flag).
     Returns:
         (pd.DataFrame, pd.DataFrame, pd.DataFrame): train_df, val_df, test_df splits.
     """
-    # First split off the test set from the full dataset
-    train_val_df, test_df = train_test_split(
-        df, test_size=test_fraction, stratify=df['label'], random_state=random_state)
-    # Now split the remaining into train and val
-    val_size = val_fraction / (1 - test_fraction)
-    train_df, val_df = train_test_split(
-        train_val_df, test_size=val_size, stratify=train_val_df['label'], random_state=random_state)
-    # Reset indices for cleanliness
-    train_df.reset_index(drop=True, inplace=True)
-    val_df.reset_index(drop=True, inplace=True)
-    test_df.reset_index(drop=True, inplace=True)
+    if groups is None and config.get('dedup', {}).get('split_by_group', False):
+        from utils.dedup import near_duplicate_groups
+        groups = near_duplicate_groups(df['text'])
+    with stage("split", items=len(df)):
+        indices = split_indices(df['label'].to_numpy(), val_fraction, test_fraction, random_state, groups)
+        train_df, val_df, test_df = (df.take(indices[name]).reset_index(drop=True)
+                                     for name in ("train", "val", "test"))
     print(f"[data_utils] Split data: {len(train_df)} train, {len(val_df)} val, {len(test_df)} test.")
     return train_df, val_df, test_df
 
 
+def data_checksum(path, chunk_bytes=1 << 24):
+    """
+    SHA-256 of a data file, cached by (path, size, mtime) next to the split manifests
+    so unchanged files are not re-hashed on every load.
+    """
+    stat = os.stat(path)
+    cache_path = os.path.join(_split_cfg.get('manifest_dir', "data/splits/"), "checksums.json")
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as fh:
+            cache = json.load(fh)
+    if key not in cache:
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(chunk_bytes), b""):
+                digest.update(block)
+        cache = {k: v for k, v in cache.items() if not k.startswith(f"{os.path.abspath(path)}|")}
+        cache[key] = digest.hexdigest()
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(cache, fh, indent=1)
+        os.replace(tmp_path, cache_path)
+    return cache[key]
+
+
+def _read_columns(path, columns):
+    """Only `columns` of a parquet or CSV file."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def _iter_texts(path, batch_rows=50000):
+    """Stream the 'text' column of a parquet or CSV file."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=['text']):
+            yield from (t if t is not None else "" for t in batch.column(0).to_pylist())
+    else:
+        for chunk in pd.read_csv(path, usecols=['text'], chunksize=batch_rows):
+            yield from chunk['text'].fillna("").astype(str)
+
+
+def get_split_manifest(data_path=None, val_fraction=None, test_fraction=None, random_state=None,
+                       by_group=None):
+    """
+    Train/val/test indices for a cleaned dataset file, computed once and stored as a
+    small manifest (``<manifest_dir>/<checksum>_seed<seed>.npz``) keyed by the file's
+    checksum, the seed and the fractions. Only the label column is read (plus a
+    streamed pass over the text when near-duplicate groups are kept together).
+    Args:
+        data_path (str): Cleaned parquet/CSV with 'text' and 'label' (``paths.cleaned_data``).
+        val_fraction, test_fraction, random_state: Default to the ``splits`` config section.
+        by_group (bool): Keep near-duplicate groups together (``dedup.split_by_group``).
+    Returns:
+        dict: 'train' / 'val' / 'test' → row positions, plus 'meta' (dict).
+    """
+    data_path = data_path or config['paths']['cleaned_data']
+    val_fraction = _split_cfg.get('val_fraction', 0.1) if val_fraction is None else val_fraction
+    test_fraction = _split_cfg.get('test_fraction', 0.1) if test_fraction is None else test_fraction
+    random_state = _split_cfg.get('seed', 42) if random_state is None else random_state
+    if by_group is None:
+        by_group = config.get('dedup', {}).get('split_by_group', False)
+
+    checksum = data_checksum(data_path)
+    meta = {"data_path": data_path, "checksum": checksum, "seed": random_state,
+            "val_fraction": val_fraction, "test_fraction": test_fraction, "by_group": bool(by_group)}
+    fractions = f"v{val_fraction:g}_t{test_fraction:g}" + ("_grouped" if by_group else "")
+    manifest_path = os.path.join(_split_cfg.get('manifest_dir', "data/splits/"),
+                                 f"{checksum[:16]}_seed{random_state}_{fractions}.npz")
+    if os.path.exists(manifest_path):
+        with np.load(manifest_path) as npz:
+            return {**{name: npz[name] for name in ("train", "val", "test")},
+                    "meta": json.loads(str(npz['meta']))}
+
+    with stage("split") as record:
+        labels = _read_columns(data_path, ['label'])['label'].to_numpy()
+        record.items = len(labels)
+        groups = None
+        if by_group:
+            from utils.dedup import near_duplicate_groups
+            groups = near_duplicate_groups(_iter_texts(data_path))
+        indices = split_indices(labels, val_fraction, test_fraction, random_state, groups)
+    meta["rows"] = int(len(labels))
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, meta=json.dumps(meta), **indices)
+    os.replace(tmp_path, manifest_path)
+    print(f"[data_utils] Wrote split manifest {manifest_path}: " +
+          ", ".join(f"{len(indices[n])} {n}" for n in ("train", "val", "test")))
+    return {**indices, "meta": meta}
+
+
+def read_rows_at(path, indices, columns=None, batch_rows=65536):
+    """
+    The rows at positions `indices` (in that order) of a parquet or CSV file.
+    Parquet row groups holding no requested row are skipped; the others are
+    streamed in `batch_rows`-row batches and only the requested rows of each batch
+    are kept, so memory stays proportional to the selected rows plus one batch.
+    (A single-row-group file is still decoded in full, once per call.)
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    order = np.argsort(indices, kind="stable")
+    wanted = indices[order]
+    if not path.endswith(".parquet"):
+        keep = set(wanted.tolist())
+        df = pd.read_csv(path, usecols=columns, skiprows=lambda i: i > 0 and (i - 1) not in keep)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        pieces, group_start = [], 0
+        for rg in range(pf.metadata.num_row_groups):
+            n = pf.metadata.row_group(rg).num_rows
+            lo, hi = np.searchsorted(wanted, [group_start, group_start + n])
+            if hi > lo:
+                offset = group_start
+                for batch in pf.iter_batches(batch_size=batch_rows, row_groups=[rg], columns=columns):
+                    b_lo, b_hi = np.searchsorted(wanted, [offset, offset + batch.num_rows])
+                    if b_hi > b_lo:
+                        pieces.append(pa.Table.from_batches([batch]).take(pa.array(wanted[b_lo:b_hi] - offset)))
+                    offset += batch.num_rows
+                    if b_hi == hi:  # nothing requested in the rest of this group
+                        break
+            group_start += n
+        if pieces:
+            df = pa.concat_tables(pieces).to_pandas()
+        else:
+            df = pf.schema_arrow.empty_table().select(columns or pf.schema_arrow.names).to_pandas()
+    # Rows come back in file order; restore the manifest order
+    return df.take(np.argsort(order, kind="stable")).reset_index(drop=True)
+
+
+SPLIT_RECORD = "split_manifest.json"
+
+
+def current_split_record(data_path=None):
+    """
+    The manifest meta (data path, checksum, seed, fractions, grouping) that
+    ``load_split`` currently reads training data through, or None when it reads
+    the materialized ``paths.<name>_data`` files.
+    """
+    data_path = data_path or config['paths']['cleaned_data']
+    if _split_cfg.get('use_manifest', False) and os.path.exists(data_path):
+        return get_split_manifest(data_path)['meta']
+    return None
+
+
+def read_split_record(model_dir):
+    """The split record saved with a model (None: trained on the materialized split files)."""
+    path = os.path.join(model_dir, SPLIT_RECORD)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as fh:
+        return json.load(fh)
+
+
+def write_split_record(model_dir, record):
+    """Save (or, for None, clear) the split a model in `model_dir` was trained on."""
+    path = os.path.join(model_dir, SPLIT_RECORD)
+    if record is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(model_dir, exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(record, fh, indent=2)
+
+
+def _load_model_split(name, columns, model_dir):
+    """The split the model in `model_dir` was trained on (see ``load_split``)."""
+    record = read_split_record(model_dir)
+    if record is None:
+        if _split_cfg.get('use_manifest', False):
+            print(f"[data_utils] {model_dir} has no {SPLIT_RECORD}; using the materialized "
+                  f"{name} split it was trained on, not a manifest split.")
+        return pd.read_parquet(config['paths'][f'{name}_data'], columns=columns)
+    data_path = record['data_path']
+    if not os.path.exists(data_path) or data_checksum(data_path) != record['checksum']:
+        raise ValueError(f"{model_dir} was trained on a split of {data_path} with checksum "
+                         f"{record['checksum'][:16]}, which no longer matches that file; "
+                         f"refusing to evaluate or calibrate it against a different split.")
+    manifest = get_split_manifest(data_path, record['val_fraction'], record['test_fraction'],
+                                  record['seed'], record['by_group'])
+    with stage(f"load_{name}") as rec:
+        df = read_rows_at(data_path, manifest[name], columns)
+        rec.items = len(df)
+    return df
+
+
+def load_split(name, columns=None, data_path=None, model_dir=None):
+    """
+    Load one split ('train', 'val' or 'test') for training/evaluation scripts.
+    With ``splits.use_manifest`` the rows are read straight from ``paths.cleaned_data``
+    through the split manifest; otherwise (or when the cleaned file is missing) the
+    materialized ``paths.<name>_data`` parquet is read.
+    Scripts that evaluate or calibrate an existing model pass its `model_dir`, so they
+    get exactly the split it was trained on (its ``split_manifest.json``, written by
+    the training scripts, or the materialized files if it has none) whatever
+    ``use_manifest`` says; otherwise val/test could hold rows the model trained on.
+    Args:
+        name (str): Split name.
+        columns (list of str): Columns to read (default: all).
+        data_path (str): Cleaned dataset to split (``paths.cleaned_data``).
+        model_dir (str): Model whose training split to load.
+    Returns:
+        pd.DataFrame: The split, in the same row order as ``train_val_test_split``.
+    Raises:
+        ValueError: If the data file `model_dir` was split from has changed since.
+    """
+    if model_dir is not None:
+        return _load_model_split(name, columns, model_dir)
+    data_path = data_path or config['paths']['cleaned_data']
+    if _split_cfg.get('use_manifest', False) and os.path.exists(data_path):
+        manifest = get_split_manifest(data_path)
+        with stage(f"load_{name}") as record:
+            df = read_rows_at(data_path, manifest[name], columns)
+            record.items = len(df)
+        return df
+    return pd.read_parquet(config['paths'][f'{name}_data'], columns=columns)
+
+
 def load_modern_articles():
     """
     Load any new "modern articles" from the specified directory.
@@ -105,18 +395,20 @@ def load_modern_articles():
     modern_dir = config['paths']['modern_data_dir']
     files = glob.glob(f"{modern_dir}/*.csv")
     articles = []
-    for file in files:
-        try:
-            df = pd.read_csv(file)
-            # Assume each modern article file has at least a 'text' column
-            if 'text' not in df.columns:
-                # Flatten if needed (similar approach as flatten_dataset)
-                text_cols = [c for c in df.columns if c.lower() in ('title', 'content', 'body')]
-                if text_cols:
-                    df['text'] = df[text_cols].apply(lambda row: ' '.join(str(val) for val in row if not pd.isna(val)), axis=1)
-            articles.append(df[['text']].copy())
-        except Exception as e:
-            print(f"[data_utils] Warning: Skipping file {file} due to read error: {e}")
+    with stage("load") as record:
+        for file in files:
+            try:
+                df = pd.read_csv(file)
+                # Assume each modern article file has at least a 'text' column
+                if 'text' not in df.columns:
+                    # Flatten if needed (similar approach as flatten_dataset)
+                    text_cols = [c for c in df.columns if c.lower() in ('title', 'content', 'body')]
+                    if text_cols:
+                        df['text'] = df[text_cols].apply(lambda row: ' '.join(str(val) for val in row if not pd.isna(val)), axis=1)
+                articles.append(df[['text']].copy())
+                record.add(len(df))
+            except Exception as e:
+                print(f"[data_utils] Warning: Skipping file {file} due to read error: {e}")
     if articles:
         modern_df = pd.concat(articles, ignore_index=True)
         print(f"[data_utils] Loaded {modern_df.shape[0]} modern articles from {len(files)} file(s).")
@@ -0,0 +1,126 @@
+"""
+MinHash + LSH near-duplicate detection.
+Built in one streaming pass over the texts: each text's word shingles are
+MinHashed, the signature is split into LSH bands, and texts that share any
+band bucket are merged into the same duplicate group (union-find). Used to keep
+near-duplicates inside one dataset split and to score each wire story once in
+trend inference.
+"""
+import re
+import zlib
+
+import numpy as np
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_dedup_cfg = config.get('dedup', {})
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingle_hashes(text, shingle_size):
+    """32-bit hashes of the word k-shingles of a text (lowercased)."""
+    words = _WORD_RE.findall(text.lower()) if isinstance(text, str) else []
+    if len(words) < shingle_size:
+        words = words + [""] * (shingle_size - len(words))
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class _UnionFind:
+    """Disjoint sets over integer ids that grow as texts stream in."""
+    def __init__(self):
+        self.parent = []
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, x):
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:  # path compression
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class MinHashLSH:
+    """
+    Streaming MinHash/LSH index. Feed texts with ``add``; read groups with ``group_ids``.
+    With b bands of r rows, pairs with Jaccard similarity s collide with
+    probability 1 - (1 - s^r)^b (about 0.5 at s = (1/b)^(1/r)).
+    """
+    def __init__(self, num_perm=128, bands=16, shingle_size=5, seed=42):
+        """
+        Args:
+            num_perm (int): MinHash signature length (must be divisible by `bands`).
+            bands (int): Number of LSH bands.
+            shingle_size (int): Words per shingle.
+            seed (int): Seed for the permutation coefficients.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._buckets = [dict() for _ in range(bands)]
+        self._uf = _UnionFind()
+
+    def signature(self, text):
+        """MinHash signature (uint32 array of length num_perm) of a text."""
+        hashes = _shingle_hashes(text, self.shingle_size)
+        # (a*h + b) mod p over all shingles x permutations (uint64 wraps, as in datasketch)
+        phv = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME
+        return (phv & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def add(self, text):
+        """Index one text; returns its integer id (insertion order)."""
+        idx = self._uf.add()
+        sig = self.signature(text)
+        for band, buckets in enumerate(self._buckets):
+            # Python's 64-bit hash of the band keeps bucket keys small for large corpora
+            key = hash(sig[band * self.rows:(band + 1) * self.rows].tobytes())
+            first = buckets.setdefault(key, idx)
+            if first != idx:
+                self._uf.union(first, idx)
+        return idx
+
+    def group_ids(self):
+        """
+        Duplicate group of every indexed text.
+        Returns:
+            np.ndarray: One group id per text; a group's id is its lowest member index.
+        """
+        return np.fromiter((self._uf.find(i) for i in range(len(self._uf.parent))),
+                           dtype=np.int64, count=len(self._uf.parent))
+
+
+def near_duplicate_groups(texts, num_perm=None, bands=None, shingle_size=None, seed=42):
+    """
+    Group near-duplicate texts in one streaming pass (texts may be any iterable).
+    Defaults come from the ``dedup`` section of config.yaml.
+    Returns:
+        np.ndarray: Group id per text, in input order.
+    """
+    index = MinHashLSH(
+        num_perm=num_perm or _dedup_cfg.get('num_perm', 128),
+        bands=bands or _dedup_cfg.get('bands', 16),
+        shingle_size=shingle_size or _dedup_cfg.get('shingle_size', 5),
+        seed=seed,
+    )
+    for text in texts:
+        index.add(text)
+    return index.group_ids()
@@ -1,19 +1,15 @@
 import math
-from textstat import flesch_reading_ease, flesch_kincaid_grade
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from utils.readability import readability
 
 # Initialize VADER only once
 _vader = SentimentIntensityAnalyzer()
 
 def get_readability(text):
     """Return a tuple of (flesch_reading_ease, flesch_kincaid_grade) for the text."""
-    try:
-        ease = flesch_reading_ease(text)
-        grade = flesch_kincaid_grade(text)
-    except Exception as e:
-        # textstat can sometimes error on weird input; handle gracefully
-        ease, grade = 0.0, 0.0
-    return ease, grade
+    # Both scores come from one pass over the text (utils/readability.py)
+    scores = readability(text)
+    return scores["flesch_reading_ease"], scores["flesch_kincaid_grade"]
 
 def get_sentiment_score(text):
     """Return compound sentiment score of text using VADER."""
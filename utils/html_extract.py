@@ -0,0 +1,150 @@
+"""
+Main-content extraction from HTML.
+Parses incrementally with lxml's C parser (``iterparse``), drops script/style/
+navigation subtrees, prefers <article>/<main> over containers whose class/id look
+like boilerplate, and keeps text blocks by a word-count / link-density heuristic
+(in the spirit of jusText and Kohlschütter et al.'s boilerplate detection). Processed blocks are cleared
+from the tree straight away, so big pages stream through in bounded memory.
+Falls back to BeautifulSoup's ``get_text`` when lxml is not installed.
+"""
+import io
+import re
+
+import yaml
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - optional C extension
+    etree = None
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_html_cfg = config.get('inference', {}).get('html_extraction', {})
+
+# Subtrees that never hold article text
+_SKIP_TAGS = {"script", "style", "noscript", "template", "nav", "header", "footer", "aside", "form",
+              "iframe", "svg", "button", "select", "option", "canvas", "menu", "head", "title"}
+# Elements whose text is judged as one unit
+_BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "td", "th", "blockquote", "pre",
+               "figcaption", "dd", "dt", "h1", "h2", "h3", "h4", "h5", "h6", "body", "table", "ul", "ol"}
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_MAIN_TAGS = {"article", "main"}
+# class/id tokens (or parts of them, e.g. "site-footer") that mark boilerplate containers
+_BOILERPLATE_RE = re.compile(
+    r"(?:^|[-_])(?:nav|navbar|navigation|menu|footer|header|sidebar|comments?|share|sharing|social|"
+    r"cookies?|consent|banner|breadcrumbs?|promo|related|advert|ads?|subscribe|newsletter|popup|"
+    r"modal|masthead)(?:[-_]|$)", re.I)
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary"}
+_WS_RE = re.compile(r"\s+")
+
+
+def _is_boilerplate_container(elem, tag):
+    """Whether class/id/role hints mark `elem` as a navigation/sidebar/footer-like container."""
+    if tag in _MAIN_TAGS or tag in ("html", "body"):
+        return False
+    if elem.get("role") in _BOILERPLATE_ROLES:
+        return True
+    tokens = f"{elem.get('id', '')} {elem.get('class', '')}".split()
+    return any(_BOILERPLATE_RE.search(t) for t in tokens)
+
+
+def _iter_blocks(source, encoding=None):
+    """
+    Stream (text, tag, link_density, in_main, in_boilerplate) for every text block
+    of an HTML document. Nested blocks are emitted before (and removed from) their parents.
+    """
+    skip_depth = 0
+    main_depth = 0
+    boiler_depth = 0
+    for event, elem in etree.iterparse(source, events=("start", "end"), html=True,
+                                       encoding=encoding, huge_tree=True, remove_comments=True):
+        tag = elem.tag.lower() if isinstance(elem.tag, str) else ""
+        if event == "start":
+            if skip_depth or tag in _SKIP_TAGS:
+                skip_depth += 1
+            if tag in _MAIN_TAGS or elem.get("role") == "main":
+                main_depth += 1
+            if boiler_depth or _is_boilerplate_container(elem, tag):
+                boiler_depth += 1
+            continue
+
+        skipped = skip_depth > 0
+        if skipped:
+            skip_depth -= 1
+        if not skipped and tag in _BLOCK_TAGS:
+            text = _WS_RE.sub(" ", "".join(elem.itertext())).strip()
+            if text:
+                link_chars = sum(len("".join(a.itertext()).strip()) for a in elem.iter("a"))
+                yield text, tag, link_chars / len(text), main_depth > 0, boiler_depth > 0
+        if tag in _MAIN_TAGS or elem.get("role") == "main":
+            main_depth -= 1
+        if boiler_depth:
+            boiler_depth -= 1
+        if skipped or tag in _BLOCK_TAGS:
+            # Drop what was just processed; tail text still belongs to the parent
+            elem.clear(keep_tail=True)
+
+
+def _classify(blocks, min_words, max_link_density):
+    """Mark content blocks; short headings/blocks next to content are kept too."""
+    good = [len(t.split()) >= min_words and ld <= max_link_density for t, _, ld, *_ in blocks]
+    keep = list(good)
+    for i, (text, tag, ld, *_) in enumerate(blocks):
+        if keep[i] or ld > max_link_density:
+            continue
+        prev_good = i > 0 and good[i - 1]
+        next_good = i + 1 < len(blocks) and good[i + 1]
+        if (tag in _HEADING_TAGS and next_good) or (prev_good and next_good):
+            keep[i] = True
+    return keep
+
+
+def extract_main_text(source, min_words=None, max_link_density=None, encoding=None):
+    """
+    Extract the main article text of an HTML document.
+    A str is always treated as markup (never as a path), so client input can be
+    passed straight in; offline callers with a file use ``extract_main_text_from_path``.
+
+    Args:
+        source (bytes, str or file-like): Raw HTML, or an open binary file (read incrementally).
+        min_words (int): Words a block needs to count as content on its own.
+        max_link_density (float): Blocks with a larger share of link text are boilerplate.
+        encoding (str): Override the document encoding (otherwise detected by lxml).
+    Returns:
+        str: Content blocks separated by blank lines (so paragraph scoring can split them).
+    """
+    min_words = min_words or _html_cfg.get('min_words', 10)
+    max_link_density = max_link_density or _html_cfg.get('max_link_density', 0.33)
+
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+        encoding = encoding or "utf-8"
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    if etree is None:
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(source.read(), "html.parser").get_text(separator=" ")
+
+    try:
+        blocks = list(_iter_blocks(source, encoding=encoding))
+    except etree.XMLSyntaxError:  # empty document / nothing parseable
+        return ""
+    # Prefer <article>/<main> content and drop hinted boilerplate containers, but
+    # only as long as some content survives (class names are just a hint)
+    for narrow in (lambda b: b[3], lambda b: not b[4]):
+        subset = [b for b in blocks if narrow(b)]
+        if any(_classify(subset, min_words, max_link_density)):
+            blocks = subset
+    keep = _classify(blocks, min_words, max_link_density)
+    return "\n\n".join(text for (text, *_), k in zip(blocks, keep) if k)
+
+
+def extract_main_text_from_path(path, min_words=None, max_link_density=None, encoding=None):
+    """
+    ``extract_main_text`` of an HTML file on disk, streamed from the file.
+    For offline use only; never pass request data here.
+    """
+    with open(path, "rb") as fh:
+        return extract_main_text(fh, min_words, max_link_density, encoding)
@@ -0,0 +1,179 @@
+"""
+Article ingestion for the trend pipelines.
+Reads news CSVs with pyarrow's multithreaded streaming CSV reader, using a typed
+schema and only the date/text columns. The year is derived from the date column
+and the year filter is applied to each Arrow batch *before* any article text
+becomes a Python string or goes through clean_text, so rows outside the range
+cost only the CSV parse. Results can be written to a year-partitioned
+(``year=YYYY/``) parquet dataset that ``pd.read_parquet`` reads back directly.
+"""
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import yaml
+
+from utils.text_cleaner import clean_text
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_ingest_cfg = config.get('ingest', {})
+
+OUTPUT_SCHEMA = pa.schema([("year", pa.int16()), ("clean_text", pa.string())])
+
+
+def year_range():
+    """(first, last) year kept by the trend pipelines (``ingest.years``)."""
+    first, last = _ingest_cfg.get('years', [2015, 2025])
+    return int(first), int(last)
+
+
+def _years_of(dates):
+    """Year per value of a string date column (ISO dates fast path, pandas fallback)."""
+    try:
+        # ISO-8601 (e.g. the Guardian's webPublicationDate) starts with the year
+        return pc.cast(pc.utf8_slice_codeunits(dates, 0, 4), pa.int16())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        parsed = pd.to_datetime(dates.to_pandas(), errors='coerce', utc=True)
+        return pa.array(parsed.dt.year.astype('Int16'), type=pa.int16(), from_pandas=True)
+
+
+def _keep_mask(years, first, last):
+    return pc.fill_null(pc.and_(pc.greater_equal(years, first), pc.less_equal(years, last)), False)
+
+
+def iter_articles(path, date_col='date', text_col='article_text', years=None, stats=None):
+    """
+    Stream (year, clean_text) batches of the articles of one CSV inside `years`.
+    Args:
+        path (str): CSV file.
+        date_col (str): Date column (parsed to a year only).
+        text_col (str): Article text column.
+        years (tuple of int): Inclusive (first, last) year (default: ``ingest.years``).
+        stats (dict): Optional counter dict; 'rows_scanned' / 'rows_kept' are added to.
+    Yields:
+        pa.RecordBatch: Batches with OUTPUT_SCHEMA.
+    """
+    first, last = years or year_range()
+    read_options = pa_csv.ReadOptions(
+        use_threads=_ingest_cfg.get('use_threads', True),
+        block_size=int(_ingest_cfg.get('block_size_mb', 16)) << 20,
+    )
+    # Article bodies contain quoted newlines
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=[date_col, text_col],
+        column_types={date_col: pa.string(), text_col: pa.string()},
+        strings_can_be_null=True,
+    )
+    reader = pa_csv.open_csv(path, read_options=read_options, parse_options=parse_options,
+                             convert_options=convert_options)
+    for batch in reader:
+        years_col = _years_of(batch.column(date_col))
+        mask = _keep_mask(years_col, first, last)
+        kept_years = pc.filter(years_col, mask)
+        # Only rows inside the range are turned into Python strings and cleaned
+        texts = pc.filter(batch.column(text_col), mask).to_pylist()
+        if stats is not None:
+            stats['rows_scanned'] = stats.get('rows_scanned', 0) + batch.num_rows
+            stats['rows_kept'] = stats.get('rows_kept', 0) + len(texts)
+        if texts:
+            yield pa.RecordBatch.from_arrays(
+                [kept_years, pa.array([clean_text(t) for t in texts], type=pa.string())],
+                schema=OUTPUT_SCHEMA)
+
+
+def read_articles(path, date_col='date', text_col='article_text', years=None, stats=None):
+    """
+    ``iter_articles`` collected into a DataFrame.
+    Returns:
+        pd.DataFrame: Columns 'year' and 'clean_text'.
+    """
+    table = pa.Table.from_batches(list(iter_articles(path, date_col, text_col, years, stats)),
+                                  schema=OUTPUT_SCHEMA)
+    return table.to_pandas()
+
+
+def filter_frame(df, date_col='date', text_col='article_text', years=None, stats=None):
+    """
+    The same year filter + cleaning for sources already loaded by pandas (e.g. JSON).
+    Returns:
+        pd.DataFrame: Columns 'year' and 'clean_text'.
+    """
+    first, last = years or year_range()
+    year = pd.to_datetime(df[date_col], errors='coerce', utc=True).dt.year
+    keep = year.between(first, last)
+    if stats is not None:
+        stats['rows_scanned'] = stats.get('rows_scanned', 0) + len(df)
+        stats['rows_kept'] = stats.get('rows_kept', 0) + int(keep.sum())
+    return pd.DataFrame({
+        'year': year[keep].astype('int16').to_numpy(),
+        'clean_text': df.loc[keep, text_col].map(clean_text).to_numpy(),
+    })
+
+
+def write_year_partitioned(sources, output_dir=None, date_col='date', text_col='article_text', years=None):
+    """
+    Ingest CSV sources into a year-partitioned parquet dataset (``<output_dir>/year=YYYY/``).
+    The dataset is built in a temporary sibling directory and replaces `output_dir`
+    only once at least one source was ingested; otherwise the old output is kept.
+    Args:
+        sources (list of str): CSV files (missing ones are skipped with a warning).
+    Returns:
+        dict: 'rows_scanned', 'rows_kept' and 'files' counts, and the 'output_dir'.
+    Raises:
+        FileNotFoundError: If none of the sources exists.
+    """
+    output_dir = (output_dir or _ingest_cfg.get('output_dir', "data/trends_raw/")).rstrip("/\\")
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    if os.path.isdir(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    stats = {'files': 0, 'output_dir': output_dir}
+    try:
+        for path in sources:
+            if not os.path.exists(path):
+                print(f"[ingest] Source not found: {path}")
+                continue
+            stem = os.path.splitext(os.path.basename(path))[0]
+            ds.write_dataset(
+                iter_articles(path, date_col, text_col, years, stats),
+                tmp_dir, schema=OUTPUT_SCHEMA, format="parquet",
+                partitioning=ds.partitioning(pa.schema([("year", pa.int16())]), flavor="hive"),
+                basename_template=f"{stem}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            stats['files'] += 1
+        if not stats['files']:
+            raise FileNotFoundError(f"None of the sources exist; {output_dir} left unchanged: {sources}")
+        os.makedirs(tmp_dir, exist_ok=True)  # every row may have been filtered out
+        # Swap the new dataset in; the old one is only removed once it has been moved aside
+        old_dir = f"{output_dir}.old-{os.getpid()}"
+        if os.path.isdir(output_dir):
+            os.replace(output_dir, old_dir)
+        os.replace(tmp_dir, output_dir)
+        if os.path.isdir(old_dir):
+            shutil.rmtree(old_dir)
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+    print(f"[ingest] Kept {stats.get('rows_kept', 0)} of {stats.get('rows_scanned', 0)} rows "
+          f"from {stats['files']} file(s) → {output_dir}")
+    return stats
+
+
+def read_dataset(path=None, columns=None):
+    """
+    Read a dataset written by ``write_year_partitioned`` (a single parquet file works too).
+    Returns:
+        pd.DataFrame: With an integer 'year' column.
+    """
+    path = path or _ingest_cfg.get('output_dir', "data/trends_raw/")
+    df = pd.read_parquet(path, columns=columns)
+    if 'year' in df.columns:
+        df['year'] = df['year'].astype(int)  # hive partition keys come back as categories
+    return df
@@ -0,0 +1,352 @@
+"""
+Throughput and memory instrumentation for the offline data and trend pipelines.
+A script opens a run (``start_run`` / ``finish_run`` or the ``run`` context
+manager) and wraps each step in ``stage(name)`` — load, flatten, clean,
+featurize, tokenize, infer, aggregate. Every stage records wall time, items/s,
+peak RSS and (optionally) tracemalloc's top allocation sites and a cProfile or
+pyinstrument dump. ``finish_run`` prints a summary and writes a JSON run report
+to ``instrumentation.report_dir``, so a slow nightly run shows which stage to
+look at. Outside a run, ``stage`` only measures wall time and records nothing.
+"""
+import contextlib
+import functools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_instr_cfg = config.get('instrumentation', {})
+
+_current_run = None
+
+
+class StageRecord:
+    """Measurements of one stage; the body of ``stage`` updates ``items`` as it goes."""
+    def __init__(self, name, depth, items=None):
+        self.name = name
+        self.depth = depth
+        self.items = items
+        self.seconds = 0.0
+        self.peak_rss_mb = None
+        self.traced_peak_mb = None
+        self.top_allocations = []
+        self.profile_path = None
+        self._start = time.perf_counter()
+        self._child_rss_peak = 0
+        self._child_traced_peak = 0
+
+    def add(self, n):
+        """Count `n` more processed items."""
+        self.items = (self.items or 0) + n
+
+    @property
+    def elapsed(self):
+        """Seconds since the stage started (final duration once it has ended)."""
+        return self.seconds or time.perf_counter() - self._start
+
+    @property
+    def items_per_second(self):
+        if not self.items:
+            return None
+        return self.items / max(self.elapsed, 1e-9)
+
+    def progress(self, total):
+        """One-line progress message, e.g. for the scripts' "Processed i/N" prints."""
+        rate = self.items_per_second
+        return f"{self.items or 0}/{total}" + (f" ({rate:,.0f} items/s)" if rate else "")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "seconds": round(self.seconds, 4),
+            "items": self.items,
+            "items_per_second": round(self.items_per_second, 2) if self.items_per_second else None,
+            "peak_rss_mb": self.peak_rss_mb,
+            "tracemalloc_peak_mb": self.traced_peak_mb,
+            "top_allocations": self.top_allocations,
+            "profile": self.profile_path,
+        }
+
+
+class _Run:
+    def __init__(self, name, report_dir, trace_memory, top_n, profiler, profile_stages):
+        self.name = name
+        self.started = datetime.now()
+        self.report_dir = report_dir
+        self.trace_memory = trace_memory
+        self.top_n = top_n
+        self.profiler = profiler
+        self.profile_stages = set(profile_stages or [])
+        self.stages = []
+        self.stack = []
+        self.profiling = False
+        self.error = None
+        self.rss_scope = "stage" if _reset_rss_peak() else ("process" if _rss_peak_kb() is not None else None)
+        self._start = time.perf_counter()
+        self._owns_tracemalloc = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(_instr_cfg.get('tracemalloc_frames', 1))
+            self._owns_tracemalloc = True
+
+    @property
+    def slug(self):
+        return f"{self.name}_{self.started:%Y%m%d_%H%M%S}"
+
+
+def _rss_peak_kb():
+    """
+    Peak resident set size in KB since the last reset (Linux VmHWM), or the process
+    peak from getrusage; None where neither is available (e.g. Windows).
+    """
+    try:
+        with open("/proc/self/status", "r") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KB on Linux
+
+
+def _reset_rss_peak():
+    """Reset VmHWM so the next reading is the peak of the coming stage; False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _traced_peak():
+    return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+
+
+def _reset_traced_peak():
+    if tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+        tracemalloc.reset_peak()
+
+
+def _top_allocations(before, after, top_n):
+    """Source lines whose allocations grew the most between two tracemalloc snapshots."""
+    stats = after.compare_to(before, "lineno")
+    top = []
+    for stat in stats[:top_n]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        top.append({
+            "where": f"{frame.filename}:{frame.lineno}",
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff,
+        })
+    return top
+
+
+def _start_profiler(kind):
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[instrumentation] pyinstrument not installed; falling back to cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _dump_profiler(profiler, path_stem):
+    """Stop `profiler` and write its output next to the run report; returns the file path."""
+    if hasattr(profiler, "output_html"):
+        profiler.stop()
+        path = f"{path_stem}.html"
+        with open(path, "w") as fh:
+            fh.write(profiler.output_html())
+    else:
+        profiler.disable()
+        path = f"{path_stem}.prof"
+        profiler.dump_stats(path)  # view with `python -m pstats` or snakeviz
+    return path
+
+
+def start_run(name, report_dir=None, trace_memory=None, profile=None, profile_stages=None):
+    """
+    Begin recording stages for a pipeline run.
+    Args:
+        name (str): Run name (prefix of the report file).
+        report_dir (str): Where the JSON report and profiles go (``instrumentation.report_dir``).
+        trace_memory (bool): Record tracemalloc peaks and top allocators per stage
+            (slows allocation-heavy code; ``instrumentation.tracemalloc``).
+        profile (str): None, 'cprofile' or 'pyinstrument' (``instrumentation.profile``).
+        profile_stages (list of str): Only profile these stages (default: every outermost one).
+    Returns:
+        _Run: The active run (also reachable through ``stage``), or None if disabled.
+    """
+    global _current_run
+    if not _instr_cfg.get('enabled', True):
+        return None
+    _current_run = _Run(
+        name,
+        report_dir or _instr_cfg.get('report_dir', "runs/reports/"),
+        _instr_cfg.get('tracemalloc', False) if trace_memory is None else trace_memory,
+        _instr_cfg.get('tracemalloc_top', 10),
+        profile if profile is not None else _instr_cfg.get('profile'),
+        profile_stages if profile_stages is not None else _instr_cfg.get('profile_stages'),
+    )
+    return _current_run
+
+
+def finish_run():
+    """
+    End the active run, print a per-stage summary and write the JSON report.
+    Returns:
+        str: Path of the report (None if no run was active).
+    """
+    global _current_run
+    run_, _current_run = _current_run, None
+    if run_ is None:
+        return None
+    if run_._owns_tracemalloc:
+        tracemalloc.stop()
+
+    report = {
+        "run": run_.name,
+        "started": run_.started.isoformat(timespec="seconds"),
+        "wall_seconds": round(time.perf_counter() - run_._start, 3),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "pid": os.getpid(),
+        "peak_rss_scope": run_.rss_scope,
+        "error": run_.error,
+        "stages": [s.to_dict() for s in run_.stages],
+    }
+    os.makedirs(run_.report_dir, exist_ok=True)
+    path = os.path.join(run_.report_dir, f"{run_.slug}.json")
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+
+    print(f"[instrumentation] {run_.name}: {report['wall_seconds']:.1f}s total"
+          + (f" (failed: {run_.error})" if run_.error else ""))
+    for s in run_.stages:
+        rate = f"{s.items_per_second:>12,.1f}/s" if s.items_per_second else " " * 14
+        rss = f"{s.peak_rss_mb:>9.1f} MB" if s.peak_rss_mb is not None else ""
+        print(f"[instrumentation]   {'  ' * s.depth}{s.name:<{24 - 2 * s.depth}} "
+              f"{s.seconds:9.2f}s {rate} {rss}")
+    print(f"[instrumentation] Report written to {path}")
+    return path
+
+
+@contextlib.contextmanager
+def run(name, **kwargs):
+    """
+    ``start_run`` / ``finish_run`` as a context manager. The report is written even
+    on error, with the exception in its 'error' field and the stages reached so far.
+    """
+    run_ = start_run(name, **kwargs)
+    try:
+        yield run_
+    except BaseException as e:
+        if run_ is not None:
+            run_.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        finish_run()
+
+
+@contextlib.contextmanager
+def stage(name, items=None):
+    """
+    Measure one pipeline stage of the active run.
+    Stages may nest; a parent's peaks include its children's.
+    Args:
+        name (str): Stage name (load, flatten, clean, featurize, tokenize, infer, aggregate, ...).
+        items (int): Items processed, if known up front (otherwise set ``record.items``
+            or call ``record.add(n)`` inside the block).
+    Yields:
+        StageRecord: The record being filled in.
+    """
+    run_ = _current_run
+    record = StageRecord(name, len(run_.stack) if run_ else 0, items)
+    if run_ is None:
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - record._start
+        return
+
+    parent = run_.stack[-1] if run_.stack else None
+    if parent is not None:
+        # Readings so far belong to the parent before this stage resets the peaks
+        parent._child_rss_peak = max(parent._child_rss_peak, _rss_peak_kb() or 0)
+        parent._child_traced_peak = max(parent._child_traced_peak, _traced_peak())
+    _reset_rss_peak()
+    _reset_traced_peak()
+    before = tracemalloc.take_snapshot() if run_.trace_memory and tracemalloc.is_tracing() else None
+
+    profiler = None
+    wants_profile = (name in run_.profile_stages) if run_.profile_stages else parent is None
+    if run_.profiler and wants_profile and not run_.profiling:
+        profiler = _start_profiler(run_.profiler)
+        run_.profiling = True
+
+    run_.stages.append(record)
+    run_.stack.append(record)
+    record._start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - record._start
+        run_.stack.pop()
+        if profiler is not None:
+            os.makedirs(run_.report_dir, exist_ok=True)
+            record.profile_path = _dump_profiler(
+                profiler, os.path.join(run_.report_dir, f"{run_.slug}_{name}"))
+            run_.profiling = False
+
+        rss_now = _rss_peak_kb()
+        rss_peak = max(rss_now or 0, record._child_rss_peak)
+        record.peak_rss_mb = round(rss_peak / 1024, 1) if rss_now is not None else None
+        if before is not None:
+            traced_peak = max(_traced_peak(), record._child_traced_peak)
+            record.traced_peak_mb = round(traced_peak / 2 ** 20, 1)
+            record.top_allocations = _top_allocations(before, tracemalloc.take_snapshot(), run_.top_n)
+        if parent is not None:
+            parent._child_rss_peak = max(parent._child_rss_peak, rss_peak)
+            parent._child_traced_peak = max(parent._child_traced_peak, _traced_peak(), record._child_traced_peak)
+
+
+def instrumented(name):
+    """
+    Decorator form of ``stage``; items are taken from ``len()`` of the return value
+    (e.g. a DataFrame), or of the first argument when the result has no length.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = fn(*args, **kwargs)
+                for candidate in (result, args[0] if args else None):
+                    if hasattr(candidate, "__len__") and not isinstance(candidate, (str, bytes)):
+                        record.items = len(candidate)
+                        break
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,389 @@
+"""
+Durable bulk-scoring job queue on SQLite.
+A job is a parquet/CSV file split into row-range work items (CSV sources, and
+parquet files with row groups larger than an item, are rewritten once to parquet
+with one row group per item, so every item reads only its own rows). Workers
+(scripts/job_worker.py, any number, on any host that sees the same files) lease
+items, score them and write one result shard per item; a lease that is not
+renewed before it expires goes back to the queue, and an item that fails
+``max_attempts`` times fails its job. The worker that finishes the last item
+merges the shards into the job's output parquet.
+
+WAL journaling lets the API read progress while workers write, but it needs all
+processes on one host; set ``jobs.journal_mode: DELETE`` when workers on other
+hosts share the database over a network filesystem.
+"""
+import glob
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+import pandas as pd
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_jobs_cfg = config.get('jobs', {})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    text_column TEXT NOT NULL,
+    status      TEXT NOT NULL,      -- queued | running | done | failed | cancelled
+    n_rows      INTEGER NOT NULL,
+    n_items     INTEGER NOT NULL,
+    output_path TEXT,
+    error       TEXT,
+    created     REAL NOT NULL,
+    finished    REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id        TEXT NOT NULL,
+    item_id       INTEGER NOT NULL,
+    start_row     INTEGER NOT NULL,
+    end_row       INTEGER NOT NULL,
+    status        TEXT NOT NULL,    -- queued | leased | done | failed | cancelled
+    lease_owner   TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    PRIMARY KEY (job_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS items_by_status ON items (status, lease_expires);
+"""
+
+
+def count_rows(path):
+    """Number of rows in a parquet file (from its footer)."""
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def csv_to_parquet(path, text_column, out_path, row_group_rows):
+    """
+    Stream the text column of a CSV into a parquet file with `row_group_rows`-row groups.
+    Re-reading row ranges of a CSV means tokenizing every row before them, so a
+    job over an N-row CSV would parse O(N²/item_rows) rows; parquet row groups
+    are addressable, so items aligned to them read only their own rows.
+    Returns:
+        str: `out_path`.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    schema = pa.schema([(text_column, pa.string())])
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for chunk in pd.read_csv(path, usecols=[text_column], dtype={text_column: str},
+                                 chunksize=row_group_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False),
+                               row_group_size=row_group_rows)
+    return out_path
+
+
+def parquet_to_item_groups(path, text_column, out_path, row_group_rows):
+    """
+    The parquet source of a job: `path` itself when its row groups are no larger
+    than an item, otherwise its text column rewritten with `row_group_rows`-row groups
+    (a pandas-written file is one row group, which every item would decode in full).
+    Raises:
+        KeyError: If the file has no `text_column`.
+    Returns:
+        str: Path of the parquet file the workers read.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(path)
+    if text_column not in pf.schema_arrow.names:
+        raise KeyError(text_column)
+    meta = pf.metadata
+    if all(meta.row_group(rg).num_rows <= row_group_rows for rg in range(meta.num_row_groups)):
+        return path
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    schema = pa.schema([pf.schema_arrow.field(text_column)])
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for batch in pf.iter_batches(batch_size=row_group_rows, columns=[text_column]):
+            writer.write_table(pa.Table.from_batches([batch], schema=schema), row_group_size=row_group_rows)
+    return out_path
+
+
+def read_rows(path, text_column, start, end):
+    """
+    Texts of rows [start, end) of a parquet file.
+    Only the row groups overlapping the range are read.
+    """
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(path)
+    groups, first_row, offset = [], None, 0
+    for rg in range(pf.metadata.num_row_groups):
+        n = pf.metadata.row_group(rg).num_rows
+        if offset + n > start and offset < end:
+            groups.append(rg)
+            first_row = offset if first_row is None else first_row
+        offset += n
+    if not groups:
+        return []
+    table = pf.read_row_groups(groups, columns=[text_column])
+    column = table.column(text_column).slice(start - first_row, end - start)
+    return [t if t is not None else "" for t in column.to_pylist()]
+
+
+class JobQueue:
+    """
+    SQLite-backed job/work-item store shared by the API and the workers.
+    Every method opens its own short transaction, so one instance is safe per process.
+    """
+    def __init__(self, db_path=None, journal_mode=None, lease_seconds=None, max_attempts=None):
+        self.db_path = db_path or _jobs_cfg.get('db_path', "data/jobs/queue.sqlite")
+        self.journal_mode = journal_mode or _jobs_cfg.get('journal_mode', "WAL")
+        self.lease_seconds = lease_seconds or _jobs_cfg.get('lease_seconds', 300)
+        self.max_attempts = max_attempts or _jobs_cfg.get('max_attempts', 3)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ── Producer side (API) ────────────────────────────────────────────────
+    def create_job(self, source, text_column="text", item_rows=None):
+        """
+        Register a file and split it into row-range work items.
+        A CSV source (or a parquet one with row groups larger than an item) is first
+        rewritten to `<data_dir>/<job_id>/source.parquet` with one row group per item,
+        which the workers then read.
+        Raises:
+            KeyError / ValueError: If `text_column` is missing from the source.
+        Returns:
+            str: The new job id.
+        """
+        item_rows = item_rows or _jobs_cfg.get('item_rows', 2000)
+        job_id = uuid.uuid4().hex[:12]
+        converted = os.path.join(_jobs_cfg.get('data_dir', "data/jobs/"), job_id, "source.parquet")
+        if source.endswith(".parquet"):
+            source = parquet_to_item_groups(source, text_column, converted, item_rows)
+        else:
+            source = csv_to_parquet(source, text_column, converted, item_rows)
+        n_rows = count_rows(source)
+        bounds = [(i, s, min(s + item_rows, n_rows)) for i, s in enumerate(range(0, n_rows, item_rows))]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (id, source, text_column, status, n_rows, n_items, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, os.path.abspath(source), text_column, "queued" if bounds else "done",
+                 n_rows, len(bounds), time.time()))
+            conn.executemany(
+                "INSERT INTO items (job_id, item_id, start_row, end_row, status) VALUES (?, ?, ?, ?, 'queued')",
+                [(job_id, i, s, e) for i, s, e in bounds])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancel a job; queued items are dropped and leased ones are discarded on completion."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id))
+            conn.execute("UPDATE items SET status = 'cancelled' WHERE job_id = ? AND status IN ('queued', 'leased')",
+                         (job_id,))
+            conn.execute("COMMIT")
+            return cur.rowcount > 0
+        finally:
+            conn.close()
+
+    def progress(self, job_id):
+        """
+        Job status with per-status item counts.
+        Returns:
+            dict or None: None if the job does not exist.
+        """
+        conn = self._connect()
+        try:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status", (job_id,)).fetchall())
+            done_rows = conn.execute(
+                "SELECT COALESCE(SUM(end_row - start_row), 0) FROM items WHERE job_id = ? AND status = 'done'",
+                (job_id,)).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            **dict(job),
+            "items": counts,
+            "rows_done": done_rows,
+            "fraction_done": done_rows / job["n_rows"] if job["n_rows"] else 1.0,
+        }
+
+    def list_jobs(self, limit=50):
+        """Most recent jobs, newest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(r) for r in rows]
+
+    # ── Consumer side (workers) ────────────────────────────────────────────
+    def lease(self, owner=None):
+        """
+        Lease the next runnable item: queued, or leased with an expired lease.
+        Returns:
+            dict or None: Item row joined with its job's source/text_column, or None if idle.
+        """
+        owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT i.job_id, i.item_id, i.start_row, i.end_row, i.attempts, j.source, j.text_column "
+                "FROM items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE j.status IN ('queued', 'running') "
+                "AND (i.status = 'queued' OR (i.status = 'leased' AND i.lease_expires < ?)) "
+                "ORDER BY j.created, i.item_id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row["attempts"] >= self.max_attempts:
+                # Expired once too often: the worker holding it keeps dying on it
+                self._fail_item(conn, row["job_id"], row["item_id"], "lease expired too many times")
+                conn.execute("COMMIT")
+                return self.lease(owner)
+            conn.execute(
+                "UPDATE items SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE job_id = ? AND item_id = ?",
+                (owner, now + self.lease_seconds, row["job_id"], row["item_id"]))
+            conn.execute("UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (row["job_id"],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return {**dict(row), "owner": owner}
+
+    def heartbeat(self, item):
+        """
+        Extend an item's lease.
+        Returns:
+            bool: False if the lease was lost or the job cancelled (the worker should stop).
+        """
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE items SET lease_expires = ? WHERE job_id = ? AND item_id = ? "
+                "AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, item["job_id"], item["item_id"], item["owner"]))
+            return cur.rowcount > 0
+        finally:
+            conn.close()
+
+    def complete(self, item):
+        """
+        Mark a leased item done.
+        Returns:
+            bool: True if this was the job's last outstanding item (caller merges results).
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "UPDATE items SET status = 'done', lease_owner = NULL, lease_expires = NULL, error = NULL "
+                "WHERE job_id = ? AND item_id = ? AND status = 'leased' AND lease_owner = ?",
+                (item["job_id"], item["item_id"], item["owner"]))
+            remaining = conn.execute(
+                "SELECT COUNT(*) FROM items WHERE job_id = ? AND status != 'done'", (item["job_id"],)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return cur.rowcount > 0 and remaining == 0
+
+    def fail(self, item, error):
+        """Record a failed attempt; the item is retried until it runs out of attempts."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if item["attempts"] + 1 >= self.max_attempts:
+                self._fail_item(conn, item["job_id"], item["item_id"], error)
+            else:
+                conn.execute(
+                    "UPDATE items SET status = 'queued', lease_owner = NULL, lease_expires = NULL, error = ? "
+                    "WHERE job_id = ? AND item_id = ? AND status = 'leased' AND lease_owner = ?",
+                    (error, item["job_id"], item["item_id"], item["owner"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _fail_item(conn, job_id, item_id, error):
+        conn.execute("UPDATE items SET status = 'failed', lease_owner = NULL, error = ? "
+                     "WHERE job_id = ? AND item_id = ?", (error, job_id, item_id))
+        conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished = ? "
+                     "WHERE id = ? AND status IN ('queued', 'running')",
+                     (f"item {item_id}: {error}", time.time(), job_id))
+
+    def fail_job(self, job_id, error):
+        """Mark a job failed after its items ran (e.g. the shard merge raised)."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished = ? "
+                         "WHERE id = ? AND status IN ('queued', 'running')", (error, time.time(), job_id))
+        finally:
+            conn.close()
+
+    def finish(self, job_id, output_path):
+        """Mark a job done once its merged output is written."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET status = 'done', output_path = ?, finished = ? "
+                         "WHERE id = ? AND status = 'running'", (output_path, time.time(), job_id))
+        finally:
+            conn.close()
+
+
+def shard_path(job_id, item_id):
+    """Where a work item's results are written (one parquet shard per item)."""
+    return os.path.join(_jobs_cfg.get('data_dir', "data/jobs/"), job_id, f"part-{item_id:06d}.parquet")
+
+
+def merge_shards(job_id):
+    """
+    Concatenate a finished job's shards (in row order) into `<data_dir>/<job_id>/predictions.parquet`.
+    Returns:
+        str: Path of the merged file.
+    """
+    job_dir = os.path.join(_jobs_cfg.get('data_dir', "data/jobs/"), job_id)
+    parts = sorted(glob.glob(os.path.join(job_dir, "part-*.parquet")))
+    out_path = os.path.join(job_dir, "predictions.parquet")
+    merged = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True) if parts else pd.DataFrame()
+    merged.to_parquet(out_path, index=False)
+    return out_path
+
+
+def get_jobs_config():
+    """Return the ``jobs`` config section."""
+    return _jobs_cfg
@@ -0,0 +1,104 @@
+"""
+Prometheus metrics and per-request stage timing for the inference API.
+Every hot-path stage (tokenize, forward, LIME, file extraction) is wrapped in
+``stage(...)``, which feeds a latency histogram and, for sampled requests, a
+span list that the server returns as a ``Server-Timing`` header.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+import yaml
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_metrics_cfg = config.get('metrics', {})
+
+# Buckets cover sub-millisecond tokenization up to multi-second LIME runs
+_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "detector_stage_seconds", "Time spent in each inference stage",
+    ["stage"], buckets=_LATENCY_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    "detector_request_seconds", "End-to-end request latency per endpoint",
+    ["endpoint"], buckets=_LATENCY_BUCKETS)
+REQUESTS = Counter("detector_requests_total", "Requests received per endpoint", ["endpoint"])
+ERRORS = Counter("detector_errors_total", "Failed requests per endpoint", ["endpoint"])
+IN_FLIGHT = Gauge("detector_queue_depth", "Requests currently being processed per endpoint", ["endpoint"])
+BATCH_SIZE = Gauge("detector_batch_size", "Number of texts in the most recent model forward pass")
+CACHE_HIT_RATIO = Gauge("detector_cache_hit_ratio", "Hit ratio of the verdict cache since startup")
+CACHE_ENTRIES = Gauge("detector_cache_entries", "Entries currently held in the verdict cache")
+CASCADE_ESCALATION = Gauge("detector_cascade_escalation_rate", "Fraction of cascade requests escalated to the transformer")
+PROGRESSIVE_FULL_RATE = Gauge("detector_progressive_full_length_rate", "Fraction of progressive requests that needed the full length")
+ADMISSION_QUEUE = Gauge("detector_admission_queue", "Requests waiting for a model slot per request class", ["request_class"])
+ADMISSION_REJECTED = Counter("detector_admission_rejected_total", "Requests shed with 429 per request class", ["request_class"])
+QUEUE_WAIT = Histogram(
+    "detector_queue_wait_seconds", "Time from admission to getting a model slot",
+    ["request_class"], buckets=_LATENCY_BUCKETS)
+
+# Spans of the request currently being traced (None when not sampled)
+_current_trace = contextvars.ContextVar("detector_trace", default=None)
+
+
+def is_enabled():
+    """Whether the ``/metrics`` endpoint and request middleware should be installed."""
+    return _metrics_cfg.get('enabled', True)
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block of work as inference stage ``name``.
+    Always observed in the stage histogram; also appended to the active trace, if any.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        spans = _current_trace.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def start_trace(force=False):
+    """
+    Decide whether to trace the current request and, if so, activate a span list.
+    Args:
+        force (bool): Trace regardless of the configured sample rate (client sent ``X-Trace``).
+    Returns:
+        list or None: The span list to pass to ``server_timing_header`` later.
+    """
+    rate = _metrics_cfg.get('trace_sample_rate', 0.0)
+    if not force and (rate <= 0 or random.random() >= rate):
+        return None
+    spans = []
+    _current_trace.set(spans)
+    return spans
+
+
+def server_timing_header(spans, total=None):
+    """Format spans as a ``Server-Timing`` header value (durations in milliseconds)."""
+    parts = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in spans]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def update_cache_gauges(cache):
+    """Refresh the cache gauges from a ``PredictionCache``'s counters."""
+    if cache is None:
+        return
+    lookups = cache.hits + cache.misses
+    CACHE_HIT_RATIO.set(cache.hits / lookups if lookups else 0.0)
+    CACHE_ENTRIES.set(len(cache))
+
+
+def render_latest():
+    """Return (body, content_type) for the ``/metrics`` endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
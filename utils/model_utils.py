@@ -3,10 +3,21 @@ Model utilities for loading tokenizers and models.
 Also will include custom Trainer and metrics for fine-tuning transformers.
 """
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from transformers import Trainer
+from transformers import Trainer, TrainerCallback
+import copy
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+import joblib
+import numpy as np
 import torch
 import torch.nn.functional as F
+from torch.utils.data import Dataset
 from sklearn.metrics import accuracy_score, f1_score
+from utils.instrumentation import stage
 
 # Default model name mapping for convenience
 _model_name_map = {
@@ -46,14 +57,17 @@ class CustomTrainer(Trainer):
     """
     Custom Trainer that allows using weighted loss or focal loss during training.
     """
-    def __init__(self, use_focal=False, alpha=None, gamma=2.0, *args, **kwargs):
+    def __init__(self, use_focal=False, alpha=None, gamma=2.0, eval_logits_dtype=None, *args, **kwargs):
         """
         Args:
             use_focal (bool): If True, use focal loss; if False, use standard cross-entropy.
             alpha (list or torch.Tensor): Class weight coefficients for imbalance (len = num_labels).
             gamma (float): Focusing parameter for focal loss.
+            eval_logits_dtype (torch.dtype): If set (e.g. torch.float16), logits are cast per eval
+                batch before being accumulated, instead of keeping every prediction in float32.
         """
         super().__init__(*args, **kwargs)
+        self.eval_logits_dtype = eval_logits_dtype
         self.use_focal = use_focal
         # Convert alpha to tensor if provided (for weighted loss)
         if alpha is not None:
@@ -79,6 +93,27 @@ class CustomTrainer(Trainer):
         outputs = model(**inputs)
         logits  = outputs.logits if hasattr(outputs, "logits") else outputs[0]
 
+        loss = self.hard_label_loss(logits, labels)
+        return (loss, outputs) if return_outputs else loss
+
+    def prediction_step(self, model, inputs, prediction_loss_only, ignore_keys=None):
+        """
+        Standard prediction step, with logits downcast per batch when `eval_logits_dtype` is set.
+        """
+        loss, logits, labels = super().prediction_step(
+            model, inputs, prediction_loss_only, ignore_keys=ignore_keys
+        )
+        if self.eval_logits_dtype is not None and logits is not None:
+            if isinstance(logits, (tuple, list)):
+                logits = type(logits)(l.to(self.eval_logits_dtype) for l in logits)
+            else:
+                logits = logits.to(self.eval_logits_dtype)
+        return loss, logits, labels
+
+    def hard_label_loss(self, logits, labels):
+        """
+        Weighted cross-entropy (or focal loss) of `logits` against integer `labels`.
+        """
         # move class weights to same device
         if self.class_weights is not None:
             self.class_weights = self.class_weights.to(logits.device)
@@ -100,6 +135,131 @@ class CustomTrainer(Trainer):
         else:
             loss = ce_loss.mean()
 
+        return loss
+
+
+class TextDataset(Dataset):
+    """
+    Minimal torch Dataset over tokenizer encodings and integer labels
+    (same layout as the one used in the training notebooks).
+    Optional per-example teacher logits are passed through for distillation.
+    """
+    def __init__(self, encodings, labels, teacher_logits=None):
+        self.encodings = encodings
+        self.labels = labels
+        self.teacher_logits = teacher_logits
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        item = {k: torch.tensor(v[idx]) for k, v in self.encodings.items()}
+        item['labels'] = torch.tensor(self.labels[idx])
+        if self.teacher_logits is not None:
+            item['teacher_logits'] = torch.tensor(self.teacher_logits[idx], dtype=torch.float)
+        return item
+
+
+def compute_logits(texts, tokenizer, model, max_length=512, batch_size=32):
+    """
+    Run `model` over `texts` in batches and return the raw logits.
+    Returns:
+        np.ndarray: Array of shape (n_texts, num_labels).
+    """
+    model.eval()
+    device = next(model.parameters()).device
+    chunks = []
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(list(texts[start:start + batch_size]), return_tensors="pt",
+                           truncation=True, padding=True, max_length=max_length)
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        with torch.no_grad():
+            chunks.append(model(**inputs).logits.float().cpu().numpy())
+    return np.concatenate(chunks) if chunks else np.zeros((0, model.config.num_labels), dtype=np.float32)
+
+
+def build_student_model(teacher, num_layers, hidden_size=None, num_attention_heads=None,
+                        intermediate_size=None):
+    """
+    Build a compact student with the teacher's architecture family and vocabulary.
+    When the student keeps the teacher's width, its embeddings, classifier and an
+    evenly spaced subset of encoder layers are copied from the teacher
+    (DistilBERT-style initialisation); otherwise it starts from random weights.
+
+    Args:
+        teacher (PreTrainedModel): Fine-tuned teacher classifier.
+        num_layers (int): Number of encoder layers in the student.
+        hidden_size (int): Student hidden size (default: teacher's).
+        num_attention_heads (int): Student attention heads (default: teacher's).
+        intermediate_size (int): Student feed-forward size (default: teacher's).
+    Returns:
+        PreTrainedModel: The untrained student model.
+    """
+    cfg = copy.deepcopy(teacher.config)
+    cfg.num_hidden_layers = num_layers
+    cfg.hidden_size = hidden_size or cfg.hidden_size
+    cfg.num_attention_heads = num_attention_heads or cfg.num_attention_heads
+    cfg.intermediate_size = intermediate_size or cfg.intermediate_size
+    student = AutoModelForSequenceClassification.from_config(cfg)
+
+    t_cfg = teacher.config
+    same_width = (cfg.hidden_size, cfg.num_attention_heads, cfg.intermediate_size) == \
+                 (t_cfg.hidden_size, t_cfg.num_attention_heads, t_cfg.intermediate_size)
+    if same_width:
+        # Student layer j <- teacher layer layer_map[j]
+        layer_map = np.linspace(0, t_cfg.num_hidden_layers - 1, num_layers).round().astype(int)
+        teacher_state = teacher.state_dict()
+        student_state = student.state_dict()
+        for key in student_state:
+            m = re.search(r"encoder\.layer\.(\d+)\.", key)
+            src = key
+            if m:
+                src = key.replace(m.group(0), f"encoder.layer.{layer_map[int(m.group(1))]}.", 1)
+            if src in teacher_state and teacher_state[src].shape == student_state[key].shape:
+                student_state[key] = teacher_state[src].clone()
+        student.load_state_dict(student_state)
+    return student
+
+
+class DistillationTrainer(CustomTrainer):
+    """
+    CustomTrainer that mixes the hard-label loss with a KL term against the
+    teacher's temperature-softened probabilities (Hinton et al. distillation).
+    Expects each training batch to carry precomputed `teacher_logits`.
+    """
+    def __init__(self, temperature=2.0, distill_alpha=0.5, *args, **kwargs):
+        """
+        Args:
+            temperature (float): Softmax temperature applied to teacher and student logits.
+            distill_alpha (float): Weight of the soft (teacher) loss; 1 - alpha goes to the hard loss.
+        """
+        super().__init__(*args, **kwargs)
+        self.temperature = temperature
+        self.distill_alpha = distill_alpha
+
+    def compute_loss(
+        self,
+        model,
+        inputs,
+        return_outputs: bool = False,
+        num_items_in_batch: int = None,
+    ):
+        labels = inputs.pop("labels")
+        teacher_logits = inputs.pop("teacher_logits", None)
+
+        outputs = model(**inputs)
+        logits  = outputs.logits if hasattr(outputs, "logits") else outputs[0]
+
+        loss = self.hard_label_loss(logits, labels)
+        if teacher_logits is not None:
+            T = self.temperature
+            soft_loss = F.kl_div(
+                F.log_softmax(logits / T, dim=1),
+                F.softmax(teacher_logits.to(logits.device) / T, dim=1),
+                reduction="batchmean"
+            ) * (T * T)  # keep gradient scale independent of T
+            loss = self.distill_alpha * soft_loss + (1 - self.distill_alpha) * loss
+
         return (loss, outputs) if return_outputs else loss
 
 
@@ -112,4 +272,219 @@ def compute_metrics(eval_pred):
     preds = logits.argmax(axis=1)
     acc = accuracy_score(labels, preds)
     f1 = f1_score(labels, preds, average='macro')
-    return {"accuracy": acc, "f1": f1}
\ No newline at end of file
+    return {"accuracy": acc, "f1": f1}
+
+
+def evaluate_speed_and_f1(model, tokenizer, texts, labels, max_length=512, batch_size=32):
+    """
+    Score a model on a labelled set and time its CPU/GPU throughput.
+    Returns:
+        dict: {'accuracy', 'f1' (macro), 'texts_per_s'}.
+    """
+    start = time.perf_counter()
+    logits = compute_logits(texts, tokenizer, model, max_length=max_length, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    metrics = compute_metrics((logits, np.asarray(labels)))
+    metrics['texts_per_s'] = len(texts) / elapsed if elapsed else 0.0
+    return metrics
+
+
+def cpu_bf16_supported():
+    """Whether this CPU has native bfloat16 kernels (AVX512-BF16 / AMX) for autocast."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def estimate_batch_size(model, max_length, memory_budget_gb, gradient_checkpointing=False,
+                        bf16=False, target_effective_batch=None):
+    """
+    Pick the largest per-device batch that fits a memory budget, plus the gradient
+    accumulation needed to reach a target effective batch.
+
+    Static memory is weights + gradients + AdamW state (16 bytes/param in float32).
+    Per-sample activations follow the transformer estimate of Korthikanti et al.
+    (s*h*(34 + 5*a*s'/h) bytes per layer at 16-bit, s' = attention span, which is
+    the local window for Longformer); with checkpointing only each layer's input
+    is kept, plus one layer's activations during recomputation.
+
+    Args:
+        model (PreTrainedModel): Model to train.
+        max_length (int): Sequence length of training batches.
+        memory_budget_gb (float): Memory available for training.
+        gradient_checkpointing (bool): Whether activation checkpointing is on.
+        bf16 (bool): Whether activations are kept in bfloat16 (else float32).
+        target_effective_batch (int): Desired per-step batch; sets gradient accumulation.
+    Returns:
+        (int, int): (per_device_batch_size, gradient_accumulation_steps).
+    """
+    cfg = model.config
+    n_params = sum(p.numel() for p in model.parameters())
+    static_bytes = n_params * 16
+
+    s, h, a, layers = max_length, cfg.hidden_size, cfg.num_attention_heads, cfg.num_hidden_layers
+    window = getattr(cfg, "attention_window", None)
+    span = min(s, (max(window) if isinstance(window, (list, tuple)) else window) or s)
+    bytes_scale = 1.0 if bf16 else 2.0  # the estimate is for 16-bit activations
+    per_layer = s * h * (34 + 5 * a * span / h) * bytes_scale
+    if gradient_checkpointing:
+        per_sample = layers * s * h * (2 * bytes_scale) + per_layer
+    else:
+        per_sample = layers * per_layer
+
+    free_bytes = memory_budget_gb * 1024 ** 3 - static_bytes
+    batch = max(1, int(free_bytes // per_sample)) if free_bytes > 0 else 1
+    if target_effective_batch:
+        batch = min(batch, target_effective_batch)
+        accumulation = max(1, -(-target_effective_batch // batch))  # ceil division
+        # Spread the target evenly over the steps (fit=22, target=32 → 16×2, not 22×2)
+        batch = -(-target_effective_batch // accumulation)
+    else:
+        accumulation = 1
+    return batch, accumulation
+
+
+def apply_memory_profile(model, max_length, profile, target_effective_batch):
+    """
+    Turn on the memory-saving training profile for a model.
+    Enables activation checkpointing on the model and returns the TrainingArguments
+    overrides (batch size / accumulation from the memory budget, bf16 autocast,
+    chunked eval accumulation) plus the dtype for eval logits.
+
+    Args:
+        model (PreTrainedModel): Model to train (modified in place).
+        max_length (int): Training sequence length.
+        profile (dict): `training.memory_profile` section of config.yaml.
+        target_effective_batch (int): Desired effective batch size per optimizer step.
+    Returns:
+        (dict, torch.dtype or None): TrainingArguments kwargs and CustomTrainer eval_logits_dtype.
+    """
+    checkpointing = bool(profile.get('gradient_checkpointing', True))
+    if checkpointing:
+        model.gradient_checkpointing_enable()
+        model.config.use_cache = False
+
+    bf16 = bool(profile.get('bf16_autocast', True)) and (
+        torch.cuda.is_bf16_supported() if torch.cuda.is_available() else cpu_bf16_supported()
+    )
+    batch, accumulation = estimate_batch_size(
+        model, max_length, float(profile['memory_budget_gb']),
+        gradient_checkpointing=checkpointing, bf16=bf16,
+        target_effective_batch=target_effective_batch
+    )
+    print(f"[model_utils] Memory profile: batch {batch} x accumulation {accumulation}, "
+          f"checkpointing={checkpointing}, bf16={bf16}")
+    args = {
+        "per_device_train_batch_size": batch,
+        "per_device_eval_batch_size": batch,
+        "gradient_accumulation_steps": accumulation,
+        "bf16": bf16,
+        # Move accumulated eval logits off-device every few batches
+        "eval_accumulation_steps": int(profile.get('eval_accumulation_steps', 8)),
+    }
+    eval_dtype = torch.float16 if profile.get('eval_logits_fp16', True) else None
+    return args, eval_dtype
+
+
+def cached_tokenize(tokenizer, texts, max_length, cache_dir=None):
+    """
+    Tokenize texts (truncated, unpadded) through an on-disk cache shared between processes.
+    The cache key covers the tokenizer, `max_length` and the texts themselves, so trials
+    of the same architecture on the same split tokenize once. Writes are atomic.
+
+    Args:
+        tokenizer (PreTrainedTokenizer): Tokenizer to use.
+        texts (list of str): Texts to encode.
+        max_length (int): Truncation length.
+        cache_dir (str): Cache directory; tokenizes without caching when None.
+    Returns:
+        dict: Encodings (lists of token ids per key), as accepted by TextDataset.
+    """
+    if cache_dir is None:
+        with stage("tokenize", items=len(texts)):
+            return dict(tokenizer(list(texts), truncation=True, max_length=max_length))
+
+    digest = hashlib.sha256(f"{tokenizer.name_or_path}|{max_length}|".encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    path = os.path.join(cache_dir, f"{digest.hexdigest()[:32]}.joblib")
+    if os.path.exists(path):
+        return joblib.load(path)
+
+    with stage("tokenize", items=len(texts)):
+        encodings = dict(tokenizer(list(texts), truncation=True, max_length=max_length))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(encodings, tmp_path)
+    os.replace(tmp_path, path)
+    return encodings
+
+
+class TrialPruningCallback(TrainerCallback):
+    """
+    Stops a trial that keeps trailing its sibling trials.
+    After every evaluation the trial records its F1 in `<run_dir>/<trial_id>/progress.json`
+    and compares it with the best F1 any other trial reached at the same epoch; after
+    `patience` consecutive evaluations more than `margin` behind, training stops.
+    Only evaluations during training count: the trainer's final ``evaluate()`` (which
+    may score the restored best checkpoint) is ignored, and a trial is only marked
+    pruned if the stop cut its training short.
+    """
+    def __init__(self, run_dir, trial_id, patience=1, margin=0.02, metric="eval_f1"):
+        self.run_dir = run_dir
+        self.trial_id = trial_id
+        self.patience = patience
+        self.margin = margin
+        self.metric = metric
+        self.history = {}
+        self.strikes = 0
+        self.stop_requested = False
+        self.training_ended = False
+        self.pruned = False
+
+    def _write_progress(self):
+        path = os.path.join(self.run_dir, self.trial_id, "progress.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"history": self.history, "pruned": self.pruned}, f)
+        os.replace(path + ".tmp", path)
+
+    def _best_of_others(self, epoch_key):
+        best = None
+        for path in glob.glob(os.path.join(self.run_dir, "*", "progress.json")):
+            if os.path.basename(os.path.dirname(path)) == self.trial_id:
+                continue
+            try:
+                with open(path) as f:
+                    value = json.load(f)["history"].get(epoch_key)
+            except (OSError, ValueError, KeyError):
+                continue
+            if value is not None and (best is None or value > best):
+                best = value
+        return best
+
+    def on_evaluate(self, args, state, control, metrics=None, **kwargs):
+        if self.training_ended or not metrics or self.metric not in metrics:
+            return control
+        epoch_key = str(int(round(state.epoch or 0)))
+        score = float(metrics[self.metric])
+        self.history[epoch_key] = score
+
+        best = self._best_of_others(epoch_key)
+        self.strikes = self.strikes + 1 if best is not None and score < best - self.margin else 0
+        if self.strikes >= self.patience:
+            self.stop_requested = True
+            control.should_training_stop = True
+            print(f"[model_utils] Pruning trial {self.trial_id}: {self.metric} {score:.4f} "
+                  f"vs best {best:.4f} at epoch {epoch_key}")
+        self._write_progress()
+        return control
+
+    def on_train_end(self, args, state, control, **kwargs):
+        self.training_ended = True
+        # A stop requested at the last evaluation of a full run did not prune anything
+        self.pruned = self.stop_requested and state.global_step < state.max_steps
+        self._write_progress()
+        return control
@@ -0,0 +1,113 @@
+"""
+Paragraph-level incremental scoring.
+A document is split into paragraphs (long paragraphs into sentence-aligned
+windows); each segment's logits are cached by content hash, so after a user
+edits one paragraph only that paragraph goes through the model. The document
+verdict combines the per-segment logits, weighted by segment length.
+"""
+import re
+
+import numpy as np
+import torch
+
+from utils.prediction_cache import PredictionCache, content_hash
+
+_PARAGRAPH_RE = re.compile(r"\S(?:.*?\S)?(?=\s*\n\s*\n|\s*$)", re.S)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_paragraphs(text, max_chars=3000):
+    """
+    Split text into paragraph segments with their character offsets.
+    Paragraphs are separated by blank lines; any paragraph longer than ``max_chars``
+    is cut into windows at sentence boundaries so no segment is silently truncated.
+    Returns:
+        list of (int, int): (start, end) offsets into ``text``, one per segment.
+    """
+    spans = []
+    for m in _PARAGRAPH_RE.finditer(text):
+        start, end = m.span()
+        if end - start <= max_chars:
+            spans.append((start, end))
+            continue
+        # Window a long paragraph on sentence ends (hard cut if a sentence is huge)
+        win_start = start
+        cuts = [start + s.end() for s in _SENTENCE_END_RE.finditer(text[start:end])] + [end]
+        prev = start
+        for cut in cuts:
+            if cut - win_start > max_chars and prev > win_start:
+                spans.append((win_start, prev))
+                win_start = prev
+            while cut - win_start > max_chars:
+                spans.append((win_start, win_start + max_chars))
+                win_start += max_chars
+            prev = cut
+        if win_start < end:
+            spans.append((win_start, end))
+    return [(s, e) for s, e in spans if text[s:e].strip()]
+
+
+class ParagraphScorer:
+    """
+    Scores documents paragraph by paragraph, reusing cached segment logits.
+    """
+    def __init__(self, tokenizer, model, max_length=512, max_chars=3000, cache_entries=50000,
+                 batch_size=16):
+        """
+        Args:
+            max_length (int): Tokenizer truncation length per segment.
+            max_chars (int): Longest segment before a paragraph is windowed.
+            cache_entries (int): LRU size of the segment-logits cache.
+            batch_size (int): Changed segments scored per forward pass.
+        """
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_length = max_length
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+        self.cache = PredictionCache(max_entries=cache_entries)
+
+    def _segment_logits(self, segments):
+        """Logits for each segment; only cache misses reach the model."""
+        keys = [content_hash(s) for s in segments]
+        logits = [self.cache.get(k) for k in keys]
+        missing = [i for i, l in enumerate(logits) if l is None]
+        for start in range(0, len(missing), self.batch_size):
+            idx = missing[start:start + self.batch_size]
+            inputs = self.tokenizer([segments[i] for i in idx], return_tensors="pt",
+                                    truncation=True, padding=True, max_length=self.max_length)
+            with torch.no_grad():
+                batch_logits = self.model(**inputs).logits.float().numpy()
+            for i, row in zip(idx, batch_logits):
+                logits[i] = row
+                self.cache.put(keys[i], row)
+        return np.stack(logits), set(missing)
+
+    def score(self, text):
+        """
+        Score a document incrementally.
+        Returns:
+            dict: 'probs' (document class probabilities, label-id order), 'rescored' (segments
+            that went through the model) and 'paragraphs', a list of
+            {'start', 'end', 'probs', 'cached'} per segment.
+        """
+        spans = split_paragraphs(text, self.max_chars)
+        if not spans:
+            spans = [(0, len(text))]
+        segments = [text[s:e] for s, e in spans]
+        logits, rescored = self._segment_logits(segments)
+
+        # Length-weighted mean of segment logits approximates a whole-document pass
+        weights = np.array([len(s.split()) for s in segments], dtype=np.float64)
+        weights = weights / weights.sum() if weights.sum() else np.full(len(segments), 1 / len(segments))
+        doc_probs = torch.softmax(torch.tensor(weights @ logits), dim=0).tolist()
+        seg_probs = torch.softmax(torch.tensor(logits), dim=1).tolist()
+
+        return {
+            "probs": doc_probs,
+            "rescored": len(rescored),
+            "paragraphs": [
+                {"start": s, "end": e, "probs": p, "cached": i not in rescored}
+                for i, ((s, e), p) in enumerate(zip(spans, seg_probs))
+            ],
+        }
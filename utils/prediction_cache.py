@@ -0,0 +1,90 @@
+"""
+In-memory cache of prediction results keyed by content hash.
+Lets repeat requests for the same text (e.g. the browser extension re-scanning a
+popular article) skip tokenization, the forward pass and LIME entirely.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_inference_cfg = config.get('inference', {})
+
+
+def content_hash(text):
+    """
+    Return the hex SHA-256 digest of a text (UTF-8 encoded).
+    The browser extension computes the same digest with ``crypto.subtle``.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def truncation_hint():
+    """
+    Number of characters worth sending to the server for one prediction.
+    Anything past this is cut off by the tokenizer's ``max_length`` anyway.
+    Returns:
+        dict: {'max_chars': int, 'max_length': int}
+    """
+    max_length = _inference_cfg.get('max_length', 512)
+    chars_per_token = _inference_cfg.get('chars_per_token', 6)
+    return {"max_chars": int(max_length * chars_per_token), "max_length": max_length}
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU mapping of content hash -> prediction payload.
+    """
+    def __init__(self, max_entries=10000):
+        """
+        Args:
+            max_entries (int): Number of entries kept before the least recently used is evicted.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached payload for ``key`` or None (and count the hit/miss)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting the oldest entry if full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_cache_config():
+    """Return the ``inference`` config section (cache and paragraph-cache settings)."""
+    return _inference_cfg
+
+
+def get_cache():
+    """
+    Build a PredictionCache sized from the ``inference.cache`` config section.
+    Returns None when caching is disabled.
+    """
+    cache_cfg = _inference_cfg.get('cache', {})
+    if not cache_cfg.get('enabled', True):
+        return None
+    return PredictionCache(max_entries=cache_cfg.get('max_entries', 10000))
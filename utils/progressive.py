@@ -0,0 +1,223 @@
+"""
+Progressive-length inference.
+Each text is tokenized once (up to the full length). The model first sees a short
+prefix (e.g. 128 tokens); only texts whose top-two probability margin falls below
+a threshold calibrated on the validation split are re-scored on a longer prefix
+(256, then 512 tokens). Texts that fit inside a prefix are final at that length.
+Thresholds come from ``scripts/calibrate_progressive.py``, which holds accuracy
+within ``inference.progressive.max_accuracy_drop`` of always using the full length.
+"""
+import json
+import os
+
+import numpy as np
+import torch
+import yaml
+
+from utils.cascade import calibrate_threshold, top2_margin
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_progressive_cfg = config.get('inference', {}).get('progressive', {})
+_label_map = {v: k for k, v in config['model']['label_mapping'].items()}
+
+_predictors = {}
+
+
+def prefix_ids(ids, length):
+    """First `length` tokens of an encoded text, keeping its closing special token."""
+    if len(ids) <= length:
+        return ids
+    return ids[:length - 1] + ids[-1:]
+
+
+class ProgressivePredictor:
+    """
+    Short-prefix-first classification; extends a text only while it stays uncertain.
+    Keeps running counts so callers can report how often each length was needed.
+    """
+    def __init__(self, tokenizer, model, lengths=(128, 256, 512), thresholds=None, bucketed=None):
+        """
+        Args:
+            lengths (sequence of int): Prefix lengths tried in order; the last is the full length.
+            thresholds (sequence of float): Margin needed to stop at each length but the last
+                (``inf`` never stops there).
+            bucketed (BucketedPredictor): Run prefixes through its warmed graphs instead of
+                the eager model (prefix lengths should then match its buckets).
+        """
+        self.tokenizer = tokenizer
+        self.model = model
+        self.lengths = sorted(lengths)
+        self.thresholds = list(thresholds) if thresholds is not None else [float("inf")] * (len(self.lengths) - 1)
+        self.bucketed = bucketed
+        self.n_total = 0
+        self.n_final = np.zeros(len(self.lengths), dtype=np.int64)  # texts answered at each length
+        self.tokens_run = 0      # tokens actually fed to the model
+        self.tokens_full = 0     # tokens a single full-length pass would have fed
+
+    @property
+    def full_length_rate(self):
+        """Fraction of texts seen so far that needed the full length."""
+        return float(self.n_final[-1] / self.n_total) if self.n_total else 0.0
+
+    @property
+    def relative_compute(self):
+        """Tokens run / tokens of one full-length pass per text (below 1.0 = saving)."""
+        return self.tokens_run / self.tokens_full if self.tokens_full else 0.0
+
+    def stats(self):
+        """Counters as a dict (fraction answered per length, full-length rate, relative compute)."""
+        return {
+            "texts": self.n_total,
+            "answered_at": {int(L): (float(n / self.n_total) if self.n_total else 0.0)
+                            for L, n in zip(self.lengths, self.n_final)},
+            "full_length_rate": self.full_length_rate,
+            "relative_compute": self.relative_compute,
+        }
+
+    def _forward(self, id_lists, batch_size):
+        if self.bucketed is not None:
+            return self.bucketed.logits_from_ids(id_lists)
+        device = next(self.model.parameters()).device
+        out = []
+        for start in range(0, len(id_lists), batch_size):
+            batch = self.tokenizer.pad({"input_ids": id_lists[start:start + batch_size]}, return_tensors="pt")
+            batch = {k: v.to(device) for k, v in batch.items()}
+            with torch.no_grad():
+                out.append(self.model(**batch).logits.float().cpu().numpy())
+        return np.concatenate(out)
+
+    def encode(self, texts):
+        """Token ids of every text, truncated to the full length (the only tokenization done)."""
+        return self.tokenizer(list(texts), truncation=True, max_length=self.lengths[-1])['input_ids']
+
+    def logits_per_length(self, texts, batch_size=16):
+        """
+        Logits of every text at every prefix length (for calibration).
+        Returns:
+            (list of np.ndarray, np.ndarray): Logits per length, and token count per text.
+        """
+        encoded = self.encode(texts)
+        per_length = [self._forward([prefix_ids(ids, L) for ids in encoded], batch_size) for L in self.lengths]
+        return per_length, np.array([len(ids) for ids in encoded])
+
+    def logits(self, texts, batch_size=16):
+        """
+        Logits of each text at the shortest length it was confident at.
+        Returns:
+            (np.ndarray, np.ndarray): Logits (n_texts, num_labels) and the length used per text.
+        """
+        encoded = self.encode(texts)
+        n = len(encoded)
+        logits = np.zeros((n, len(_label_map)), dtype=np.float32)
+        used = np.zeros(n, dtype=np.int64)
+        active = np.arange(n)
+        for k, length in enumerate(self.lengths):
+            if not len(active):
+                break
+            prefixes = [prefix_ids(encoded[i], length) for i in active]
+            stage_logits = self._forward(prefixes, batch_size)
+            logits[active] = stage_logits
+            used[active] = length
+            self.tokens_run += sum(len(p) for p in prefixes)
+            if k == len(self.lengths) - 1:
+                done = np.ones(len(active), dtype=bool)
+            else:
+                probs = torch.softmax(torch.from_numpy(stage_logits), dim=1).numpy()
+                complete = np.array([len(encoded[i]) <= length for i in active])
+                done = complete | (top2_margin(probs) >= self.thresholds[k])
+            self.n_final[k] += int(done.sum())
+            active = active[~done]
+        self.n_total += n
+        self.tokens_full += sum(len(ids) for ids in encoded)
+        return logits, used
+
+    def predict(self, texts, batch_size=16):
+        """
+        Classify texts progressively.
+        Returns:
+            list of (str, dict, int): (label_name, class_probs, tokens_used_length) per text;
+            label/probs match predict_text's format.
+        """
+        logits, used = self.logits(texts, batch_size)
+        probs = torch.softmax(torch.from_numpy(logits), dim=1).numpy()
+        return [(_label_map[int(np.argmax(row))], {_label_map[i]: float(row[i]) for i in range(len(row))}, int(L))
+                for row, L in zip(probs, used)]
+
+
+def calibrate_thresholds(per_length_logits, token_counts, label_ids, lengths, max_accuracy_drop=0.005):
+    """
+    Per-length margin thresholds that keep accuracy within `max_accuracy_drop` of the full length.
+    Each shorter length gets an equal share of the allowed drop, measured on the texts that
+    reach it (longer than the prefix and not already answered by a shorter one).
+
+    Args:
+        per_length_logits (list of np.ndarray): Validation logits at each length (``logits_per_length``).
+        token_counts (np.ndarray): Token count per validation text.
+        label_ids (array-like): True label ids.
+        lengths (sequence of int): The prefix lengths, ascending.
+        max_accuracy_drop (float): Allowed accuracy loss vs. always running the full length.
+    Returns:
+        list of float: One threshold per length except the last.
+    """
+    label_ids = np.asarray(label_ids)
+    full_correct = per_length_logits[-1].argmax(axis=1) == label_ids
+    budget = max_accuracy_drop / max(len(lengths) - 1, 1)
+    reaching = np.ones(len(label_ids), dtype=bool)
+    thresholds = []
+    for k, length in enumerate(lengths[:-1]):
+        candidates = reaching & (token_counts > length)
+        if not candidates.any():
+            # Never calibrated at this length: never answer here (longer texts go on)
+            thresholds.append(float("inf"))
+            continue
+        logits = per_length_logits[k][candidates]
+        probs = torch.softmax(torch.from_numpy(logits.astype(np.float32)), dim=1).numpy()
+        margins = top2_margin(probs)
+        short_correct = logits.argmax(axis=1) == label_ids[candidates]
+        target = full_correct[candidates].mean() - budget
+        threshold, _ = calibrate_threshold(margins, short_correct, target, second_correct=full_correct[candidates])
+        thresholds.append(threshold)
+        # Texts answered here don't reach the next length
+        stopped = np.zeros(len(label_ids), dtype=bool)
+        stopped[np.flatnonzero(candidates)[margins >= threshold]] = True
+        reaching &= ~stopped & (token_counts > length)
+    return thresholds
+
+
+def save_thresholds(lengths, thresholds, report=None, path=None):
+    """Store calibrated thresholds (plus the calibration report) as JSON."""
+    path = path or _progressive_cfg.get('thresholds_path', "diagrams/progressive_thresholds.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump({"lengths": list(lengths), "thresholds": thresholds, "report": report or {}}, fh, indent=2)
+
+
+def load_progressive(tokenizer, model, bucketed=None):
+    """
+    Build a ProgressivePredictor from the calibrated thresholds file.
+    Returns:
+        ProgressivePredictor or None: None (with a notice) if the thresholds were never calibrated.
+    """
+    path = _progressive_cfg.get('thresholds_path', "diagrams/progressive_thresholds.json")
+    if not os.path.exists(path):
+        print(f"[progressive] No calibrated thresholds at {path}; run scripts/calibrate_progressive.py. "
+              f"Using full-length inference.")
+        return None
+    with open(path, "r") as fh:
+        saved = json.load(fh)
+    return ProgressivePredictor(tokenizer, model, saved['lengths'], saved['thresholds'], bucketed=bucketed)
+
+
+def get_predictor(tokenizer, model):
+    """Shared ProgressivePredictor for a loaded tokenizer/model pair (None if unavailable)."""
+    key = (id(tokenizer), id(model))
+    if key not in _predictors:
+        _predictors[key] = load_progressive(tokenizer, model)
+    return _predictors[key]
+
+
+def is_enabled():
+    """Whether predict_text, api_server.py and the trend scripts should score progressively."""
+    return _progressive_cfg.get('enabled', False)
@@ -0,0 +1,231 @@
+"""
+Structured pruning of attention heads and encoder layers.
+Head importance follows Michel et al. (2019): the gradient of the loss w.r.t. a
+per-head gate, taken here as the Taylor term sum(context_h * dL/dcontext_h) on
+each head's attention output, so it also works once heads have been pruned
+unevenly. Layer importance is the loss increase when a layer is skipped; the
+hidden states entering each layer are cached and replayed, so skipping layer i
+only re-runs the layers after it. Pruned models keep ``config.pruned_heads`` /
+``num_hidden_layers`` and reload with ``load_final_model(model_dir=...)``.
+"""
+import numpy as np
+import torch
+import torch.nn.functional as F
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_pruning_cfg = config.get('pruning', {})
+
+
+def _encoder_layers(model):
+    """The encoder's layer ModuleList (BERT / RoBERTa / Longformer layout)."""
+    encoder = getattr(model.base_model, "encoder", None)
+    if encoder is None or not hasattr(encoder, "layer"):
+        raise ValueError(f"Structured pruning needs a BERT-style encoder; got {type(model).__name__}")
+    return encoder
+
+
+def _head_layout(layer):
+    """(current number of heads, head size) of one encoder layer's self-attention."""
+    attn = layer.attention.self
+    n_heads = getattr(attn, "num_attention_heads", None) or attn.num_heads
+    head_size = getattr(attn, "attention_head_size", None) or attn.head_dim
+    return n_heads, head_size
+
+
+def _original_heads(layer, n_original):
+    """Original indices of the heads still present in `layer` (prune_heads takes these)."""
+    pruned = getattr(layer.attention, "pruned_heads", set())
+    return [h for h in range(n_original) if h not in pruned]
+
+
+class _Replay(torch.nn.Module):
+    """Stands in for the layers before a cut and returns their cached output."""
+    def __init__(self, hidden_states):
+        super().__init__()
+        self.hidden_states = hidden_states
+
+    def forward(self, *args, **kwargs):
+        return (self.hidden_states,)
+
+
+def make_batches(tokenizer, texts, labels, max_length=256, batch_size=16):
+    """
+    Tokenize a scoring sample once into fixed padded batches (reused by every scoring pass).
+    Returns:
+        list of dict: Model inputs plus 'labels' per batch.
+    """
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        enc = tokenizer(list(texts[start:start + batch_size]), return_tensors="pt",
+                        truncation=True, padding=True, max_length=max_length)
+        enc = dict(enc)
+        enc['labels'] = torch.tensor(labels[start:start + batch_size])
+        batches.append(enc)
+    return batches
+
+
+def _to(batch, device):
+    return {k: v.to(device) for k, v in batch.items()}
+
+
+def _loss(model, batch):
+    inputs = {k: v for k, v in batch.items() if k != 'labels'}
+    return F.cross_entropy(model(**inputs).logits.float(), batch['labels'])
+
+
+def head_importance(model, batches):
+    """
+    Gradient-based importance of every remaining head, normalized per layer.
+    Returns:
+        list of np.ndarray: One array per encoder layer, indexed by *current* head position.
+    """
+    layers = _encoder_layers(model).layer
+    device = next(model.parameters()).device
+    scores = [np.zeros(_head_layout(layer)[0]) for layer in layers]
+    contexts = {}
+
+    def capture(idx):
+        def hook(_module, _inputs, output):
+            ctx = output[0] if isinstance(output, tuple) else output
+            ctx.retain_grad()
+            contexts[idx] = ctx
+        return hook
+
+    handles = [layer.attention.self.register_forward_hook(capture(i)) for i, layer in enumerate(layers)]
+    model.eval()  # no dropout while scoring; gradients still flow
+    try:
+        for batch in batches:
+            model.zero_grad()
+            contexts.clear()
+            _loss(model, _to(batch, device)).backward()
+            for i, layer in enumerate(layers):
+                n_heads, head_size = _head_layout(layer)
+                ctx = contexts[i]
+                # |dL/d gate_h| per example, summed over the batch
+                taylor = (ctx * ctx.grad).reshape(ctx.shape[0], ctx.shape[1], n_heads, head_size)
+                scores[i] += taylor.sum(dim=(1, 3)).abs().sum(dim=0).detach().cpu().numpy()
+    finally:
+        for handle in handles:
+            handle.remove()
+        model.zero_grad()
+    # Layer-wise L2 normalization (Michel et al.) makes heads comparable across layers
+    return [s / (np.linalg.norm(s) + 1e-12) for s in scores]
+
+
+def layer_importance(model, batches):
+    """
+    Loss increase on `batches` when each encoder layer is skipped.
+    The hidden states entering every layer are cached (forward pre-hooks, so they
+    are exactly what the layer received, padding included) and replayed, so each
+    skip only recomputes the layers above it.
+    Returns:
+        np.ndarray: One score per layer (higher = more important).
+    """
+    encoder = _encoder_layers(model)
+    layers = list(encoder.layer)
+    device = next(model.parameters()).device
+    deltas = np.zeros(len(layers))
+    cached = {}
+
+    def capture(idx):
+        def hook(_module, args, kwargs):
+            cached[idx] = args[0] if args else kwargs['hidden_states']
+        return hook
+
+    model.eval()
+    with torch.no_grad():
+        for batch in batches:
+            batch = _to(batch, device)
+            inputs = {k: v for k, v in batch.items() if k != 'labels'}
+            handles = [layer.register_forward_pre_hook(capture(i), with_kwargs=True)
+                       for i, layer in enumerate(layers)]
+            try:
+                base = F.cross_entropy(model(**inputs).logits.float(), batch['labels']).item()
+            finally:
+                for handle in handles:
+                    handle.remove()
+            try:
+                for i in range(len(layers)):
+                    encoder.layer = torch.nn.ModuleList([_Replay(cached[i])] + layers[i + 1:])
+                    logits = model(**inputs).logits.float()
+                    deltas[i] += F.cross_entropy(logits, batch['labels']).item() - base
+            finally:
+                encoder.layer = torch.nn.ModuleList(layers)
+            cached.clear()
+    return deltas / max(len(batches), 1)
+
+
+def drop_layers(model, drop):
+    """
+    Remove encoder layers in place, keeping ``config`` (layer count, pruned heads,
+    per-layer attention windows) consistent so the model saves and reloads.
+    Args:
+        drop (iterable of int): Current indices of the layers to remove.
+    """
+    encoder = _encoder_layers(model)
+    drop = set(drop)
+    keep = [i for i in range(len(encoder.layer)) if i not in drop]
+    encoder.layer = torch.nn.ModuleList([encoder.layer[i] for i in keep])
+    cfg = model.config
+    cfg.num_hidden_layers = len(keep)
+    cfg.pruned_heads = {new: cfg.pruned_heads[old] for new, old in enumerate(keep)
+                        if old in (cfg.pruned_heads or {})}
+    if isinstance(getattr(cfg, "attention_window", None), list):
+        cfg.attention_window = [cfg.attention_window[i] for i in keep]
+    for new, layer in enumerate(encoder.layer):
+        if hasattr(layer.attention.self, "layer_id"):  # Longformer
+            layer.attention.self.layer_id = new
+
+
+def prune_step(model, batches, head_fraction, keep_layers):
+    """
+    Bring `model` to the given pruning level: drop the least important layers, then
+    the least important heads (at least one head is always kept per layer).
+    Args:
+        batches (list of dict): Scoring batches from ``make_batches`` (validation split).
+        head_fraction (float): Target share of the *original* heads pruned in the remaining layers.
+        keep_layers (int): Target number of encoder layers left.
+    Returns:
+        dict: What was removed in this step ({'layers': [...], 'heads': {layer: [...]}}).
+    """
+    n_original_heads = model.config.num_attention_heads
+    removed = {"layers": [], "heads": {}}
+
+    n_drop = len(_encoder_layers(model).layer) - keep_layers
+    if n_drop > 0:
+        deltas = layer_importance(model, batches)
+        removed["layers"] = sorted(int(i) for i in np.argsort(deltas)[:n_drop])
+        drop_layers(model, removed["layers"])
+
+    layers = _encoder_layers(model).layer
+    target_remaining = max(len(layers), int(round(len(layers) * n_original_heads * (1 - head_fraction))))
+    current = sum(_head_layout(layer)[0] for layer in layers)
+    if current > target_remaining:
+        scores = head_importance(model, batches)
+        candidates = []
+        for i, layer_scores in enumerate(scores):
+            # The best head of each layer is never a candidate
+            for pos in np.argsort(layer_scores)[:-1]:
+                candidates.append((layer_scores[pos], i, int(pos)))
+        candidates.sort()
+        to_prune = {}
+        for _score, i, pos in candidates[:current - target_remaining]:
+            original = _original_heads(layers[i], n_original_heads)[pos]
+            to_prune.setdefault(i, []).append(original)
+        model.prune_heads(to_prune)
+        removed["heads"] = {i: sorted(h) for i, h in to_prune.items()}
+    return removed
+
+
+def remaining_heads(model):
+    """Heads left per encoder layer."""
+    return [_head_layout(layer)[0] for layer in _encoder_layers(model).layer]
+
+
+def get_steps():
+    """Cumulative pruning levels from ``pruning.steps`` ({'heads': fraction, 'layers': count} each)."""
+    return _pruning_cfg.get('steps', [{"heads": 0.25, "layers": 0}, {"heads": 0.4, "layers": 2},
+                                      {"heads": 0.5, "layers": 4}])
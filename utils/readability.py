@@ -0,0 +1,168 @@
+"""
+One-pass readability engine.
+Counts sentences, words, letters, characters and syllables once per text and
+derives every score from those counts, instead of textstat re-splitting and
+re-hyphenating the text inside each score function. Scores follow textstat
+0.7.3 (same tokenization, pyphen-based syllables and legacy rounding), so
+values match it on English text; ``benchmarks/check_readability.py`` verifies that.
+
+Syllables come from a precomputed word → count table (``build_syllable_table``)
+with a memoized pyphen lookup for words outside it.
+"""
+import json
+import math
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+_readability_cfg = config.get('readability', {})
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SENTENCE_RE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+_SPACE_RE = re.compile(r"\s")
+
+SCORE_NAMES = (
+    "flesch_reading_ease", "flesch_kincaid_grade", "smog_index",
+    "coleman_liau_index", "automated_readability_index",
+)
+
+try:
+    import pyphen
+    _pyphen = pyphen.Pyphen(lang="en_US")
+except ImportError:  # pragma: no cover - textstat installs pyphen
+    _pyphen = None
+
+_syllable_table = {}
+
+
+@lru_cache(maxsize=_readability_cfg.get('memo_size', 200000))
+def _pyphen_syllables(word):
+    """textstat's rule: hyphenation points + 1 (vowel groups if pyphen is missing)."""
+    if _pyphen is not None:
+        return len(_pyphen.positions(word)) + 1
+    return max(1, len(_VOWEL_GROUP_RE.findall(word)))
+
+
+def syllables(word):
+    """Syllable count of a lowercased, punctuation-free word."""
+    count = _syllable_table.get(word)
+    return count if count is not None else _pyphen_syllables(word)
+
+
+def load_syllable_table(path=None):
+    """Load a table written by ``build_syllable_table`` (no-op if the file is missing)."""
+    global _syllable_table
+    path = path or _readability_cfg.get('syllable_table')
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            _syllable_table = json.load(f)
+    return len(_syllable_table)
+
+
+def build_syllable_table(texts, path=None, min_count=2):
+    """
+    Precompute syllable counts for the vocabulary of a corpus and save them as JSON.
+    Args:
+        texts (iterable of str): Corpus to take the vocabulary from.
+        path (str): Output file (defaults to ``readability.syllable_table``).
+        min_count (int): Only words seen at least this often are stored.
+    Returns:
+        int: Number of words in the table.
+    """
+    from collections import Counter
+
+    vocab = Counter()
+    for text in texts:
+        if isinstance(text, str):
+            vocab.update(_PUNCT_RE.sub("", text.lower()).split())
+    table = {w: _pyphen_syllables(w) for w, c in vocab.items() if c >= min_count}
+    path = path or _readability_cfg['syllable_table']
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(table, f)
+    load_syllable_table(path)
+    return len(table)
+
+
+def _legacy_round(number, points=0):
+    """textstat's rounding (half away from zero)."""
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+
+def text_counts(text):
+    """
+    Every count the scores need, from a single pass over the text.
+    Returns:
+        tuple: (sentences, words, syllables, polysyllables, letters, chars).
+    """
+    stripped = _PUNCT_RE.sub("", text)
+    words = stripped.split()
+    n_words = len(words)
+
+    n_syllables = n_poly = 0
+    for word in words:
+        s = syllables(word.lower())
+        n_syllables += s
+        n_poly += s >= 3
+
+    # Sentence fragments with <= 2 words are not counted (textstat's rule)
+    fragments = _SENTENCE_RE.findall(text)
+    ignored = sum(1 for frag in fragments if len(_PUNCT_RE.sub("", frag).split()) <= 2)
+    n_sentences = max(1, len(fragments) - ignored)
+
+    # Letter/char counts exclude all whitespace (textstat's re.sub(r"\s", "", ...))
+    letters = len(stripped) - len(_SPACE_RE.findall(stripped))
+    chars = len(text) - len(_SPACE_RE.findall(text))
+    return n_sentences, n_words, n_syllables, n_poly, letters, chars
+
+
+def _scores_from_counts(sentences, words, syll, poly, letters, chars):
+    # textstat maps each ratio with a zero denominator to 0.0
+    asl = _legacy_round(words / sentences, 1)
+    asw = _legacy_round(syll / words, 1) if words else 0.0
+    smog = _legacy_round(1.043 * (30 * (poly / sentences)) ** 0.5 + 3.1291, 1) if sentences >= 3 else 0.0
+    letters_100 = _legacy_round(_legacy_round(letters / words, 2) * 100, 2) if words else 0.0
+    sentences_100 = _legacy_round(_legacy_round(sentences / words, 2) * 100, 2) if words else 0.0
+    ari = _legacy_round(
+        4.71 * _legacy_round(chars / words, 2) + 0.5 * _legacy_round(words / sentences, 2) - 21.43, 1
+    ) if words else 0.0
+    return {
+        "flesch_reading_ease": _legacy_round(206.835 - 1.015 * asl - 84.6 * asw, 2),
+        "flesch_kincaid_grade": _legacy_round(0.39 * asl + 11.8 * asw - 15.59, 1),
+        "smog_index": smog,
+        "coleman_liau_index": _legacy_round(0.058 * letters_100 - 0.296 * sentences_100 - 15.8, 2),
+        "automated_readability_index": ari,
+    }
+
+
+def readability(text):
+    """
+    All readability scores of one text.
+    Returns:
+        dict: Score name → value (0.0 for every score on empty / non-string input).
+    """
+    if not text or not isinstance(text, str):
+        return dict.fromkeys(SCORE_NAMES, 0.0)
+    return _scores_from_counts(*text_counts(text))
+
+
+def readability_batch(texts):
+    """
+    Readability scores for many texts at once.
+    Returns:
+        dict: Score name → np.ndarray of shape (n_texts,), in input order.
+    """
+    rows = [readability(t) for t in texts]
+    return {name: np.fromiter((r[name] for r in rows), dtype=np.float64, count=len(rows))
+            for name in SCORE_NAMES}
+
+
+load_syllable_table()
@@ -0,0 +1,149 @@
+"""
+CPU runtime configuration for inference processes.
+Sizes torch's intra-/inter-op thread pools per worker and optionally pins each
+worker to its own block of cores, so several workers on one box don't
+oversubscribe every core. Settings live under ``inference.runtime`` in config.yaml.
+"""
+import os
+import re
+import tempfile
+
+import yaml
+
+# Load configuration once at module import
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+# Lock file kept open for the process lifetime once a core block is claimed
+_pin_lock = None
+# Settings applied in this process (later config-driven calls are no-ops)
+_applied = None
+
+
+def get_runtime_config():
+    """Return the ``inference.runtime`` section with defaults filled in."""
+    runtime_cfg = config.get('inference', {}).get('runtime', {})
+    return {
+        'workers': runtime_cfg.get('workers', 1),
+        'intra_op_threads': runtime_cfg.get('intra_op_threads', 0),
+        'inter_op_threads': runtime_cfg.get('inter_op_threads', 0),
+        'cpu_pinning': runtime_cfg.get('cpu_pinning', False),
+    }
+
+
+def _available_cores():
+    """Cores this process may run on (respects cgroup/taskset limits where visible)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _claim_core_block(n_blocks):
+    """
+    Claim a worker slot in [0, n_blocks) that no other live worker holds.
+    Uses one advisory lock file per slot, so uvicorn-spawned workers (which share
+    no state) still end up on disjoint cores. Returns None if every slot is taken.
+    """
+    global _pin_lock
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    for idx in range(n_blocks):
+        path = os.path.join(tempfile.gettempdir(), f"ai_text_detector_cpu_{idx}.lock")
+        fh = open(path, "w")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            continue
+        _pin_lock = fh
+        return idx
+    return None
+
+
+def apply_runtime_config(runtime_cfg=None, worker_index=None):
+    """
+    Apply thread-pool sizes (and optional CPU pinning) to the current process.
+    Call before the first forward pass; repeated calls without overrides keep
+    whatever was applied first (so an explicit override isn't undone by a later
+    ``load_final_model``).
+
+    Args:
+        runtime_cfg (dict): Overrides for the config.yaml runtime section (used by the auto-tuner).
+        worker_index (int): This worker's slot for pinning; claimed automatically when None.
+    Returns:
+        dict: The settings actually applied ('intra_op_threads', 'inter_op_threads', 'cores').
+    """
+    global _applied
+    import torch
+
+    if runtime_cfg is None and _applied is not None:
+        return _applied
+
+    cfg = {**get_runtime_config(), **(runtime_cfg or {})}
+    workers = max(1, int(cfg['workers']))
+    cores = _available_cores()
+
+    if cfg['cpu_pinning'] and hasattr(os, "sched_setaffinity") and workers > 1:
+        if worker_index is None:
+            worker_index = _claim_core_block(workers)
+        if worker_index is not None:
+            per_worker = max(1, len(cores) // workers)
+            block = cores[(worker_index % workers) * per_worker:][:per_worker]
+            if block:
+                os.sched_setaffinity(0, block)
+                cores = block
+
+    intra = int(cfg['intra_op_threads']) or max(1, len(cores) // (1 if cfg['cpu_pinning'] else workers))
+    torch.set_num_threads(intra)
+
+    inter = int(cfg['inter_op_threads'])
+    if inter:
+        try:
+            torch.set_num_interop_threads(inter)
+        except RuntimeError:
+            # Can only be set before any inter-op parallel work has started
+            inter = torch.get_num_interop_threads()
+
+    if workers > 1:
+        # HF fast tokenizers spin up their own pool per process otherwise
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    _applied = {'intra_op_threads': intra, 'inter_op_threads': inter or torch.get_num_interop_threads(), 'cores': cores}
+    return _applied
+
+
+def write_runtime_config(values, path="config.yaml"):
+    """
+    Write runtime settings back into config.yaml's ``inference.runtime`` block.
+    Edits the matching ``key: value`` lines in place so comments and layout survive.
+
+    Args:
+        values (dict): Subset of workers / intra_op_threads / inter_op_threads / cpu_pinning.
+        path (str): Config file to update.
+    """
+    with open(path, "r") as f:
+        lines = f.readlines()
+
+    in_runtime, runtime_indent = False, None
+    for i, line in enumerate(lines):
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+        if stripped.startswith("runtime:"):
+            in_runtime, runtime_indent = True, indent
+            continue
+        if in_runtime:
+            if stripped and indent <= runtime_indent:
+                break
+            m = re.match(r"(\s*)(\w+):(\s*)([^#\n]*?)(\s*)(#.*)?$", line.rstrip("\n"))
+            if m and m.group(2) in values:
+                value = values[m.group(2)]
+                value = str(value).lower() if isinstance(value, bool) else str(value)
+                # Keep trailing comments in their original column
+                pad = max(1, len(m.group(4)) + len(m.group(5)) - len(value))
+                comment = f"{' ' * pad}{m.group(6)}" if m.group(6) else ""
+                lines[i] = f"{m.group(1)}{m.group(2)}:{m.group(3) or ' '}{value}{comment}\n"
+
+    with open(path, "w") as f:
+        f.writelines(lines)
@@ -47,55 +47,158 @@ def plot_class_distribution(df, label_col='label', colors=None, save_path=None):
     return fig
 
 
+# Above this many rows the EDA plots switch from per-sample artists (KDE, rug)
+# to binned rendering plus a deterministic sample.
+LARGE_PLOT_THRESHOLD = 50_000
+
+
+def compute_token_lengths(texts):
+    """
+    Count whitespace-separated tokens for every text without touching the source frame.
+    Equivalent to ``len(str(x).split())`` but vectorized through pandas string ops.
+
+    Args:
+        texts (pd.Series): Series of texts (non-strings are cast with ``str``).
+
+    Returns:
+        np.ndarray: Integer token counts, one per input row.
+    """
+    return texts.astype(str).str.count(r"\S+").to_numpy(dtype=np.int64)
+
+
+def deterministic_sample(values, max_points, random_state=42):
+    """
+    Return at most ``max_points`` values chosen with a fixed seed, so repeated
+    runs over the same data draw identical figures.
+    """
+    values = np.asarray(values)
+    if len(values) <= max_points:
+        return values
+    rng = np.random.default_rng(random_state)
+    idx = np.sort(rng.choice(len(values), size=max_points, replace=False))
+    return values[idx]
+
+
+def compute_length_histograms(df, text_col='text', label_col='label', n_bins=40,
+                              quantile=0.99, lengths=None):
+    """
+    Pre-aggregate text lengths into per-class histograms.
+    The result is small (O(classes x bins)) and can be cached or passed straight to
+    ``plot_length_distribution`` instead of the full DataFrame.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the label column (and text column unless ``lengths`` given).
+        text_col (str): Column name for the text.
+        label_col (str): Column name for the class labels.
+        n_bins (int): Number of histogram bins up to the clipping quantile.
+        quantile (float): Upper quantile used to clip the x-axis (handles outliers).
+        lengths (array-like): Optional precomputed token lengths aligned with ``df``.
+
+    Returns:
+        dict: {'edges': ndarray, 'max_len': int, 'classes': {cls: {'counts', 'median', 'n'}}}
+    """
+    if lengths is None:
+        lengths = compute_token_lengths(df[text_col])
+    lengths = np.asarray(lengths)
+    labels = df[label_col].to_numpy()
+
+    max_len = max(int(np.quantile(lengths, quantile)), 1) if len(lengths) else 1
+    edges = np.linspace(0, max_len, n_bins)
+
+    classes = {}
+    for cls in df[label_col].unique():
+        cls_lengths = lengths[labels == cls]
+        counts, _ = np.histogram(cls_lengths, bins=edges)
+        classes[cls] = {
+            'counts': counts,
+            'median': float(np.median(cls_lengths)) if len(cls_lengths) else 0.0,
+            'n': int(len(cls_lengths)),
+        }
+    return {'edges': edges, 'max_len': max_len, 'classes': classes}
+
+
 def plot_length_distribution(
-    df,
+    df=None,
     text_col='text',
     label_col='label',
-    save_path=None
+    save_path=None,
+    histograms=None,
+    max_points=LARGE_PLOT_THRESHOLD,
+    random_state=42
 ):
     """
     Plot the distribution of text lengths for each class.
     Uses density histograms + KDE, marks medians, adds rug plots,
     and limits x-axis to the 99th percentile to handle outliers.
 
+    For classes with more than ``max_points`` samples the histogram is drawn from
+    pre-binned counts, the KDE is fitted on a deterministic sample and the rug plot
+    is skipped, so the figure renders in seconds for millions of rows.
+    The input DataFrame is never modified.
+
     Args:
         df (pd.DataFrame): DataFrame containing at least the text and label columns.
         text_col (str): Column name for the text.
         label_col (str): Column name for the class labels.
         save_path (str): If provided, saves the figure to this path.
+        histograms (dict): Optional output of ``compute_length_histograms``; when given
+                           and ``df`` is None, the plot is drawn from the aggregates only.
+        max_points (int): Size threshold above which sampled/binned rendering is used.
+        random_state (int): Seed for the deterministic sample.
 
     Returns:
         matplotlib.figure.Figure: The figure object.
     """
-    # Compute text lengths
-    df['__length__'] = df[text_col].apply(lambda x: len(str(x).split()))
+    if df is None and histograms is None:
+        raise ValueError("Either df or precomputed histograms must be provided.")
+
+    lengths, labels = None, None
+    if df is not None:
+        lengths = compute_token_lengths(df[text_col])
+        labels = df[label_col].to_numpy()
+        if histograms is None:
+            histograms = compute_length_histograms(df, text_col, label_col, lengths=lengths)
 
-    # Set x-axis limit at the 99th percentile
-    max_len = int(df['__length__'].quantile(0.99))
-    bins = np.linspace(0, max_len, 40)
+    edges = histograms['edges']
+    max_len = histograms['max_len']
+    widths = np.diff(edges)
 
-    classes = df[label_col].unique()
+    classes = list(histograms['classes'].keys())
     cmap = plt.get_cmap('tab10')
     colors = [cmap(i) for i in range(len(classes))]
 
     fig, ax = plt.subplots(figsize=(8, 5))
     for cls, color in zip(classes, colors):
-        lengths = df[df[label_col] == cls]['__length__']
-
-        # Plot density histogram + KDE
-        sns.histplot(
-            lengths,
-            bins=bins,
-            stat="density",
-            kde=True,
-            color=color,
-            alpha=0.3,
-            label=str(cls),
-            ax=ax
-        )
+        stats = histograms['classes'][cls]
+        cls_lengths = lengths[labels == cls] if lengths is not None else None
+
+        if cls_lengths is not None and len(cls_lengths) <= max_points:
+            # Plot density histogram + KDE
+            sns.histplot(
+                cls_lengths,
+                bins=edges,
+                stat="density",
+                kde=True,
+                color=color,
+                alpha=0.3,
+                label=str(cls),
+                ax=ax
+            )
+            # Add a rug plot to show individual samples
+            sns.rugplot(cls_lengths, ax=ax, color=color, height=0.02, alpha=0.5)
+        else:
+            # Binned rendering from the pre-aggregated counts
+            counts = stats['counts']
+            total = counts.sum()
+            density = counts / (total * widths) if total else counts.astype(float)
+            ax.bar(edges[:-1], density, width=widths, align='edge',
+                   color=color, alpha=0.3, label=str(cls))
+            if cls_lengths is not None and len(cls_lengths) > 1:
+                sample = deterministic_sample(cls_lengths, max_points, random_state)
+                sns.kdeplot(sample, ax=ax, color=color, clip=(0, max_len))
 
         # Mark the median length
-        med = lengths.median()
+        med = stats['median']
         ax.axvline(med, color=color, linestyle="--", linewidth=1)
         ax.text(
             med,
@@ -107,9 +210,6 @@ def plot_length_distribution(
             va="center"
         )
 
-        # Add a rug plot to show individual samples
-        sns.rugplot(lengths, ax=ax, color=color, height=0.02, alpha=0.5)
-
     ax.set_xlim(0, max_len)
     ax.set_title("Article Length Distribution by Class")
     ax.set_xlabel("Length (words)")
@@ -119,13 +219,9 @@ def plot_length_distribution(
     fig.tight_layout()
     if save_path:
         fig.savefig(save_path)
-
-    # Cleanup temporary column
-    df.drop(columns=['__length__'], inplace=True, errors='ignore')
     return fig
 
 
-
 def plot_confusion_matrix(y_true, y_pred, labels, normalize=False, save_path=None):
     """
     Plot a confusion matrix given true and predicted labels.